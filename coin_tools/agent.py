@@ -0,0 +1,240 @@
+"""
+Key agent, similar to ssh-agent.
+
+`coin-tools agent start --ids 1-10` decrypts the selected wallets once and keeps their Keypairs in a process
+that locks its memory (no swap, no core dumps) and signs transaction messages over a Unix socket until --ttl
+expires. With COINTOOLS_AGENT_SOCK pointing at the socket, the Keyring of every later coin-tools invocation
+takes those wallets from the agent, so back to back trades skip the DB read and the decryption.
+
+The protocol is one JSON line request and one JSON line response per connection:
+    {"op": "wallets"}                                 -> {"wallets": [{"id": 1, "name": ..., "public_key": ...}]}
+    {"op": "sign", "wallet_id": 1, "message": <b64>} -> {"signature": <base58>}
+    {"op": "stop"}                                    -> {"stopped": true}
+Errors are returned as {"error": "..."}.
+"""
+import base64
+import ctypes
+import ctypes.util
+import json
+import os
+import socket
+import stat
+import struct
+import tempfile
+import time
+
+from solders.keypair import Keypair  #type: ignore
+from solders.pubkey import Pubkey as PublicKey  #type: ignore
+from solders.signature import Signature  #type: ignore
+
+AGENT_SOCK_ENV = "COINTOOLS_AGENT_SOCK"
+DEFAULT_TTL = 3600  # seconds the agent holds keys before wiping them and exiting
+REQUEST_TIMEOUT = 5  # seconds a client has to send its request
+MAX_REQUEST_BYTES = 64 * 1024
+MCL_CURRENT, MCL_FUTURE = 1, 2
+PR_SET_DUMPABLE = 4
+
+
+class AgentError(Exception):
+    pass
+
+
+def default_socket_path() -> str:
+    return os.path.join(tempfile.gettempdir(), f"coin-tools-{os.getuid()}", "agent.sock")
+
+
+def secure_socket_dir(path: str):
+    """
+    Creates the directory of the agent socket, raises AgentError unless it is owned by the current user with mode 0700.
+    A directory under /tmp created beforehand by another user would otherwise let them replace the socket.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.stat(directory)
+    if st.st_uid != os.getuid() or stat.S_IMODE(st.st_mode) != 0o700:
+        raise AgentError(f"{directory} must be owned by uid {os.getuid()} with mode 0700, "
+                         f"it is owned by uid {st.st_uid} with mode {stat.S_IMODE(st.st_mode):04o}.")
+
+
+def lock_memory() -> list[str]:
+    """
+    Keeps the agent's memory out of swap and core dumps and stops other processes of the user from reading it.
+    Best effort, returns a warning for every protection that could not be applied.
+    """
+    warnings = []
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    except (ImportError, ValueError, OSError) as e:
+        warnings.append(f"could not disable core dumps: {e}")
+
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    if hasattr(libc, "mlockall"):
+        if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+            warnings.append(f"could not lock memory: {os.strerror(ctypes.get_errno())}, raise `ulimit -l` to keep keys out of swap")
+    else:
+        warnings.append("could not lock memory: mlockall is not available")
+    if hasattr(libc, "prctl") and libc.prctl(PR_SET_DUMPABLE, 0, 0, 0, 0) != 0:
+        warnings.append(f"could not disable ptrace: {os.strerror(ctypes.get_errno())}")
+    return warnings
+
+
+def peer_uid(conn: socket.socket) -> int:
+    """Returns the uid of the process on the other end of a Unix socket, None where SO_PEERCRED is unavailable."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    _, uid, _ = struct.unpack("3i", conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))
+    return uid
+
+
+class KeyAgent:
+    """Serves signatures for the wallets it was started with until its TTL expires or it is stopped."""
+
+    def __init__(self, wallets: list[dict], keypairs: dict[int, Keypair], ttl: float = DEFAULT_TTL):
+        self.wallets = {w["id"]: {"id": w["id"], "name": w["name"], "public_key": w["public_key"]} for w in wallets}
+        self.keypairs = keypairs
+        self.expires_at = time.monotonic() + ttl if ttl else None
+        self.stopped = False
+        self.signatures = 0
+
+    def handle(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "wallets":
+            return {"wallets": list(self.wallets.values())}
+        if op == "sign":
+            keypair = self.keypairs.get(request.get("wallet_id"))
+            if keypair is None:
+                return {"error": f"Wallet {request.get('wallet_id')} is not held by the agent."}
+            self.signatures += 1
+            return {"signature": str(keypair.sign_message(base64.b64decode(request["message"])))}
+        if op == "stop":
+            self.stopped = True
+            return {"stopped": True}
+        return {"error": f"Unknown op {op!r}."}
+
+    def remaining(self) -> float:
+        return None if self.expires_at is None else self.expires_at - time.monotonic()
+
+    def serve(self, path: str):
+        """Serves requests on a Unix socket only the current user can open, until stopped or expired."""
+        secure_socket_dir(path)
+        if os.path.exists(path):
+            os.unlink(path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            server.bind(path)
+        finally:
+            os.umask(old_umask)
+        server.listen(64)
+
+        try:
+            while not self.stopped:
+                remaining = self.remaining()
+                if remaining is not None and remaining <= 0:
+                    break
+                server.settimeout(remaining)
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    break
+                with conn:
+                    self.serve_connection(conn)
+        finally:
+            server.close()
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def serve_connection(self, conn: socket.socket):
+        uid = peer_uid(conn)
+        if uid is not None and uid != os.getuid():
+            return
+        conn.settimeout(REQUEST_TIMEOUT)
+        try:
+            line = conn.makefile("rb").readline(MAX_REQUEST_BYTES)
+            response = self.handle(json.loads(line))
+        except (OSError, ValueError, KeyError) as e:
+            response = {"error": f"Bad request: {e}"}
+        try:
+            conn.sendall(json.dumps(response).encode() + b"\n")
+        except OSError:
+            pass
+
+
+class AgentClient:
+    def __init__(self, path: str):
+        self.path = path
+
+    def connect(self) -> socket.socket:
+        """
+        Connects to the agent with REQUEST_TIMEOUT set on the socket.
+        Raises AgentError if the process listening on the socket belongs to another user.
+        """
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.settimeout(REQUEST_TIMEOUT)
+        try:
+            conn.connect(self.path)
+            uid = peer_uid(conn)
+            if uid is not None and uid != os.getuid():
+                raise AgentError(f"the agent at {self.path} is run by uid {uid}, not by uid {os.getuid()}")
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def request(self, op: str, **params) -> dict:
+        try:
+            with self.connect() as conn:
+                conn.sendall(json.dumps({"op": op, **params}).encode() + b"\n")
+                response = json.loads(conn.makefile("rb").readline())
+        except socket.timeout:
+            raise AgentError(f"the agent at {self.path} did not answer within {REQUEST_TIMEOUT} seconds")
+        if "error" in response:
+            raise AgentError(response["error"])
+        return response
+
+    def wallets(self) -> dict[int, dict]:
+        return {w["id"]: w for w in self.request("wallets")["wallets"]}
+
+    def sign(self, wallet_id: int, message: bytes) -> Signature:
+        response = self.request("sign", wallet_id=wallet_id, message=base64.b64encode(message).decode())
+        return Signature.from_string(response["signature"])
+
+    def stop(self):
+        self.request("stop")
+
+
+class AgentSigner:
+    """
+    Stands in for a Keypair whose secret key lives in the agent.
+    sign_transaction asks it for the signature of the compiled message and signs with a Presigner.
+    """
+
+    def __init__(self, client: AgentClient, wallet_id: int, public_key: str):
+        self.client = client
+        self.wallet_id = wallet_id
+        self._pubkey = PublicKey.from_string(public_key)
+
+    def pubkey(self) -> PublicKey:
+        return self._pubkey
+
+    def sign_message(self, message: bytes) -> Signature:
+        return self.client.sign(self.wallet_id, message)
+
+
+def get_agent_client() -> AgentClient:
+    """
+    Returns a client for the agent in COINTOOLS_AGENT_SOCK, None if it is not set, no agent is listening
+    or the agent is run by another user.
+    """
+    path = os.environ.get(AGENT_SOCK_ENV)
+    if not path or not os.path.exists(path):
+        return None
+    client = AgentClient(path)
+    try:
+        client.connect().close()
+    except (OSError, AgentError) as e:
+        print(f"Warning: key agent unavailable, decrypting locally: {e}")
+        return None
+    return client
@@ -0,0 +1,6 @@
+"""
+Benchmarks.
+
+scale.py times whole commands against synthetic wallet databases and the local RPC stand-in.
+micro.py times the per wallet and per account CPU hot paths and checks them against a committed baseline.
+"""
@@ -0,0 +1,188 @@
+"""
+Micro-benchmarks for the CPU hot paths that run once per wallet or per account.
+
+Each benchmark is timed with timeit (best of several repeats of an auto-ranged loop) and divided by a
+calibration loop of plain Python, so baselines recorded on one machine stay comparable on another.
+--check fails (exit code 1) when a benchmark is slower than its baseline by more than --threshold.
+
+    python -m coin_tools.bench.micro --check
+    python -m coin_tools.bench.micro --update-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import struct
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+from cryptography.fernet import Fernet
+
+BASELINE_PATH = Path(__file__).with_name("micro_baseline.json")
+DEFAULT_THRESHOLD = 0.25  # fraction slower than the baseline that fails --check
+REPEATS = 15
+MIN_REPEAT_SECONDS = 0.05
+
+
+def calibration():
+    total = 0
+    for i in range(1000):
+        total += i * i
+    return total
+
+
+def metaplex_sample() -> bytes:
+    """A metaplex metadata account as stored on chain: fixed width, zero padded name, symbol and uri."""
+    def field(value: bytes, width: int) -> bytes:
+        return struct.pack("<I", width) + value.ljust(width, b"\x00")
+    data = bytes([4]) + bytes(range(32)) + bytes(range(32, 64))
+    data += field(b"DICK COIN", 32) + field(b"DICKCOIN", 10) + field(b"https://ipfs.io/ipfs/QmTYGxBLsUb1MSyHhkUraXDbZJCbpLmkwZWRASsba4rrJE", 200)
+    data += struct.pack("<H", 200)
+    return data.ljust(679, b"\x00")
+
+
+def load_benchmarks() -> dict:
+    """
+    Returns benchmark name -> zero argument callable. coin_tools modules read the DB and encryption key
+    when imported, so a throwaway DB and key are set up first when the environment has none.
+    """
+    if not os.environ.get("COINTOOLS_DB_PATH"):
+        os.environ["COINTOOLS_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="coin_tools_micro_"), "micro.db")
+    os.environ.setdefault("COINTOOLS_ENC_KEY", Fernet.generate_key().decode())
+
+    from coin_tools.db import init_db
+    init_db()
+
+    from solders.keypair import Keypair  #type: ignore
+    from solders.pubkey import Pubkey as PublicKey  #type: ignore
+    from spl.token._layouts import ACCOUNT_LAYOUT, MINT_LAYOUT
+
+    from coin_tools.encryption import decrypt_data, encrypt_data
+    from coin_tools.localnet.ledger import pack_bonding_curve, pack_mint, pack_token_account
+    from coin_tools.pump_fun.coin_data import BONDING_CURVE_LAYOUT, derive_bonding_curve_accounts, sol_for_tokens, tokens_for_sol
+    from coin_tools.solana.metaplex_parse import parse_metaplex
+    from coin_tools.solana.tokens import TOKEN_METADATA_PROGRAM_ID
+    from coin_tools.solana.utils import parse_private_key_bytes
+    from coin_tools.utils import parse_ranges
+
+    keypair = Keypair.from_seed(bytes(range(32)))
+    mint = Keypair.from_seed(bytes(range(1, 33))).pubkey()
+    mint_str = str(mint)
+    secret = bytes(keypair)
+    encrypted = encrypt_data(keypair.secret())
+    metadata = metaplex_sample()
+    token_account = pack_token_account(mint, keypair.pubkey(), 123_456_789)
+    mint_account = pack_mint(1_000_000_000_000_000, 6)
+    bonding_curve = pack_bonding_curve(1_073_000_000_000_000, 30_000_000_000, 793_100_000_000_000, 0, 1_000_000_000_000_000)
+    metadata_seeds = [b"metadata", bytes(TOKEN_METADATA_PROGRAM_ID), bytes(mint)]
+
+    return {
+        "parse_metaplex": lambda: parse_metaplex(metadata),
+        "account_layout_parse": lambda: ACCOUNT_LAYOUT.parse(token_account),
+        "mint_layout_parse": lambda: MINT_LAYOUT.parse(mint_account),
+        "bonding_curve_parse": lambda: BONDING_CURVE_LAYOUT.parse(bonding_curve),
+        "sol_for_tokens": lambda: sol_for_tokens(0.5, 30.0, 1_073_000_000.0),
+        "tokens_for_sol": lambda: tokens_for_sol(1_000_000.0, 30.0, 1_073_000_000.0),
+        "encrypt_data": lambda: encrypt_data(secret),
+        "decrypt_data": lambda: decrypt_data(encrypted),
+        "parse_private_key_bytes_64": lambda: parse_private_key_bytes(secret),
+        "parse_private_key_bytes_32": lambda: parse_private_key_bytes(secret[:32]),
+        "parse_ranges": lambda: parse_ranges("1-1000,1005,2000-3000"),
+        "pubkey_from_string": lambda: PublicKey.from_string(mint_str),
+        "derive_bonding_curve_accounts": lambda: derive_bonding_curve_accounts(mint),
+        "metadata_pda": lambda: PublicKey.find_program_address(metadata_seeds, TOKEN_METADATA_PROGRAM_ID),
+    }
+
+
+def time_per_call(func) -> float:
+    """Best nanoseconds per call over REPEATS repeats of a loop long enough to run MIN_REPEAT_SECONDS."""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    number = max(number, int(number * MIN_REPEAT_SECONDS / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=REPEATS, number=number)) / number * 1e9
+
+
+def run(names: list[str], benchmarks: dict) -> dict:
+    # Calibrating between benchmarks and keeping the fastest run discounts moments the machine was busy
+    calibration_ns = time_per_call(calibration)
+    timings = {}
+    for name in names:
+        timings[name] = time_per_call(benchmarks[name])
+        calibration_ns = min(calibration_ns, time_per_call(calibration))
+    results = {name: {"ns_per_call": round(ns, 1), "relative": round(ns / calibration_ns, 5)} for name, ns in timings.items()}
+    return {"calibration_ns": round(calibration_ns, 1), "python": platform.python_version(), "benchmarks": results}
+
+
+def load_baseline(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """Prints each benchmark against its baseline, returns the names that regressed beyond threshold."""
+    regressions = []
+    print(f"{'Benchmark':<32} {'ns/call':>12} {'Relative':>10} {'Baseline':>10} {'Change':>8}")
+    for name, result in report["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if base is None:
+            print(f"{name:<32} {result['ns_per_call']:>12.1f} {result['relative']:>10.4f} {'n/a':>10} {'new':>8}")
+            continue
+        change = result["relative"] / base["relative"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSED"
+        print(f"{name:<32} {result['ns_per_call']:>12.1f} {result['relative']:>10.4f} {base['relative']:>10.4f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m coin_tools.bench.micro", description="Micro-benchmarks for per wallet and per account CPU hot paths.")
+    parser.add_argument("--filter", required=False, help="Only run benchmarks whose name contains this.")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline file.")
+    parser.add_argument("--check", action="store_true", help="Exit with code 1 if a benchmark regressed beyond --threshold.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown against the baseline, 0.25 for 25%%.")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline.")
+    parser.add_argument("--output", required=False, help="Also write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    benchmarks = load_benchmarks()
+    names = [name for name in benchmarks if not args.filter or args.filter in name]
+    if not names:
+        print(f"No benchmarks match {args.filter!r}.")
+        sys.exit(1)
+
+    report = run(names, benchmarks)
+    baseline_path = Path(args.baseline)
+    baseline = load_baseline(baseline_path)
+    regressions = compare(report, baseline, args.threshold)
+    if args.check and regressions:
+        # Noise rarely repeats, a benchmark only fails if it is still slow when run again
+        print(f"Re-running {len(regressions)} benchmarks that look slower...")
+        rerun = run(regressions, benchmarks)
+        for name, result in rerun["benchmarks"].items():
+            if result["relative"] < report["benchmarks"][name]["relative"]:
+                report["benchmarks"][name] = result
+        regressions = compare({"benchmarks": {name: report["benchmarks"][name] for name in regressions}}, baseline, args.threshold)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        baseline.setdefault("benchmarks", {}).update(report["benchmarks"])
+        baseline["calibration_ns"], baseline["python"] = report["calibration_ns"], report["python"]
+        with open(baseline_path, "w") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {baseline_path}")
+    if args.check and regressions:
+        print(f"{len(regressions)} benchmarks regressed more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
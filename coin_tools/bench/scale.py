@@ -0,0 +1,229 @@
+"""
+Scale benchmark: how each command behaves as the wallet count grows.
+
+For every size a synthetic SQLite database is generated (encrypted keys, token metadata), the wallets are
+funded on an in-process local RPC stand-in, and each command is run end to end as a subprocess of
+`python -m coin_tools.main`. Wall time, RPC calls seen by the stand-in and the peak RSS of the command
+are reported as JSON so runs can be compared across versions.
+
+    python -m coin_tools.bench.scale --sizes 100,10000,100000 --output scale.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from cryptography.fernet import Fernet
+from solana.constants import LAMPORTS_PER_SOL
+from solders.keypair import Keypair  #type: ignore
+
+from coin_tools.db import init_db, insert_wallets, upsert_token_metadata
+from coin_tools.encryption import encrypt_data
+from coin_tools.localnet.ledger import PUMP_FUN_DECIMALS, Ledger
+from coin_tools.localnet.server import Faults, LocalnetServer
+
+DEFAULT_SIZES = "100,10000"
+DEFAULT_BULK_LIMIT = 1000  # wallets taking part in bulk transfers and buys, these send a transaction each
+COMMANDS = ["wallets-list", "balances", "bulk-transfer-sol", "bulk-buy"]
+FUNDER_SOL = 1_000_000
+WALLET_SOL = 1
+HOLDER_TOKENS = 1_000_000 * 10**PUMP_FUN_DECIMALS
+PACKAGE_ROOT = Path(__file__).resolve().parents[2]
+
+
+def seeded_keypair(seed: str, index: int) -> Keypair:
+    return Keypair.from_seed(hashlib.sha256(f"{seed}:{index}".encode()).digest())
+
+
+def log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def generate_database(db_path: str, size: int, mints: int, holders: float, enc_key: bytes, seed: str) -> tuple[list, list, list]:
+    """
+    Creates a wallet database of size wallets with encrypted keys and metadata for the benchmark mints.
+    Returns the wallet public keys (wallet 1 first, it funds the bulk transfers), the mint public keys
+    and the (owner, mint) token holdings to create on the ledger.
+    """
+    os.environ["COINTOOLS_DB_PATH"] = db_path
+    os.environ["COINTOOLS_ENC_KEY"] = enc_key.decode()
+    init_db()
+
+    wallets, public_keys = [], []
+    for i in range(size):
+        keypair = seeded_keypair(seed, i)
+        wallets.append((f"bench{i}", str(keypair.pubkey()), encrypt_data(keypair.secret())))
+        public_keys.append(keypair.pubkey())
+    insert_wallets(wallets)
+
+    mint_keys = [seeded_keypair(f"{seed}:mint", i).pubkey() for i in range(mints)]
+    for i, mint in enumerate(mint_keys):
+        upsert_token_metadata(str(mint), f"Bench Coin {i}", f"BENCH{i}", "", PUMP_FUN_DECIMALS)
+
+    # Every holders-th wallet holds one of the mints, round robin
+    stride = max(1, round(1 / holders)) if holders else 0
+    holdings = [(public_keys[i], mint_keys[(i // stride) % mints]) for i in range(0, size, stride)] if stride and mints else []
+    return public_keys, mint_keys, holdings
+
+
+def seed_ledger(ledger: Ledger, public_keys: list, mint_keys: list, holdings: list):
+    for i, pubkey in enumerate(public_keys):
+        ledger.fund(pubkey, (FUNDER_SOL if i == 0 else WALLET_SOL) * LAMPORTS_PER_SOL)
+    for mint in mint_keys:
+        ledger.create_pump_curve(mint)
+    for owner, mint in holdings:
+        ledger.create_token_account(owner, mint, HOLDER_TOKENS)
+
+
+def command_argv(name: str, size: int, bulk_limit: int, mint: str) -> list[str]:
+    last_id = min(size, bulk_limit + 1)
+    return {
+        "wallets-list": ["wallets", "list"],
+        "balances": ["balances", "get-token-balance", "--list", "--price"],
+        "bulk-transfer-sol": ["transfers", "bulk-transfer-sol", "--from-id", "1", "--to-ids", f"2-{last_id}", "--amount", "0.001"],
+        "bulk-buy": ["pump-fun", "bulk-buy", "--ids", f"2-{last_id}", "--ca", mint, "--amount-in-sol", "0.01", "--presign"],
+    }[name]
+
+
+def peak_rss_mb(usage) -> float:
+    """ru_maxrss is in kilobytes on Linux and bytes on macOS."""
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(usage.ru_maxrss / divisor, 1)
+
+
+def run_command(server: LocalnetServer, env: dict, argv: list[str], timeout: float) -> dict:
+    """Runs one coin_tools command to completion, returns its wall time, peak RSS, exit code and the RPC calls it made."""
+    before = server.request_counts.copy()
+    with tempfile.TemporaryFile() as stderr_file:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "-m", "coin_tools.main"] + argv, cwd=PACKAGE_ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=stderr_file)
+        timer = threading.Timer(timeout, process.kill)
+        timer.start()
+        # wait4 rather than wait, it returns the resource usage of this child alone
+        _, status, usage = os.wait4(process.pid, 0)
+        wall_seconds = time.perf_counter() - start
+        timer.cancel()
+        process.returncode = os.waitstatus_to_exitcode(status)
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode(errors="replace")
+
+    calls = server.request_counts - before
+    result = {
+        "command": " ".join(argv),
+        "exit_code": process.returncode,
+        "wall_seconds": round(wall_seconds, 3),
+        "rpc_calls": sum(calls.values()),
+        "rpc_calls_by_method": dict(calls.most_common()),
+        "peak_rss_mb": peak_rss_mb(usage),
+    }
+    if process.returncode:
+        result["stderr_tail"] = stderr[-2000:]
+    return result
+
+
+def run_size(size: int, args: argparse.Namespace, workdir: str) -> dict:
+    """Generates a database of size wallets, serves a funded ledger for it and times every selected command."""
+    log(f"Generating {size} wallets...")
+    start = time.perf_counter()
+    enc_key = Fernet.generate_key()
+    db_path = os.path.join(workdir, f"wallets_{size}.db")
+    public_keys, mint_keys, holdings = generate_database(db_path, size, args.mints, args.holders, enc_key, args.seed)
+    ledger = Ledger(finalize_slots=args.finalize_slots)
+    seed_ledger(ledger, public_keys, mint_keys, holdings)
+    setup_seconds = time.perf_counter() - start
+
+    faults = Faults(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, seed=1)
+    server = LocalnetServer(ledger, port=0, faults=faults, slot_seconds=args.slot_ms / 1000).start()
+    env = {key: value for key, value in os.environ.items() if not key.startswith("COINTOOLS_")}
+    env.update({
+        "COINTOOLS_DB_PATH": db_path,
+        "COINTOOLS_ENC_KEY": enc_key.decode(),
+        "COINTOOLS_RPC_URL": server.url,
+        "COINTOOLS_BUNDLE_URL": server.url,
+    })
+
+    results = []
+    try:
+        for name in args.commands:
+            argv = command_argv(name, size, args.bulk_limit, str(mint_keys[0]))
+            log(f"   {size} wallets: {name}...")
+            result = {"name": name, **run_command(server, env, argv, args.timeout)}
+            results.append(result)
+            log(f"   {size} wallets: {name} took {result['wall_seconds']}s, {result['rpc_calls']} RPC calls, "
+                f"{result['peak_rss_mb']} MB peak RSS, exit code {result['exit_code']}")
+    finally:
+        server.stop()
+
+    return {
+        "wallets": size,
+        "setup_seconds": round(setup_seconds, 3),
+        "db_bytes": os.path.getsize(db_path),
+        "results": results,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PACKAGE_ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def parse_commands(value: str) -> list[str]:
+    commands = value.split(",")
+    unknown = [c for c in commands if c not in COMMANDS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown commands {', '.join(unknown)}, choose from {', '.join(COMMANDS)}")
+    return commands
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m coin_tools.bench.scale", description="Time commands against synthetic wallet databases and a local RPC stand-in.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma separated wallet counts.")
+    parser.add_argument("--commands", type=parse_commands, default=COMMANDS, help=f"Comma separated commands to time, from {', '.join(COMMANDS)}.")
+    parser.add_argument("--bulk-limit", type=int, default=DEFAULT_BULK_LIMIT, help="Wallets taking part in bulk-transfer-sol and bulk-buy.")
+    parser.add_argument("--mints", type=int, default=3, help="Pump.fun mints with metadata in the DB and a bonding curve on the ledger.")
+    parser.add_argument("--holders", type=float, default=0.5, help="Fraction of wallets holding a token account of one of the mints.")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latency the RPC stand-in adds to every request.")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Uniform +/- jitter on the latency.")
+    parser.add_argument("--slot-ms", type=float, default=400, help="Milliseconds per slot on the RPC stand-in.")
+    parser.add_argument("--finalize-slots", type=int, default=32, help="Slots until a landed transaction is finalized.")
+    parser.add_argument("--timeout", type=float, default=3600, help="Seconds before a command is killed.")
+    parser.add_argument("--seed", default="coin-tools-bench", help="Seed for the generated wallets and mints.")
+    parser.add_argument("--workdir", required=False, help="Directory for the generated databases (defaults to a temporary one).")
+    parser.add_argument("--output", required=False, help="Write the JSON report to this file instead of stdout.")
+    args = parser.parse_args()
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": str(datetime.now()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="coin_tools_bench_") as tmp:
+        workdir = args.workdir or tmp
+        os.makedirs(workdir, exist_ok=True)
+        for size in [int(s) for s in args.sizes.split(",")]:
+            report["runs"].append(run_size(size, args, workdir))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        log(f"Report written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
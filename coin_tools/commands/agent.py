@@ -0,0 +1,114 @@
+import argparse
+import os
+import traceback
+
+from coin_tools.agent import AGENT_SOCK_ENV, DEFAULT_TTL, AgentClient, AgentError, KeyAgent, default_socket_path, lock_memory, secure_socket_dir
+from coin_tools.keyring import Keyring
+from coin_tools.utils import parse_ranges
+
+
+def socket_path(args: argparse.Namespace) -> str:
+    return os.path.abspath(args.socket or os.environ.get(AGENT_SOCK_ENV) or default_socket_path())
+
+
+def start_agent(args: argparse.Namespace):
+    """
+    Decrypts the selected wallets once and serves signatures for them until --ttl expires or `agent stop`.
+    Runs in the foreground, start it in its own terminal or in the background.
+    """
+    for warning in lock_memory():
+        print(f"Warning: {warning}")
+
+    path = socket_path(args)
+    try:
+        secure_socket_dir(path)
+    except (OSError, AgentError) as e:
+        print(f"Error: refusing to start the agent: {e}")
+        return
+
+    # Never use the agent being replaced to unlock the new one
+    with Keyring(use_agent=False) as keyring:
+        wallets = keyring.load(parse_ranges(args.ids))
+        if not wallets:
+            print("Error: Wallet(s) not found.")
+            return
+        try:
+            keypairs = {wallet["id"]: keyring.keypair(wallet["id"]) for wallet in wallets}
+        except Exception as e:
+            print(f"Error decrypting private key: {e}")
+            traceback.print_exc()
+            return
+
+        agent = KeyAgent(wallets, keypairs, args.ttl)
+        print(f"Agent holding {len(wallets)} wallets, " + (f"expires in {args.ttl} seconds." if args.ttl else "until stopped."))
+        print(f"export {AGENT_SOCK_ENV}={path}", flush=True)
+        try:
+            agent.serve(path)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            keypairs.clear()
+        print(f"Agent stopped after {agent.signatures} signatures, keys wiped.")
+
+
+def list_agent(args: argparse.Namespace):
+    try:
+        wallets = AgentClient(socket_path(args)).wallets()
+    except (OSError, AgentError) as e:
+        print(f"Error: no agent at {socket_path(args)}: {e}")
+        return
+    print(f"Agent at {socket_path(args)} holds {len(wallets)} wallets:")
+    for wallet in wallets.values():
+        print(f"ID: {wallet['id']}, Name: {wallet['name']}, Public Key: {wallet['public_key']}")
+
+
+def stop_agent(args: argparse.Namespace):
+    try:
+        AgentClient(socket_path(args)).stop()
+    except (OSError, AgentError) as e:
+        print(f"Error: no agent at {socket_path(args)}: {e}")
+        return
+    print("Agent stopped.")
+
+
+def agent_command(args: argparse.Namespace):
+    """
+    Main dispatcher for 'agent' subcommands.
+    """
+    if args.agent_cmd == "start":
+        start_agent(args)
+    elif args.agent_cmd == "list":
+        list_agent(args)
+    elif args.agent_cmd == "stop":
+        stop_agent(args)
+    else:
+        print("Unknown sub-command for agent")
+        if hasattr(args, 'parser'):
+            args.parser.print_help()
+
+
+def register(subparsers):
+    """
+    Registers the 'agent' command with all its sub-commands.
+    """
+    manager_parser = subparsers.add_parser(
+        "agent",
+        help=f"Key agent that holds decrypted wallets and signs for later commands that have {AGENT_SOCK_ENV} set."
+    )
+    manager_parser.set_defaults(func=agent_command)
+
+    agent_subparsers = manager_parser.add_subparsers(dest="agent_cmd")
+
+    # start
+    start_parser = agent_subparsers.add_parser("start", help="Unlock wallets and serve signatures in the foreground.")
+    start_parser.add_argument("--ids", required=True, help="Wallets to unlock (comma separated with ranges).")
+    start_parser.add_argument("--ttl", type=int, default=DEFAULT_TTL, help="Seconds until the agent wipes its keys and exits (0 for until stopped).")
+    start_parser.add_argument("--socket", required=False, help=f"Socket path (defaults to ${AGENT_SOCK_ENV} or {default_socket_path()}).")
+
+    # list
+    list_parser = agent_subparsers.add_parser("list", help="List the wallets held by the agent.")
+    list_parser.add_argument("--socket", required=False, help="Socket path.")
+
+    # stop
+    stop_parser = agent_subparsers.add_parser("stop", help="Stop the agent and wipe its keys.")
+    stop_parser.add_argument("--socket", required=False, help="Socket path.")
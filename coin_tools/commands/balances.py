@@ -1,19 +1,30 @@
 import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from decimal import Decimal
 
+from solana.constants import LAMPORTS_PER_SOL
 from solders.pubkey import Pubkey as PublicKey #type: ignore
+from solders.signature import Signature #type: ignore
 
+from coin_tools.output import add_format_argument, emit, machine_output
 from coin_tools.pump_fun.coin_data import fetch_coin_data
 from coin_tools.utils import parse_ranges
 from coin_tools.db import (
     get_all_wallets,
+    get_balance_snapshots,
+    get_sol_exposure,
+    get_token_exposure,
+    get_token_metadata,
     get_wallet_by_id,
     get_wallets_by_ids,
     get_wallets_by_name_prefix,
+    upsert_balance_snapshots,
 )
 
-from coin_tools.solana.tokens import fetch_token_accounts, fetch_token_metadata
+from coin_tools.solana.tokens import fetch_token_account_amounts, fetch_token_accounts, fetch_token_accounts_at_slot, fetch_token_metadata
 from coin_tools.solana.utils import (
+    fetch_last_signature,
     fetch_sol_balance,
     fetch_token_balance,
     get_solana_client,
@@ -51,28 +62,60 @@ def print_token_balance(token_metadata, balance, coin_data = None, prefix="   ")
         print()
         print()
 
-coin_data_cache = {}
-
-def get_coin_data(client, mint_pubkey):
-    if mint_pubkey in coin_data_cache:
-        return coin_data_cache[mint_pubkey]
-
-    coin_data = fetch_coin_data(client, mint_pubkey)
-    coin_data_cache[mint_pubkey] = coin_data
-    return coin_data
+def select_wallets(args: argparse.Namespace) -> list[dict]:
+    """
+    Wallets matching --prefix and/or --ids, every wallet if neither is given.
+    """
+    if not args.prefix and not args.ids:
+        return get_all_wallets()
+    wallets = []
+    if args.prefix:
+        wallets += get_wallets_by_name_prefix(args.prefix)
+    if args.ids:
+        wallets += get_wallets_by_ids(parse_ranges(args.ids))
+    return wallets
+
+def holding_record(wallet: dict, mint, name: str, ticker: str, balance: Decimal, price: Decimal = None) -> dict:
+    return {
+        "wallet_id": wallet["id"],
+        "wallet_name": wallet["name"],
+        "public_key": wallet["public_key"],
+        "mint": str(mint) if mint else None,
+        "name": name,
+        "ticker": ticker,
+        "balance": balance,
+        "price_sol": price,
+        "value_sol": balance * price if price is not None else None,
+    }
+
+def stream_token_balances(client, wallets: list[dict], scan_wallet, token_pubkey: PublicKey, args: argparse.Namespace):
+    """
+    Emits one record per holding, SOL included, as each wallet's scan completes instead of printing at the end.
+    With --price a mint is priced the first time it shows up.
+    """
+    coin_data_by_mint = {}
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(scan_wallet, wallet): wallet for wallet in wallets}
+        for future in as_completed(futures):
+            wallet = futures[future]
+            sol_balance, token_accounts = future.result()
+            emit(holding_record(wallet, None, "Solana", "SOL", sol_balance, Decimal(1)))
+            for entry in token_accounts:
+                mint_pubkey = entry["mint_pubkey"]
+                if token_pubkey and token_pubkey != mint_pubkey:
+                    continue
+                price = None
+                if args.price:
+                    if mint_pubkey not in coin_data_by_mint:
+                        coin_data_by_mint[mint_pubkey] = fetch_coin_data(client, mint_pubkey)
+                    coin_data = coin_data_by_mint[mint_pubkey]
+                    price = Decimal(coin_data.price) if coin_data and coin_data.price else None
+                emit(holding_record(wallet, mint_pubkey, entry["token_name"], entry["token_ticker"], entry["real_balance"], price))
 
 def get_token_balance(args):
     client = get_solana_client()
 
-    if not args.prefix and not args.ids:
-        wallets = get_all_wallets()
-    else:
-        wallets = []
-        if args.prefix:
-            wallets += get_wallets_by_name_prefix(args.prefix)
-        
-        if args.ids:
-            wallets += get_wallets_by_ids(parse_ranges(args.ids))
+    wallets = select_wallets(args)
 
     if len(wallets) == 0:
         print("No wallets found.")
@@ -83,13 +126,30 @@ def get_token_balance(args):
     total_sol = Decimal(0)
     total_tokens = {}
 
-    for wallet in wallets:
+    def scan_wallet(wallet):
         wallet_pubkey = PublicKey.from_string(wallet["public_key"])
+        return fetch_sol_balance(client, wallet_pubkey), fetch_token_accounts(client, wallet_pubkey)
+
+    if machine_output():
+        stream_token_balances(client, wallets, scan_wallet, token_pubkey, args)
+        return
+
+    # Wallets are scanned in parallel, the shared RPC limiter decides how many requests are actually in flight
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        scans = list(executor.map(scan_wallet, wallets))
+
+        # Prices are fetched once per mint for both the per wallet listing and the totals
+        coin_data_by_mint = {}
+        if args.price:
+            mints = list(dict.fromkeys(
+                entry["mint_pubkey"] for _, token_accounts in scans for entry in token_accounts
+                if not token_pubkey or entry["mint_pubkey"] == token_pubkey
+            ))
+            coin_data_by_mint = dict(zip(mints, executor.map(lambda mint: fetch_coin_data(client, mint), mints)))
 
-        sol_balance = fetch_sol_balance(client, wallet_pubkey)
+    for wallet, (sol_balance, token_accounts) in zip(wallets, scans):
         total_sol += sol_balance
 
-        token_accounts = fetch_token_accounts(client, wallet_pubkey)
         token_data = {}
         total_token_value = 0
         for entry in token_accounts:
@@ -101,7 +161,7 @@ def get_token_balance(args):
 
             if args.list:
                 metadata = fetch_token_metadata(client, mint_pubkey)
-                coin_data = get_coin_data(client, mint_pubkey) if args.price else None
+                coin_data = coin_data_by_mint.get(mint_pubkey)
                 value = balance * coin_data.price if coin_data and coin_data.price else 0
                 total_token_value += value
                 token_data[mint_pubkey] = {"metadata": metadata, "balance": balance, "coin_data": coin_data}
@@ -133,7 +193,7 @@ def get_token_balance(args):
 
     for mint_pubkey, balance in total_tokens.items():
         metadata = fetch_token_metadata(client, mint_pubkey)
-        coin_data = get_coin_data(client, mint_pubkey) if args.price else None
+        coin_data = coin_data_by_mint.get(mint_pubkey)
         value = balance * coin_data.price if coin_data and coin_data.price else 0
         total_token_value += value
         token_data[mint_pubkey] = {"metadata": metadata, "balance": balance, "coin_data": coin_data}
@@ -152,6 +212,125 @@ def get_token_balance(args):
         
 
 
+def snapshot_wallet(client, wallet: dict) -> dict:
+    """
+    Reads a wallet's SOL and token balances from the chain into a snapshot row, each stamped with the slot it was read at.
+    The newest signature is only kept if it is no newer than both reads,
+    otherwise a balance may predate it and the next refresh rescans the wallet.
+    """
+    wallet_pubkey = PublicKey.from_string(wallet["public_key"])
+    resp = client.get_balance(wallet_pubkey)
+    slot = resp.context.slot
+    token_slot, token_accounts = fetch_token_accounts_at_slot(client, wallet_pubkey)
+    tokens = [{
+        "token_account": str(entry["token_account"]),
+        "mint": str(entry["mint_pubkey"]),
+        "amount": entry["amount"],
+        "decimals": entry["decimals"],
+        "slot": token_slot,
+    } for entry in token_accounts]
+    newest = fetch_last_signature(client, wallet_pubkey)
+    return {
+        "wallet_id": wallet["id"],
+        "public_key": wallet["public_key"],
+        "lamports": resp.value,
+        "last_signature": newest[0] if newest and newest[1] <= min(slot, token_slot) else None,
+        "slot": slot,
+        "tokens": tokens,
+    }
+
+def find_changed_wallets(client, wallets: list[dict], snapshots: dict[int, dict], workers: int) -> set[int]:
+    """
+    IDs of the wallets whose snapshot may be stale: never snapshotted, referenced by a transaction newer than the
+    snapshot's last signature (SOL transfers, trades, new token accounts), or holding a token account whose amount
+    moved. Incoming token transfers only reference the token account, so those amounts are compared in batched reads.
+    """
+    changed = {wallet["id"] for wallet in wallets if wallet["id"] not in snapshots}
+    known = [wallet for wallet in wallets if wallet["id"] in snapshots]
+
+    def has_new_transactions(wallet):
+        last_signature = snapshots[wallet["id"]]["last_signature"]
+        until = Signature.from_string(last_signature) if last_signature else None
+        return fetch_last_signature(client, PublicKey.from_string(wallet["public_key"]), until) is not None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for wallet, new_transactions in zip(known, executor.map(has_new_transactions, known)):
+            if new_transactions:
+                changed.add(wallet["id"])
+
+    tokens = [(wallet["id"], token) for wallet in known if wallet["id"] not in changed for token in snapshots[wallet["id"]]["tokens"]]
+    amounts = fetch_token_account_amounts(client, [PublicKey.from_string(token["token_account"]) for _, token in tokens])
+    for (wallet_id, token), amount in zip(tokens, amounts):
+        if amount != token["amount"]:
+            changed.add(wallet_id)
+    return changed
+
+def snapshot_balances(args: argparse.Namespace):
+    """
+    Records the SOL and token balances of the wallets in SQLite for `balances exposure`.
+    With --refresh only wallets that changed since their snapshot are read again.
+    """
+    client = get_solana_client()
+
+    wallets = select_wallets(args)
+    if len(wallets) == 0:
+        print("No wallets found.")
+        return
+
+    start = time.time()
+    if args.refresh:
+        snapshots = get_balance_snapshots([wallet["id"] for wallet in wallets])
+        changed = find_changed_wallets(client, wallets, snapshots, args.workers)
+        stale = [wallet for wallet in wallets if wallet["id"] in changed]
+    else:
+        stale = wallets
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        snapshots = list(executor.map(lambda wallet: snapshot_wallet(client, wallet), stale))
+    upsert_balance_snapshots(snapshots)
+
+    slots = [snapshot["slot"] for snapshot in snapshots]
+    print(f"Snapshotted {len(snapshots)} wallets, {len(wallets) - len(stale)} unchanged, in {time.time() - start:.2f}s"
+          + (f" (slots {min(slots)}-{max(slots)})." if slots else "."))
+
+def print_exposure(args: argparse.Namespace):
+    """
+    Totals held across the snapshotted wallets, answered from SQLite without any RPC call.
+    """
+    wallet_ids = [wallet["id"] for wallet in select_wallets(args)] if args.prefix or args.ids else None
+    sol = get_sol_exposure(wallet_ids)
+    if sol["wallets"] == 0:
+        print("No balance snapshots, run `balances snapshot` first.")
+        return
+
+    print(f"Snapshotted Wallets: {sol['wallets']}   Slots: {sol['min_slot']}-{sol['max_slot']}")
+    print(f"Total SOL Balance: {Decimal(sol['lamports']) / Decimal(LAMPORTS_PER_SOL):.6f} SOL")
+    print()
+
+    exposures = get_token_exposure(args.ca, wallet_ids)
+    if machine_output():
+        known_tokens = get_token_metadata()
+        emit({"mint": None, "name": "Solana", "ticker": "SOL", "balance": Decimal(sol["lamports"]) / Decimal(LAMPORTS_PER_SOL),
+              "holders": sol["wallets"], "min_slot": sol["min_slot"], "max_slot": sol["max_slot"]})
+        for exposure in exposures:
+            metadata = known_tokens.get(exposure["mint"], {})
+            emit({"mint": exposure["mint"], "name": metadata.get("name"), "ticker": metadata.get("symbol"),
+                  "balance": Decimal(exposure["amount"]) / Decimal(10) ** exposure["decimals"],
+                  "holders": exposure["holders"], "min_slot": exposure["min_slot"], "max_slot": exposure["max_slot"]})
+        return
+
+    if not exposures:
+        print(f"No snapshotted wallet holds {args.ca}." if args.ca else "No token balances.")
+        return
+
+    known_tokens = get_token_metadata()
+    print("Token Exposure:")
+    for exposure in exposures:
+        metadata = known_tokens.get(exposure["mint"], {})
+        balance = Decimal(exposure["amount"]) / Decimal(10) ** exposure["decimals"]
+        print(f"   {metadata.get('name', 'Unknown')} ({metadata.get('symbol', '?')})   CA: {exposure['mint']}")
+        print(f"   {'Balance:':<10} {balance:<20} {'Holders:':<10} {exposure['holders']:<8} Slots: {exposure['min_slot']}-{exposure['max_slot']}\n")
+
 def balances_command(args: argparse.Namespace):
     """
     Main dispatcher for 'balances' subcommands.
@@ -160,6 +339,10 @@ def balances_command(args: argparse.Namespace):
         get_sol_balance(args)
     elif args.balances_cmd == "get-token-balance":
         get_token_balance(args)
+    elif args.balances_cmd == "snapshot":
+        snapshot_balances(args)
+    elif args.balances_cmd == "exposure":
+        print_exposure(args)
     else:
         print("Unknown sub-command for balances")
         if hasattr(args, 'parser'):
@@ -195,4 +378,25 @@ def register(subparsers):
     get_token_parser.add_argument("--ids", required=False, help="Find wallets by ids (comma separated with ranges).")
     get_token_parser.add_argument("--ca", required=False, help="Token contract/mint address (CA).")
     get_token_parser.add_argument("--price", action="store_true", help="Pull pricing information for the token (if available, only for pump_fun currently).")
+    get_token_parser.add_argument("--workers", type=int, default=32, help="Wallets scanned in parallel, RPC concurrency adapts below this.")
+    add_format_argument(get_token_parser)
 
+    # snapshot
+    snapshot_parser = balances_subparsers.add_parser(
+        "snapshot",
+        help="Record wallet balances in the DB for `balances exposure`."
+    )
+    snapshot_parser.add_argument("--prefix", required=False, help="Find wallets by name (case insensitive prefix).")
+    snapshot_parser.add_argument("--ids", required=False, help="Find wallets by ids (comma separated with ranges).")
+    snapshot_parser.add_argument("--refresh", action="store_true", help="Only re-read wallets with transactions or token balance changes since their snapshot.")
+    snapshot_parser.add_argument("--workers", type=int, default=32, help="Wallets read in parallel, RPC concurrency adapts below this.")
+
+    # exposure
+    exposure_parser = balances_subparsers.add_parser(
+        "exposure",
+        help="Total SOL and token holdings from the balance snapshots (no RPC calls)."
+    )
+    exposure_parser.add_argument("--ca", required=False, help="Token contract/mint address (CA), all tokens if not given.")
+    exposure_parser.add_argument("--prefix", required=False, help="Only wallets with this name prefix (case insensitive).")
+    exposure_parser.add_argument("--ids", required=False, help="Only these wallet ids (comma separated with ranges).")
+    add_format_argument(exposure_parser)
@@ -0,0 +1,219 @@
+import argparse
+import traceback
+
+from solana.constants import SYSTEM_PROGRAM_ID
+from solana.rpc.commitment import Confirmed, Finalized
+from solana.rpc.types import TxOpts
+from solders.pubkey import Pubkey as PublicKey  #type: ignore
+from solders.system_program import (  #type: ignore
+    CreateLookupTableParams,
+    ExtendLookupTableParams,
+    create_lookup_table,
+    extend_lookup_table,
+)
+from solders.address_lookup_table_account import LOOKUP_TABLE_MAX_ADDRESSES  #type: ignore
+from spl.token.constants import ASSOCIATED_TOKEN_PROGRAM_ID, TOKEN_PROGRAM_ID
+from spl.token.instructions import get_associated_token_address
+
+from coin_tools.utils import parse_ranges
+from coin_tools.db import get_lookup_tables, upsert_lookup_table
+from coin_tools.keyring import Keyring
+from coin_tools.pump_fun.coin_data import derive_bonding_curve_accounts
+from coin_tools.pump_fun.constants import STATIC_ACCOUNTS
+from coin_tools.solana.lookup_tables import MAX_EXTEND_ADDRESSES, fetch_lookup_table_addresses
+from coin_tools.solana.utils import get_solana_client, send_transaction
+
+
+def find_lookup_table(ref: str):
+    for table in get_lookup_tables():
+        if ref in (table["name"], table["address"]):
+            return table
+    return None
+
+
+def create_table(args: argparse.Namespace, keyring: Keyring):
+    authority_wallet = keyring.wallet(args.authority_id)
+    if not authority_wallet:
+        print(f"No wallet found with ID={args.authority_id}")
+        return
+
+    try:
+        authority_keypair = keyring.keypair(args.authority_id)
+    except Exception as e:
+        print(f"Error decrypting private key: {e}")
+        traceback.print_exc()
+        return
+
+    client = get_solana_client()
+    authority_pubkey = authority_keypair.pubkey()
+
+    try:
+        recent_slot = client.get_slot(Finalized).value
+        create_ix, table_pubkey = create_lookup_table(CreateLookupTableParams(
+            authority_address=authority_pubkey,
+            payer_address=authority_pubkey,
+            recent_slot=recent_slot
+        ))
+        txn_signature = send_transaction(client, authority_keypair, [create_ix], opts=TxOpts(skip_confirmation=False, preflight_commitment=Confirmed))
+        upsert_lookup_table(str(table_pubkey), args.name, args.authority_id, [])
+        print(f"Lookup table '{args.name}' created: {table_pubkey}")
+        print(f"Signature: {txn_signature}")
+    except Exception as e:
+        print(f"Error creating lookup table: {e}")
+        traceback.print_exc()
+
+
+def extend_table(args: argparse.Namespace, keyring: Keyring):
+    """
+    Adds wallets, their token accounts for a mint, the mint's bonding curve and the static pump.fun accounts to a lookup table.
+    """
+    table = find_lookup_table(args.table)
+    if not table:
+        print(f"Unknown lookup table {args.table}.")
+        return
+
+    new_addresses = []
+    if args.pump_fun:
+        new_addresses += STATIC_ACCOUNTS + [SYSTEM_PROGRAM_ID, TOKEN_PROGRAM_ID, ASSOCIATED_TOKEN_PROGRAM_ID]
+
+    wallets = keyring.load(parse_ranges(args.ids)) if args.ids else []
+    owners = [PublicKey.from_string(w["public_key"]) for w in wallets]
+    new_addresses += owners
+
+    if args.ca:
+        mint_pubkey = PublicKey.from_string(args.ca)
+        bonding_curve, associated_bonding_curve = derive_bonding_curve_accounts(mint_pubkey)
+        new_addresses += [mint_pubkey, bonding_curve, associated_bonding_curve]
+        new_addresses += [get_associated_token_address(owner=owner, mint=mint_pubkey) for owner in owners]
+
+    existing = set(table["addresses"])
+    to_add = []
+    for address in new_addresses:
+        if str(address) not in existing:
+            existing.add(str(address))
+            to_add.append(address)
+
+    if not to_add:
+        print("Nothing to add.")
+        return
+
+    if len(table["addresses"]) + len(to_add) > LOOKUP_TABLE_MAX_ADDRESSES:
+        print(f"Error: Lookup table can hold {LOOKUP_TABLE_MAX_ADDRESSES} addresses, it has {len(table['addresses'])} and {len(to_add)} would be added.")
+        return
+
+    try:
+        authority_keypair = keyring.keypair(table["authority_wallet_id"])
+    except Exception as e:
+        print(f"Error decrypting private key: {e}")
+        traceback.print_exc()
+        return
+
+    client = get_solana_client()
+    table_pubkey = PublicKey.from_string(table["address"])
+    addresses = list(table["addresses"])
+
+    for i in range(0, len(to_add), MAX_EXTEND_ADDRESSES):
+        chunk = to_add[i:i + MAX_EXTEND_ADDRESSES]
+        extend_ix = extend_lookup_table(ExtendLookupTableParams(
+            payer_address=authority_keypair.pubkey(),
+            lookup_table_address=table_pubkey,
+            authority_address=authority_keypair.pubkey(),
+            new_addresses=chunk
+        ))
+        try:
+            txn_signature = send_transaction(client, authority_keypair, [extend_ix], opts=TxOpts(skip_confirmation=False, preflight_commitment=Confirmed))
+        except Exception as e:
+            print(f"Error extending lookup table: {e}")
+            traceback.print_exc()
+            return
+
+        addresses += [str(address) for address in chunk]
+        upsert_lookup_table(table["address"], table["name"], table["authority_wallet_id"], addresses)
+        print(f"Added {len(chunk)} addresses. Signature: {txn_signature}")
+
+    print(f"Lookup table '{table['name']}' now holds {len(addresses)} addresses, new entries are usable from the next slot.")
+
+
+def sync_table(args: argparse.Namespace):
+    """
+    Refreshes the DB cache of a lookup table from the blockchain, adding it to the cache if it is not there.
+    """
+    table = find_lookup_table(args.table)
+    address = table["address"] if table else args.table
+    client = get_solana_client()
+
+    try:
+        addresses = fetch_lookup_table_addresses(client, PublicKey.from_string(address))
+    except Exception as e:
+        print(f"Error fetching lookup table: {e}")
+        return
+
+    name = args.name or (table["name"] if table else address)
+    authority_wallet_id = args.authority_id or (table["authority_wallet_id"] if table else 0)
+    upsert_lookup_table(address, name, authority_wallet_id, [str(a) for a in addresses])
+    print(f"Lookup table '{name}' synced, {len(addresses)} addresses.")
+
+
+def list_tables(args: argparse.Namespace):
+    tables = get_lookup_tables()
+    if not tables:
+        print("No lookup tables found.")
+        return
+
+    for table in tables:
+        print(f"Name: {table['name']}, Address: {table['address']}, Authority Wallet ID: {table['authority_wallet_id']}, "
+              f"Addresses: {len(table['addresses'])}, Updated: {table['updated_timestamp']}")
+
+
+def lookup_tables_command(args: argparse.Namespace):
+    """
+    Main dispatcher for 'lookup-tables' subcommands.
+    """
+    # Keys decrypted for this command are wiped when it returns
+    with Keyring() as keyring:
+        if args.lookup_tables_cmd == "create":
+            create_table(args, keyring)
+        elif args.lookup_tables_cmd == "extend":
+            extend_table(args, keyring)
+        elif args.lookup_tables_cmd == "sync":
+            sync_table(args)
+        elif args.lookup_tables_cmd == "list":
+            list_tables(args)
+        else:
+            print("Unknown sub-command for lookup-tables")
+            if hasattr(args, 'parser'):
+                args.parser.print_help()
+
+
+def register(subparsers):
+    """
+    Registers the 'lookup-tables' command with all its sub-commands.
+    """
+    manager_parser = subparsers.add_parser(
+        "lookup-tables",
+        help="Manage address lookup tables used to pack more instructions into v0 transactions."
+    )
+    manager_parser.set_defaults(func=lookup_tables_command)
+
+    lookup_tables_subparsers = manager_parser.add_subparsers(dest="lookup_tables_cmd")
+
+    # create
+    create_parser = lookup_tables_subparsers.add_parser("create", help="Create a new lookup table.")
+    create_parser.add_argument("--authority-id", type=int, required=True, help="Wallet ID that owns and pays for the table.")
+    create_parser.add_argument("--name", required=True, help="Name of the table.")
+
+    # extend
+    extend_parser = lookup_tables_subparsers.add_parser("extend", help="Add addresses to a lookup table.")
+    extend_parser.add_argument("--table", required=True, help="Lookup table name or address.")
+    extend_parser.add_argument("--ids", required=False, help="Add these wallets (comma separated with ranges).")
+    extend_parser.add_argument("--ca", required=False, help="Add the mint, its bonding curve and the --ids wallets' token accounts for it.")
+    extend_parser.add_argument("--pump-fun", action="store_true", help="Add the static pump.fun and program accounts.")
+
+    # sync
+    sync_parser = lookup_tables_subparsers.add_parser("sync", help="Refresh the cached addresses of a lookup table from the blockchain.")
+    sync_parser.add_argument("--table", required=True, help="Lookup table name or address.")
+    sync_parser.add_argument("--name", required=False, help="Name to cache the table under.")
+    sync_parser.add_argument("--authority-id", type=int, required=False, help="Wallet ID of the table authority.")
+
+    # list
+    lookup_tables_subparsers.add_parser("list", help="List cached lookup tables.")
@@ -0,0 +1,261 @@
+import argparse
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+
+from solana.constants import LAMPORTS_PER_SOL
+from solana.rpc.commitment import Confirmed
+from solana.rpc.types import TxOpts
+from solders.keypair import Keypair #type: ignore
+from solders.pubkey import Pubkey as PublicKey  #type: ignore
+from solders.system_program import (  #type: ignore
+    AdvanceNonceAccountParams,
+    WithdrawNonceAccountParams,
+    advance_nonce_account,
+    create_nonce_account,
+    withdraw_nonce_account,
+)
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price  # type: ignore
+
+from coin_tools.utils import parse_ranges, parse_unit_limit, parse_unit_price
+from coin_tools.db import get_nonce_accounts, insert_nonce_account, update_wallet_access_time
+from coin_tools.keyring import Keyring
+from coin_tools.solana.compute import resolve_unit_limit
+from coin_tools.solana.fees import resolve_unit_price
+from coin_tools.solana.utils import (
+    MAX_COMPUTE_UNITS,
+    NONCE_ACCOUNT_SIZE,
+    fetch_multiple_lamports,
+    fetch_nonces,
+    fetch_rent_exempt_minimum,
+    get_solana_client,
+    pack_instruction_groups,
+    send_transaction
+)
+
+
+def create_nonces(args: argparse.Namespace, keyring: Keyring):
+    """
+    Creates a durable nonce account for each wallet, with the wallet as the nonce authority.
+    Rent is paid by --payer-id in packed transactions, or by each wallet itself.
+    With --force an existing nonce account is closed in the transaction creating its replacement, its rent goes back to the wallet.
+    """
+    wallets = keyring.load(parse_ranges(args.ids))
+    if not wallets:
+        print("Error: Wallet(s) not found.")
+        return
+
+    existing = get_nonce_accounts([w["id"] for w in wallets])
+    if not args.force:
+        wallets = [w for w in wallets if w["id"] not in existing]
+    if not wallets:
+        print("All wallets already have nonce accounts.")
+        return
+
+    payer_wallet = None
+    if args.payer_id:
+        payer_wallet = keyring.wallet(args.payer_id)
+        if not payer_wallet:
+            print(f"No wallet found with ID={args.payer_id}")
+            return
+
+    client = get_solana_client()
+    lamports = fetch_rent_exempt_minimum(client, NONCE_ACCOUNT_SIZE)
+    print(f"Creating {len(wallets)} nonce accounts, {len(wallets) * lamports / LAMPORTS_PER_SOL} SOL in rent.")
+
+    # Nonce accounts being replaced, accounts already gone from the chain have nothing to close
+    replaced = {w["id"]: PublicKey.from_string(existing[w["id"]]) for w in wallets if w["id"] in existing}
+    replaced_lamports = dict(zip(replaced, fetch_multiple_lamports(client, list(replaced.values()))))
+    replaced = {wallet_id: pubkey for wallet_id, pubkey in replaced.items() if replaced_lamports[wallet_id]}
+    if replaced:
+        print(f"Closing {len(replaced)} replaced nonce accounts, {sum(replaced_lamports[i] for i in replaced) / LAMPORTS_PER_SOL} SOL back to their wallets.")
+
+    try:
+        payer_keypair = keyring.keypair(args.payer_id) if payer_wallet else None
+        keypairs = {}
+        for wallet in wallets:
+            # Wallets sign as fee payer without --payer-id, and as nonce authority to close a replaced account
+            if not payer_wallet or wallet["id"] in replaced:
+                keypairs[wallet["id"]] = keyring.keypair(wallet["id"])
+    except Exception as e:
+        print(f"Error decrypting private key: {e}")
+        traceback.print_exc()
+        return
+
+    nonce_keypairs = {w["id"]: Keypair() for w in wallets}
+    fee_payer = payer_keypair or keypairs[wallets[0]["id"]]
+    unit_price = resolve_unit_price(client, args.unit_price, [fee_payer.pubkey()])
+    # The limit is set per transaction once its shape is known, packing uses a placeholder of the same size
+    prefix = [
+        set_compute_unit_limit(MAX_COMPUTE_UNITS),
+        set_compute_unit_price(unit_price)
+    ]
+    txn_opts = TxOpts(skip_confirmation=False, preflight_commitment=Confirmed)
+
+    def create_instructions(wallet, payer_pubkey):
+        instructions = []
+        if wallet["id"] in replaced:
+            wallet_pubkey = PublicKey.from_string(wallet["public_key"])
+            instructions.append(withdraw_nonce_account(WithdrawNonceAccountParams(
+                nonce_pubkey=replaced[wallet["id"]],
+                authorized_pubkey=wallet_pubkey,
+                to_pubkey=wallet_pubkey,
+                lamports=replaced_lamports[wallet["id"]]
+            )))
+        return instructions + list(create_nonce_account(
+            payer_pubkey,
+            nonce_keypairs[wallet["id"]].pubkey(),
+            PublicKey.from_string(wallet["public_key"]),
+            lamports
+        ))
+
+    # Each job is (wallets, fee payer keypair)
+    jobs = []
+    if payer_keypair:
+        groups = [create_instructions(w, payer_keypair.pubkey()) for w in wallets]
+        offset = 0
+        for batch in pack_instruction_groups(payer_keypair.pubkey(), groups, prefix=prefix):
+            jobs.append((wallets[offset:offset + len(batch)], payer_keypair))
+            offset += len(batch)
+    else:
+        jobs = [([w], keypairs[w["id"]]) for w in wallets]
+
+    def run_job(job):
+        job_wallets, fee_payer = job
+        body = [ix for w in job_wallets for ix in create_instructions(w, fee_payer.pubkey())]
+        unit_limit = resolve_unit_limit(client, args.unit_limit, fee_payer.pubkey(), body)
+        instructions = [set_compute_unit_limit(unit_limit), set_compute_unit_price(unit_price)] + body
+        signers = [nonce_keypairs[w["id"]] for w in job_wallets]
+        signers += [keypairs[w["id"]] for w in job_wallets if w["id"] in replaced and keypairs[w["id"]].pubkey() != fee_payer.pubkey()]
+        return send_transaction(client, fee_payer, instructions, signers=signers, opts=txn_opts)
+
+    created = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for job, future in [(job, executor.submit(run_job, job)) for job in jobs]:
+            job_wallets = job[0]
+            try:
+                txn_signature = future.result()
+                for wallet in job_wallets:
+                    insert_nonce_account(wallet["id"], str(nonce_keypairs[wallet["id"]].pubkey()))
+                    update_wallet_access_time(wallet["id"])
+                created += len(job_wallets)
+                print(f"Created nonce accounts for wallet IDs {', '.join(str(w['id']) for w in job_wallets)}. Signature: {txn_signature}")
+            except Exception as e:
+                print(f"Error creating nonce accounts for wallet IDs {', '.join(str(w['id']) for w in job_wallets)}: {e}")
+
+    print(f"Created {created} of {len(wallets)} nonce accounts.")
+
+
+def list_nonces(args: argparse.Namespace):
+    nonce_accounts = get_nonce_accounts(parse_ranges(args.ids) if args.ids else None)
+    if not nonce_accounts:
+        print("No nonce accounts found.")
+        return
+
+    client = get_solana_client()
+    wallet_ids = list(nonce_accounts.keys())
+    nonces = fetch_nonces(client, [PublicKey.from_string(nonce_accounts[i]) for i in wallet_ids])
+    for wallet_id, nonce in zip(wallet_ids, nonces):
+        print(f"Wallet ID: {wallet_id}, Nonce Account: {nonce_accounts[wallet_id]}, Nonce: {nonce if nonce else 'Not initialized'}")
+
+
+def advance_nonces(args: argparse.Namespace, keyring: Keyring):
+    """
+    Advances the nonce of each wallet, invalidating any transactions pre-signed against the current nonce.
+    """
+    wallets = keyring.load(parse_ranges(args.ids))
+    nonce_accounts = get_nonce_accounts([w["id"] for w in wallets])
+    wallets = [w for w in wallets if w["id"] in nonce_accounts]
+    if not wallets:
+        print("No nonce accounts found.")
+        return
+
+    client = get_solana_client()
+    unit_price = resolve_unit_price(client, args.unit_price, [PublicKey.from_string(nonce_accounts[wallets[0]["id"]])])
+    try:
+        authority = PublicKey.from_string(wallets[0]["public_key"])
+        unit_limit = resolve_unit_limit(client, args.unit_limit, authority, [advance_nonce_account(AdvanceNonceAccountParams(
+            nonce_pubkey=PublicKey.from_string(nonce_accounts[wallets[0]["id"]]),
+            authorized_pubkey=authority
+        ))])
+    except Exception as e:
+        print(f"Error sizing compute unit limit: {e}")
+        return
+
+    try:
+        keypairs = {w["id"]: keyring.keypair(w["id"]) for w in wallets}
+    except Exception as e:
+        print(f"Error decrypting private key: {e}")
+        traceback.print_exc()
+        return
+
+    def advance(wallet):
+        keypair = keypairs[wallet["id"]]
+        instructions = [
+            set_compute_unit_limit(unit_limit),
+            set_compute_unit_price(unit_price),
+            advance_nonce_account(AdvanceNonceAccountParams(
+                nonce_pubkey=PublicKey.from_string(nonce_accounts[wallet["id"]]),
+                authorized_pubkey=keypair.pubkey()
+            ))
+        ]
+        return send_transaction(client, keypair, instructions, should_confirm=args.confirm)
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for wallet, future in [(w, executor.submit(advance, w)) for w in wallets]:
+            try:
+                print(f"Advanced nonce for wallet ID {wallet['id']}. Signature: {future.result()}")
+            except Exception as e:
+                print(f"Error advancing nonce for wallet ID {wallet['id']}: {e}")
+
+
+def nonces_command(args: argparse.Namespace):
+    """
+    Main dispatcher for 'nonces' subcommands.
+    """
+    # Keys decrypted for this command are wiped when it returns
+    with Keyring() as keyring:
+        if args.nonces_cmd == "create":
+            create_nonces(args, keyring)
+        elif args.nonces_cmd == "list":
+            list_nonces(args)
+        elif args.nonces_cmd == "advance":
+            advance_nonces(args, keyring)
+        else:
+            print("Unknown sub-command for nonces")
+            if hasattr(args, 'parser'):
+                args.parser.print_help()
+
+
+def register(subparsers):
+    """
+    Registers the 'nonces' command with all its sub-commands.
+    """
+    manager_parser = subparsers.add_parser(
+        "nonces",
+        help="Manage durable nonce accounts so transactions can be signed long before sending."
+    )
+    manager_parser.set_defaults(func=nonces_command)
+
+    nonces_subparsers = manager_parser.add_subparsers(dest="nonces_cmd")
+
+    # create
+    create_parser = nonces_subparsers.add_parser("create", help="Create a nonce account for each wallet.")
+    create_parser.add_argument("--ids", required=True, help="Comma separated list of wallet ID's.")
+    create_parser.add_argument("--payer-id", type=int, required=False, help="Wallet ID paying rent and fees (defaults to each wallet).")
+    create_parser.add_argument("--force", action="store_true", help="Replace existing nonce accounts, closing them and returning their rent to the wallet.")
+    create_parser.add_argument("--workers", type=int, default=8, help="Maximum transactions in flight.")
+    create_parser.add_argument("--unit-limit", type=parse_unit_limit, default=100_000, help="Unit limit, or 'auto' to size it from a simulation of each transaction shape")
+    create_parser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
+
+    # list
+    list_parser = nonces_subparsers.add_parser("list", help="List nonce accounts and their current nonce.")
+    list_parser.add_argument("--ids", required=False, help="Comma separated list of wallet ID's.")
+
+    # advance
+    advance_parser = nonces_subparsers.add_parser("advance", help="Advance nonces, invalidating transactions signed against them.")
+    advance_parser.add_argument("--ids", required=True, help="Comma separated list of wallet ID's.")
+    advance_parser.add_argument("--confirm", action="store_true", help="Confirm Transactions.")
+    advance_parser.add_argument("--workers", type=int, default=8, help="Maximum transactions in flight.")
+    advance_parser.add_argument("--unit-limit", type=parse_unit_limit, default=100_000, help="Unit limit, or 'auto' to size it from a simulation of each transaction shape")
+    advance_parser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
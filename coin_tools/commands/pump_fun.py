@@ -1,24 +1,42 @@
 import argparse
+import time
 import traceback
 import random
 from decimal import Decimal
 from solders.pubkey import Pubkey as PublicKey  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
 
-from coin_tools.encryption import decrypt_data
-
-from coin_tools.db import get_wallet_by_id, update_wallet_access_time, get_wallets_by_ids
+from coin_tools.agent import AGENT_SOCK_ENV
+from coin_tools.db import get_nonce_accounts, update_wallet_access_time
+from coin_tools.keyring import Keyring
+from coin_tools.output import add_format_argument, emit_result
 from coin_tools.pump_fun.buy import buy as pumpfun_buy
 from coin_tools.pump_fun.sell import sell as pumpfun_sell
-from coin_tools.utils import randomize_by_percentage, random_delay_from_range, parse_ranges
+from coin_tools.utils import randomize_by_percentage, random_delay_from_range, parse_ranges, parse_unit_limit, parse_unit_price
 
 from coin_tools.pump_fun.coin_data import fetch_coin_data
+from coin_tools.pump_fun.pipeline import (
+  assign_bundles,
+  load_signed_transactions,
+  plan_buys,
+  save_signed_transactions,
+  sign_planned_buys,
+  size_planned_buys
+)
+from coin_tools.pump_fun.constants import FEE_RECIPIENT
+from coin_tools.solana.broadcast import print_broadcast_report
+from coin_tools.solana.bundles import send_bundle
+from coin_tools.solana.fees import resolve_unit_price
+from coin_tools.solana.tokens import fetch_token_accounts_exist
 from coin_tools.solana.utils import (
   APPROX_RENT,
   get_solana_client,
-  parse_private_key_bytes,
+  fetch_nonces,
   fetch_sol_balance,
-  fetch_token_balance
+  fetch_token_balance,
+  send_signed_transactions
 )
+from coin_tools.tracing import span
 
 
 def get_data(args: argparse.Namespace):
@@ -46,17 +64,17 @@ def get_data(args: argparse.Namespace):
     print(f"   Complete: {coin_data.complete}")
 
 
-def buy(args: argparse.Namespace):
-    wallet = get_wallet_by_id(args.id)
+def buy(args: argparse.Namespace, keyring: Keyring):
+    wallet = keyring.wallet(args.id)
     if not wallet:
         print(f"No wallet found with ID={args.id}")
         return
     try:
       mint_pubkey = PublicKey.from_string(args.ca)
-      from_private_key = decrypt_data(wallet["private_key_encrypted"])
-      buyer_keypair = parse_private_key_bytes(from_private_key)
+      buyer_keypair = keyring.keypair(args.id)
     except Exception as e:
         print(f"Error parsing keypair: {e}")
+        emit_result(args.id, wallet["public_key"], "buy", args.amount_in_sol, "SOL", error=e)
         return
     
     client = get_solana_client()
@@ -70,17 +88,20 @@ def buy(args: argparse.Namespace):
                                   args.unit_limit, 
                                   args.unit_price, 
                                   args.confirm,
-                                  args.jito_tip)
+                                  args.jito_tip,
+                                  args.rebroadcast)
       print(f"Transaction Sent: {args.amount_in_sol} SOL to buy {args.ca}. Signature: {txn_signature}")
+      emit_result(args.id, wallet["public_key"], "buy", args.amount_in_sol, "SOL", txn_signature)
       update_wallet_access_time(args.id)
     except Exception as e:
       print(f"Error buying token: {e}")
       traceback.print_exc()
+      emit_result(args.id, wallet["public_key"], "buy", args.amount_in_sol, "SOL", error=e)
       return
     
 
-def sell(args: argparse.Namespace):
-    wallet = get_wallet_by_id(args.id)
+def sell(args: argparse.Namespace, keyring: Keyring):
+    wallet = keyring.wallet(args.id)
 
     if not wallet:
         print(f"No wallet found with ID={args.id}")
@@ -88,10 +109,10 @@ def sell(args: argparse.Namespace):
     
     try:
       mint_pubkey = PublicKey.from_string(args.ca)
-      from_private_key = decrypt_data(wallet["private_key_encrypted"])
-      seller_keypair = parse_private_key_bytes(from_private_key)
+      seller_keypair = keyring.keypair(args.id)
     except Exception as e:
         print(f"Error parsing keypair: {e}")
+        emit_result(args.id, wallet["public_key"], "sell", args.amount_in_token, args.ca, error=e)
         return
     
     client = get_solana_client()
@@ -105,25 +126,199 @@ def sell(args: argparse.Namespace):
                                    args.unit_limit, 
                                    args.unit_price, 
                                    args.confirm,
-                                   args.jito_tip)
+                                   args.jito_tip,
+                                   args.rebroadcast)
       print(f"Transaction Sent: {args.amount_in_token} of {args.ca} sold. Signature: {txn_signature}")
+      emit_result(args.id, wallet["public_key"], "sell", args.amount_in_token, args.ca, txn_signature)
       update_wallet_access_time(args.id)
     except Exception as e:
       print(f"Error selling token: {e}")
       traceback.print_exc()
+      emit_result(args.id, wallet["public_key"], "sell", args.amount_in_token, args.ca, error=e)
+      return
+
+
+def bulk_buy_presigned(args: argparse.Namespace, buyer_wallets: list[dict]):
+    """
+    Builds and signs every wallet's buy up front in a process pool, then bursts them out at --send-rate.
+    """
+    if args.random_delays:
+      print("Warning: --random-delays is ignored with --presign, use --send-rate to pace sends.")
+
+    client = get_solana_client()
+    mint_pubkey = PublicKey.from_string(args.ca)
+    coin_data = fetch_coin_data(client, mint_pubkey)
+
+    if coin_data is None or coin_data.complete:
+        print("Error: This token has bonded and no longer tradeable on pump.fun")
+        return
+
+    amounts_in_sol = []
+    for _ in buyer_wallets:
+      amounts_in_sol.append(randomize_by_percentage(args.amount_in_sol, args.randomize) if args.randomize else args.amount_in_sol)
+
+    owners = [PublicKey.from_string(w['public_key']) for w in buyer_wallets]
+    with span("ata_check", count=len(owners)):
+      ata_exists = fetch_token_accounts_exist(client, owners, mint_pubkey)
+    with span("quote", count=len(buyer_wallets)):
+      plans = plan_buys(coin_data, buyer_wallets, amounts_in_sol, ata_exists, args.slippage)
+
+    recent_blockhash = None
+    last_valid_block_height = None
+    if args.use_nonce:
+      # Signed against durable nonces, transactions stay valid until the nonce is advanced
+      nonce_accounts = get_nonce_accounts([w['id'] for w in buyer_wallets])
+      missing = [str(w['id']) for w in buyer_wallets if w['id'] not in nonce_accounts]
+      if missing:
+        print(f"Error: No nonce account for wallet IDs {', '.join(missing)}, create them with `nonces create`.")
+        return
+
+      nonces = fetch_nonces(client, [PublicKey.from_string(nonce_accounts[plan.wallet_id]) for plan in plans])
+      for plan, nonce in zip(plans, nonces):
+        if nonce is None:
+          print(f"Error: Nonce account for wallet ID {plan.wallet_id} is not initialized.")
+          return
+        plan.nonce_account = nonce_accounts[plan.wallet_id]
+        plan.nonce = str(nonce)
+    else:
+      # One blockhash for the whole plan, signed transactions stay valid for roughly a minute
+      latest_blockhash = client.get_latest_blockhash().value
+      recent_blockhash = latest_blockhash.blockhash
+      last_valid_block_height = latest_blockhash.last_valid_block_height
+
+    unit_price = resolve_unit_price(client, args.unit_price, [coin_data.bonding_curve, FEE_RECIPIENT])
+    if args.bundle:
+      # A real tip transfer replaces the bump to the unit price
+      assign_bundles(plans, int(args.jito_tip))
+    else:
+      unit_price = int(unit_price + args.jito_tip)
+
+    if args.unit_limit == "auto":
+      try:
+        size_planned_buys(client, plans, coin_data)
+      except Exception as e:
+        print(f"Error sizing compute unit limits: {e}")
+        traceback.print_exc()
+        return
+      unit_limit = None
+    else:
+      unit_limit = args.unit_limit
+
+    start = time.monotonic()
+    try:
+      with span("sign", count=len(plans)):
+        signed_transactions = sign_planned_buys(plans, coin_data, recent_blockhash, unit_limit, unit_price, args.workers)
+    except Exception as e:
+      print(f"Error signing transactions: {e}")
+      traceback.print_exc()
+      return
+    print(f"Signed {len(signed_transactions)} transactions in {time.monotonic() - start:.3f} seconds.")
+
+    if args.save_plan:
+      if not args.use_nonce:
+        print("Warning: saved plan is signed against a recent blockhash and expires in about a minute, use --use-nonce.")
+      save_signed_transactions(args.save_plan, plans, signed_transactions)
+      print(f"Saved {len(signed_transactions)} signed transactions to {args.save_plan}, send them with `pump-fun send-plan`.")
+      return
+
+    entries = [{"wallet_id": plan.wallet_id, "amount_in_sol": plan.amount_in_sol, "bundle": plan.bundle, "transaction": transaction}
+               for plan, transaction in zip(plans, signed_transactions)]
+    send_planned_buys(client, entries, args.ca, args.send_rate, args.confirm, args.rebroadcast, last_valid_block_height)
+
+
+def send_planned_bundles(entries: list[dict], send_rate: float) -> list:
+    """
+    Sends entries grouped by their bundle number, returns each entry's signature or the exception its bundle raised.
+    """
+    bundles = {}
+    for entry in entries:
+      bundles.setdefault(entry["bundle"], []).append(entry)
+
+    results = {}
+    for i, (bundle, bundle_entries) in enumerate(bundles.items()):
+      if send_rate and i:
+        time.sleep(len(bundle_entries) / send_rate)
+      try:
+        bundle_id = send_bundle([entry["transaction"] for entry in bundle_entries])
+        print(f"Bundle {bundle} sent with {len(bundle_entries)} transactions. Bundle ID: {bundle_id}")
+        for entry in bundle_entries:
+          results[id(entry)] = VersionedTransaction.from_bytes(entry["transaction"]).signatures[0]
+      except Exception as e:
+        for entry in bundle_entries:
+          results[id(entry)] = e
+
+    return [results[id(entry)] for entry in entries]
+
+
+def send_planned_buys(client, entries: list[dict], ca: str, send_rate: float, confirm: bool, rebroadcast: bool = False, last_valid_block_height: int = None):
+    start = time.monotonic()
+    with span("send_batch", count=len(entries)):
+      if entries and entries[0].get("bundle") is not None:
+        if rebroadcast:
+          print("Warning: --rebroadcast is ignored for bundles.")
+        results = send_planned_bundles(entries, send_rate)
+      else:
+        results = send_signed_transactions(client, [entry["transaction"] for entry in entries], rate=send_rate,
+                                           rebroadcast=rebroadcast, last_valid_block_height=last_valid_block_height)
+    print(f"Sent {len(results)} transactions in {time.monotonic() - start:.3f} seconds.")
+
+    for entry, result in zip(entries, results):
+      # The buyer pays the fee, so it is the first account of its transaction
+      public_key = str(VersionedTransaction.from_bytes(entry["transaction"]).message.account_keys[0])
+      if isinstance(result, Exception):
+        print(f"Error buying token for wallet ID {entry['wallet_id']}: {result}")
+        emit_result(entry['wallet_id'], public_key, "buy", entry['amount_in_sol'], "SOL", error=result)
+        continue
+
+      if confirm:
+        try:
+          with span("confirm", wallet_id=entry['wallet_id']):
+            client.confirm_transaction(result)
+        except Exception as e:
+          print(f"Error confirming transaction for wallet ID {entry['wallet_id']}: {e}")
+          emit_result(entry['wallet_id'], public_key, "buy", entry['amount_in_sol'], "SOL", result, error=e)
+          continue
+
+      print(f"Transaction Sent: {entry['amount_in_sol']} SOL to buy {ca or 'token'} for wallet ID {entry['wallet_id']}. Signature: {result}")
+      emit_result(entry['wallet_id'], public_key, "buy", entry['amount_in_sol'], "SOL", result)
+      update_wallet_access_time(entry['wallet_id'])
+
+
+def send_plan(args: argparse.Namespace):
+    """
+    Sends transactions saved by `bulk-buy --presign --use-nonce --save-plan`, no blockhash or signing on the hot path.
+    """
+    try:
+      entries = load_signed_transactions(args.file)
+    except Exception as e:
+      print(f"Error reading plan {args.file}: {e}")
       return
 
+    client = get_solana_client()
+    send_planned_buys(client, entries, None, args.send_rate, args.confirm, args.rebroadcast)
+
 
-def bulk_buy(args: argparse.Namespace):
-    buyer_wallets = get_wallets_by_ids(parse_ranges(args.ids))
+def bulk_buy(args: argparse.Namespace, keyring: Keyring):
+    buyer_wallets = keyring.load(parse_ranges(args.ids))
     
     if not all(buyer_wallets):
       print("Error: Wallet(s) not found.")
       return
+
+    # Presigning decrypts in worker processes from the encrypted keys, the agent only signs one message at a time
+    agent_held = [str(w['id']) for w in buyer_wallets if w['id'] in keyring.agent_wallets]
+    if args.presign and agent_held:
+      print(f"Error: Wallet IDs {', '.join(agent_held)} are held by the key agent, --presign cannot use them. "
+            f"Run without --presign, or unset {AGENT_SOCK_ENV}.")
+      return
     
     if args.shuffle:
        random.shuffle(buyer_wallets)
 
+    if args.presign:
+      bulk_buy_presigned(args, buyer_wallets)
+      return
+
     original_amount_in_sol = args.amount_in_sol
 
     for wallet in buyer_wallets:
@@ -135,15 +330,15 @@ def bulk_buy(args: argparse.Namespace):
       args.id = wallet['id']
       args.amount_in_sol = amount_in_sol
       print(f"Buying {amount_in_sol} {args.ca} for wallet ID {wallet['id']} {wallet['public_key']}...")
-      buy(args)
+      buy(args, keyring)
       print()
 
       if args.random_delays:
           random_delay_from_range(args.random_delays)
 
 
-def bulk_sell(args: argparse.Namespace):
-    seller_wallets = get_wallets_by_ids(parse_ranges(args.ids))
+def bulk_sell(args: argparse.Namespace, keyring: Keyring):
+    seller_wallets = keyring.load(parse_ranges(args.ids))
     
     if not all(seller_wallets):
       print("Error: Wallet(s) not found.")
@@ -163,15 +358,15 @@ def bulk_sell(args: argparse.Namespace):
       args.id = wallet['id']
       args.amount_in_token = amount_in_token
       print(f"Selling {amount_in_token} tokens of {args.ca} for wallet ID {wallet['id']} {wallet['public_key']}...")
-      sell(args)
+      sell(args, keyring)
       print()
 
       if args.random_delays:
           random_delay_from_range(args.random_delays)
 
 
-def bulk_trade(args: argparse.Namespace):
-    trader_wallets = get_wallets_by_ids(parse_ranges(args.ids))
+def bulk_trade(args: argparse.Namespace, keyring: Keyring):
+    trader_wallets = keyring.load(parse_ranges(args.ids))
 
     if not all(trader_wallets):
       print("Error: Wallet(s) not found.")
@@ -240,12 +435,13 @@ def bulk_trade(args: argparse.Namespace):
 
       if trade_action == 'buy':
         num_buy += 1
-        buy(args)
+        buy(args, keyring)
       elif trade_action == 'sell':
         num_sell += 1
-        sell(args)
+        sell(args, keyring)
       else:
         num_skip += 1
+        emit_result(wallet['id'], wallet['public_key'], "skip", args.amount_in_sol, "SOL")
 
       print()
       if args.random_delays and trade_action:
@@ -257,22 +453,29 @@ def bulk_trade(args: argparse.Namespace):
 
 
 def pumpfun_command(args: argparse.Namespace):
-    if args.pump_fun_cmd == "get-data":
-        get_data(args)
-    elif args.pump_fun_cmd == "buy":
-        buy(args)
-    elif args.pump_fun_cmd == "bulk-buy":
-        bulk_buy(args)
-    elif args.pump_fun_cmd == "sell":
-        sell(args)
-    elif args.pump_fun_cmd == "bulk-sell":
-        bulk_sell(args)
-    elif args.pump_fun_cmd == "bulk-trade":
-        bulk_trade(args)
-    else:
-        print("Unknown sub-command for pump-fun")
-        if hasattr(args, 'parser'):
-            args.parser.print_help()
+    # Keys decrypted for this command are wiped when it returns
+    with Keyring() as keyring:
+      if args.pump_fun_cmd == "get-data":
+          get_data(args)
+      elif args.pump_fun_cmd == "buy":
+          buy(args, keyring)
+      elif args.pump_fun_cmd == "bulk-buy":
+          bulk_buy(args, keyring)
+      elif args.pump_fun_cmd == "sell":
+          sell(args, keyring)
+      elif args.pump_fun_cmd == "bulk-sell":
+          bulk_sell(args, keyring)
+      elif args.pump_fun_cmd == "bulk-trade":
+          bulk_trade(args, keyring)
+      elif args.pump_fun_cmd == "send-plan":
+          send_plan(args)
+      else:
+          print("Unknown sub-command for pump-fun")
+          if hasattr(args, 'parser'):
+              args.parser.print_help()
+
+    if getattr(args, "rebroadcast", False):
+        print_broadcast_report()
 
 
 def register(subparsers):
@@ -294,9 +497,10 @@ def register(subparsers):
     buy_subparser.add_argument("--ca", required=True, help="Token contract/mint address (CA).")
     buy_subparser.add_argument("--amount-in-sol", type=float, required=True, help="Amount of SOL to spend")
     buy_subparser.add_argument("--slippage", type=int, default=5, help="Slippage tolerance percentage")
-    buy_subparser.add_argument("--unit-limit", type=int, default=100_000, help="Unit limit")
-    buy_subparser.add_argument("--unit-price", type=int, default=1_000_000, help="Unit price")
+    buy_subparser.add_argument("--unit-limit", type=parse_unit_limit, default=100_000, help="Unit limit, or 'auto' to size it from a simulation of each transaction shape")
+    buy_subparser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
     buy_subparser.add_argument("--confirm", action="store_true", help="Confirm Transactions.")
+    buy_subparser.add_argument("--rebroadcast", action="store_true", help="Send to every endpoint in COINTOOLS_RPC_URLS until landed and report per endpoint time to land.")
     buy_subparser.add_argument("--jito-tip", type=float, default = 30_000, help="JITO MEV Tip.")
 
 
@@ -309,11 +513,27 @@ def register(subparsers):
                                             help="Randomize by this percentage.  For example if amount is 100 and randomize is 0.1 then values will range from 90 to 110.")
     bulk_buy_subparser.add_argument("--random-delays", required=False, help="Insert random delays within this range in seconds (e.g. 1-20).")
     bulk_buy_subparser.add_argument("--slippage", type=int, default=5, help="Slippage tolerance percentage")
-    bulk_buy_subparser.add_argument("--unit-limit", type=int, default=100_000, help="Unit limit")
-    bulk_buy_subparser.add_argument("--unit-price", type=int, default=1_000_000, help="Unit price")
+    bulk_buy_subparser.add_argument("--unit-limit", type=parse_unit_limit, default=100_000, help="Unit limit, or 'auto' to size it from a simulation of each transaction shape")
+    bulk_buy_subparser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
     bulk_buy_subparser.add_argument("--confirm", action="store_true", help="Confirm Transactions.")
+    bulk_buy_subparser.add_argument("--rebroadcast", action="store_true", help="Send to every endpoint in COINTOOLS_RPC_URLS until landed and report per endpoint time to land.")
     bulk_buy_subparser.add_argument("--shuffle", action="store_true", help="Shuffle wallets before processing.")
     bulk_buy_subparser.add_argument("--jito-tip", type=float, default = 30_000, help="JITO MEV Tip.")
+    bulk_buy_subparser.add_argument("--presign", action="store_true", help="Build and sign all transactions up front, then send them in a burst.")
+    bulk_buy_subparser.add_argument("--workers", type=int, required=False, help="Processes used to sign transactions with --presign (defaults to CPU count).")
+    bulk_buy_subparser.add_argument("--send-rate", type=float, default=0, help="Transactions per second sent with --presign (0 for as fast as possible).")
+    bulk_buy_subparser.add_argument("--use-nonce", action="store_true", help="With --presign, sign against each wallet's durable nonce (see `nonces create`) instead of a recent blockhash.")
+    bulk_buy_subparser.add_argument("--bundle", action="store_true", help="With --presign, submit atomic bundles of up to 5 transactions, the last one tips --jito-tip lamports.")
+    bulk_buy_subparser.add_argument("--save-plan", required=False, help="With --presign, save the signed transactions to this file instead of sending.")
+    add_format_argument(bulk_buy_subparser)
+
+    # send plan
+    send_plan_subparser = pumpfun_subparsers.add_parser("send-plan", help="Send transactions saved with bulk-buy --save-plan.")
+    send_plan_subparser.add_argument("--file", required=True, help="Plan file written by bulk-buy --save-plan.")
+    send_plan_subparser.add_argument("--send-rate", type=float, default=0, help="Transactions per second (0 for as fast as possible).")
+    send_plan_subparser.add_argument("--confirm", action="store_true", help="Confirm Transactions.")
+    send_plan_subparser.add_argument("--rebroadcast", action="store_true", help="Send to every endpoint in COINTOOLS_RPC_URLS until landed and report per endpoint time to land.")
+    add_format_argument(send_plan_subparser)
     
     # sell
     sell_subparser = pumpfun_subparsers.add_parser("sell", help="Sell coin on pump.fun")
@@ -321,9 +541,10 @@ def register(subparsers):
     sell_subparser.add_argument("--ca", required=True, help="Token contract/mint address (CA).")
     sell_subparser.add_argument("--amount-in-token", type=float, required=True, help="Amount of token to sell")
     sell_subparser.add_argument("--slippage", type=int, default=5, help="Slippage tolerance percentage")
-    sell_subparser.add_argument("--unit-limit", type=int, default=100_000, help="Unit limit")
-    sell_subparser.add_argument("--unit-price", type=int, default=1_000_000, help="Unit price")
+    sell_subparser.add_argument("--unit-limit", type=parse_unit_limit, default=100_000, help="Unit limit, or 'auto' to size it from a simulation of each transaction shape")
+    sell_subparser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
     sell_subparser.add_argument("--confirm", action="store_true", help="Confirm Transactions.")
+    sell_subparser.add_argument("--rebroadcast", action="store_true", help="Send to every endpoint in COINTOOLS_RPC_URLS until landed and report per endpoint time to land.")
     sell_subparser.add_argument("--jito-tip", type=float, default = 30_000, help="JITO MEV Tip.")
 
     # bulk sell
@@ -335,11 +556,13 @@ def register(subparsers):
                                             help="Randomize by this percentage.  For example if amount is 100 and randomize is 0.1 then values will range from 90 to 110.")
     bulk_sell_subparser.add_argument("--random-delays", required=False, help="Insert random delays within this range in seconds (e.g. 1-20).")
     bulk_sell_subparser.add_argument("--slippage", type=int, default=5, help="Slippage tolerance percentage")
-    bulk_sell_subparser.add_argument("--unit-limit", type=int, default=100_000, help="Unit limit")
-    bulk_sell_subparser.add_argument("--unit-price", type=int, default=1_000_000, help="Unit price")
+    bulk_sell_subparser.add_argument("--unit-limit", type=parse_unit_limit, default=100_000, help="Unit limit, or 'auto' to size it from a simulation of each transaction shape")
+    bulk_sell_subparser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
     bulk_sell_subparser.add_argument("--confirm", action="store_true", help="Confirm Transactions.")
+    bulk_sell_subparser.add_argument("--rebroadcast", action="store_true", help="Send to every endpoint in COINTOOLS_RPC_URLS until landed and report per endpoint time to land.")
     bulk_sell_subparser.add_argument("--shuffle", action="store_true", help="Shuffle wallets before processing.")
     bulk_sell_subparser.add_argument("--jito-tip", type=float, default = 30_000, help="JITO MEV Tip.")
+    add_format_argument(bulk_sell_subparser)
 
     # bulk trade
     bulk_trade_subparser = pumpfun_subparsers.add_parser("bulk-trade", help="Bulk trade on pump.fun.  Attempt to buy and sell within a distribution.")
@@ -352,9 +575,11 @@ def register(subparsers):
     bulk_trade_subparser.add_argument("--buy-rate", type=float, default=.5, help="On average will attempt to buy at this rate across the wallets.  Depending on the wallet balance, the actual rate may vary." +
                                      "For example, if all the wallets have tokens but not enough SOL, they will all try to sell.")
     bulk_trade_subparser.add_argument("--slippage", type=int, default=5, help="Slippage tolerance percentage")
-    bulk_trade_subparser.add_argument("--unit-limit", type=int, default=100_000, help="Unit limit")
-    bulk_trade_subparser.add_argument("--unit-price", type=int, default=1_000_000, help="Unit price")
+    bulk_trade_subparser.add_argument("--unit-limit", type=parse_unit_limit, default=100_000, help="Unit limit, or 'auto' to size it from a simulation of each transaction shape")
+    bulk_trade_subparser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
     bulk_trade_subparser.add_argument("--confirm", action="store_true", help="Confirm Transactions.")
+    bulk_trade_subparser.add_argument("--rebroadcast", action="store_true", help="Send to every endpoint in COINTOOLS_RPC_URLS until landed and report per endpoint time to land.")
     bulk_trade_subparser.add_argument("--shuffle", action="store_true", help="Shuffle wallets before processing.")
     bulk_trade_subparser.add_argument("--jito-tip", type=float, default = 30_000, help="JITO MEV Tip.")
+    add_format_argument(bulk_trade_subparser)
 
@@ -0,0 +1,157 @@
+import argparse
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+
+from solana.constants import LAMPORTS_PER_SOL
+from solana.rpc.commitment import Confirmed
+from solana.rpc.types import TxOpts
+from solders.pubkey import Pubkey as PublicKey  #type: ignore
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price  # type: ignore
+from spl.token.instructions import create_idempotent_associated_token_account, get_associated_token_address
+
+from coin_tools.utils import parse_ranges, parse_unit_price
+from coin_tools.db import insert_token_accounts, update_wallet_access_time
+from coin_tools.keyring import Keyring
+from coin_tools.solana.fees import resolve_unit_price
+from coin_tools.solana.lookup_tables import get_lookup_table_accounts
+from coin_tools.solana.tokens import ATA_CREATE_COMPUTE_UNITS
+from coin_tools.solana.utils import (
+    MAX_COMPUTE_UNITS,
+    fetch_multiple_accounts,
+    fetch_rent_exempt_minimum,
+    get_solana_client,
+    pack_instruction_groups,
+    send_transaction
+)
+
+TOKEN_ACCOUNT_SIZE = 165
+
+
+def prewarm_ata(args: argparse.Namespace, keyring: Keyring):
+    """
+    Creates the missing associated token accounts for a mint across a set of wallets ahead of trading.
+    Existing and created accounts are recorded in the DB so later buys skip the existence check.
+    """
+    wallets = keyring.load(parse_ranges(args.ids))
+    payer_wallet = keyring.wallet(args.payer_id)
+
+    if not payer_wallet or not wallets:
+        print("Error: Wallet(s) not found.")
+        return
+
+    try:
+        lookup_tables = get_lookup_table_accounts(args.lookup_table)
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+
+    client = get_solana_client()
+    mint_pubkey = PublicKey.from_string(args.ca)
+    owners = [PublicKey.from_string(w["public_key"]) for w in wallets]
+    atas = [get_associated_token_address(owner=owner, mint=mint_pubkey) for owner in owners]
+
+    existing = []
+    missing = []
+    for owner, ata, account in zip(owners, atas, fetch_multiple_accounts(client, atas)):
+        if account:
+            existing.append((str(owner), args.ca, str(ata)))
+        else:
+            missing.append((owner, ata))
+
+    insert_token_accounts(existing)
+    print(f"{len(existing)} token accounts already exist, {len(missing)} to create.")
+
+    if not missing:
+        return
+
+    try:
+        payer_keypair = keyring.keypair(args.payer_id)
+    except Exception as e:
+        print(f"Error decrypting private key: {e}")
+        traceback.print_exc()
+        return
+
+    payer_pubkey = payer_keypair.pubkey()
+    unit_price = resolve_unit_price(client, args.unit_price, [payer_pubkey])
+    rent = fetch_rent_exempt_minimum(client, TOKEN_ACCOUNT_SIZE)
+    print(f"Creating {len(missing)} token accounts will cost about {len(missing) * rent / LAMPORTS_PER_SOL} SOL in rent.")
+
+    groups = [
+        [create_idempotent_associated_token_account(payer=payer_pubkey, owner=owner, mint=mint_pubkey)]
+        for owner, _ in missing
+    ]
+    prefix = [
+        set_compute_unit_limit(ATA_CREATE_COMPUTE_UNITS),
+        set_compute_unit_price(unit_price)
+    ]
+    batches = pack_instruction_groups(payer_pubkey, groups, prefix=prefix, lookup_tables=lookup_tables,
+                                      max_groups=MAX_COMPUTE_UNITS // ATA_CREATE_COMPUTE_UNITS)
+    txn_opts = TxOpts(skip_confirmation=False, preflight_commitment=Confirmed)
+
+    def create_batch(batch):
+        instructions = [
+            set_compute_unit_limit(ATA_CREATE_COMPUTE_UNITS * len(batch)),
+            set_compute_unit_price(unit_price)
+        ]
+        instructions += [ix for group in batch for ix in group]
+        return send_transaction(client, payer_keypair, instructions, opts=txn_opts, lookup_tables=lookup_tables)
+
+    offset = 0
+    created = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = []
+        for batch in batches:
+            futures.append((missing[offset:offset + len(batch)], executor.submit(create_batch, batch)))
+            offset += len(batch)
+
+        for batch_missing, future in futures:
+            try:
+                txn_signature = future.result()
+                insert_token_accounts([(str(owner), args.ca, str(ata)) for owner, ata in batch_missing])
+                created += len(batch_missing)
+                print(f"Created {len(batch_missing)} token accounts. Signature: {txn_signature}")
+            except Exception as e:
+                print(f"Error creating {len(batch_missing)} token accounts: {e}")
+
+    update_wallet_access_time(args.payer_id)
+    print(f"Created {created} of {len(missing)} token accounts in {len(batches)} transactions.")
+
+
+def tokens_command(args: argparse.Namespace):
+    """
+    Main dispatcher for 'tokens' subcommands.
+    """
+    # Keys decrypted for this command are wiped when it returns
+    with Keyring() as keyring:
+        if args.tokens_cmd == "prewarm-ata":
+            prewarm_ata(args, keyring)
+        else:
+            print("Unknown sub-command for tokens")
+            if hasattr(args, 'parser'):
+                args.parser.print_help()
+
+
+def register(subparsers):
+    """
+    Registers the 'tokens' command with all its sub-commands.
+    """
+    manager_parser = subparsers.add_parser(
+        "tokens",
+        help="Manage token accounts."
+    )
+    manager_parser.set_defaults(func=tokens_command)
+
+    tokens_subparsers = manager_parser.add_subparsers(dest="tokens_cmd")
+
+    # prewarm-ata
+    prewarm_ata_parser = tokens_subparsers.add_parser(
+        "prewarm-ata",
+        help="Create missing associated token accounts for a mint across wallets ahead of trading."
+    )
+    prewarm_ata_parser.add_argument("--ca", required=True, help="Token contract/mint address (CA).")
+    prewarm_ata_parser.add_argument("--ids", required=True, help="Comma separated list of wallet ID's.")
+    prewarm_ata_parser.add_argument("--payer-id", type=int, required=True, help="Wallet ID paying rent and fees.")
+    prewarm_ata_parser.add_argument("--workers", type=int, default=8, help="Maximum transactions in flight.")
+    prewarm_ata_parser.add_argument("--lookup-table", required=False, help="Lookup table names or addresses (comma separated) to send v0 transactions, packing more per transaction.")
+    prewarm_ata_parser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
@@ -1,41 +1,57 @@
 import argparse
 import traceback
 
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 
+from solana.rpc.commitment import Confirmed
+from solana.rpc.types import TxOpts
+
+from solana.constants import LAMPORTS_PER_SOL
 from solders.pubkey import Pubkey as PublicKey  #type: ignore
 from solders.system_program import TransferParams, transfer
 from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price  # type: ignore
 
 from spl.token.constants import TOKEN_PROGRAM_ID
 from spl.token.instructions import TransferParams as SplTransferParams
-from spl.token.instructions import get_associated_token_address
+from spl.token.instructions import create_idempotent_associated_token_account, get_associated_token_address
 from spl.token.instructions import transfer as spl_transfer
 
-from coin_tools.utils import randomize_by_percentage, random_delay_from_range, parse_ranges
-from coin_tools.db import get_wallet_by_id, get_wallets_by_ids, update_wallet_access_time
-from coin_tools.encryption import decrypt_data
+from coin_tools.utils import randomize_by_percentage, random_delay_from_range, parse_ranges, parse_unit_limit, parse_unit_price
+from coin_tools.db import update_wallet_access_time
+from coin_tools.keyring import Keyring
+from coin_tools.output import add_format_argument, emit_result
+from coin_tools.solana.compute import resolve_unit_limit
+from coin_tools.solana.fees import resolve_unit_price
+from coin_tools.solana.lookup_tables import get_lookup_table_accounts
 from coin_tools.solana.tokens import (
     fetch_or_create_token_account,
+    fetch_token_account_amounts,
     fetch_token_accounts,
     fetch_token_metadata,
 )
 from coin_tools.solana.utils import (
     APPROX_RENT,
+    MAX_COMPUTE_UNITS,
+    SIGNATURE_FEE_LAMPORTS,
+    fetch_multiple_lamports,
+    fetch_rent_exempt_minimum,
     fetch_sol_balance,
     get_solana_client,
-    parse_private_key_bytes,
+    pack_instruction_groups,
+    priority_fee_lamports,
     send_transaction
 )
 
 
-def transfer_sol(args: argparse.Namespace):
+def transfer_sol(args: argparse.Namespace, keyring: Keyring):
     if not args.from_id or not args.to_id or not args.amount:
         print("Error: must specify --from-id, --to-id, and --amount.")
         return
 
-    from_wallet = get_wallet_by_id(args.from_id)
-    to_wallet = get_wallet_by_id(args.to_id)
+    keyring.load([args.from_id, args.to_id], include_deleted=True)
+    from_wallet = keyring.wallet(args.from_id)
+    to_wallet = keyring.wallet(args.to_id)
 
     if not from_wallet or not to_wallet:
         print("Error: Wallet(s) not found.")
@@ -49,15 +65,16 @@ def transfer_sol(args: argparse.Namespace):
         amount_lamports = int(args.amount * 1_000_000_000)
     except ValueError as e:
         print(f"Error parsing public keys or amount: {e}")
+        emit_result(args.to_id, to_wallet["public_key"], "transfer-sol", args.amount, "SOL", error=e)
         return
 
     # Decrypt private key
     try:
-        from_private_key = decrypt_data(from_wallet["private_key_encrypted"])
-        from_keypair = parse_private_key_bytes(from_private_key)
+        from_keypair = keyring.keypair(args.from_id)
     except Exception as e:
         print(f"Error decrypting private key: {e}")
         traceback.print_exc()
+        emit_result(args.to_id, to_wallet["public_key"], "transfer-sol", args.amount, "SOL", error=e)
         return
 
     try:
@@ -70,8 +87,8 @@ def transfer_sol(args: argparse.Namespace):
       )
 
       instructions = [
-          set_compute_unit_limit(args.unit_limit),
-          set_compute_unit_price(args.unit_price),
+          set_compute_unit_limit(resolve_unit_limit(client, args.unit_limit, from_pubkey, [transfer_ix])),
+          set_compute_unit_price(resolve_unit_price(client, args.unit_price, [from_pubkey, to_pubkey])),
           transfer_ix
       ]
 
@@ -79,21 +96,24 @@ def transfer_sol(args: argparse.Namespace):
       if txn_signature:
         print(f"Transaction Sent: {args.amount} SOL from {from_wallet['public_key']} to {to_wallet['public_key']}.")
         print(f"Signature: {txn_signature}")
+        emit_result(args.to_id, to_wallet["public_key"], "transfer-sol", args.amount, "SOL", txn_signature)
         update_wallet_access_time(args.from_id)
         update_wallet_access_time(args.to_id)
 
     except Exception as e:
       print(f"Error sending transaction: {e}")
       traceback.print_exc()
+      emit_result(args.to_id, to_wallet["public_key"], "transfer-sol", args.amount, "SOL", error=e)
 
 
-def transfer_token(args: argparse.Namespace):
+def transfer_token(args: argparse.Namespace, keyring: Keyring):
     if not args.from_id or not args.to_id or not args.amount or not args.ca:
         print("Error: must specify --from-id, --to-id, --amount, and --ca.")
         return
 
-    from_wallet = get_wallet_by_id(args.from_id)
-    to_wallet = get_wallet_by_id(args.to_id)
+    keyring.load([args.from_id, args.to_id], include_deleted=True)
+    from_wallet = keyring.wallet(args.from_id)
+    to_wallet = keyring.wallet(args.to_id)
 
     if not from_wallet or not to_wallet:
         print("Error: Wallet(s) not found.")
@@ -109,15 +129,16 @@ def transfer_token(args: argparse.Namespace):
         amount = int(args.amount * 10 ** metadata["decimals"])
     except ValueError as e:
         print(f"Error parsing public keys or amount: {e}")
+        emit_result(args.to_id, to_wallet["public_key"], "transfer-token", args.amount, args.ca, error=e)
         return
 
     # Decrypt private key
     try:
-        from_private_key = decrypt_data(from_wallet["private_key_encrypted"])
-        from_keypair = parse_private_key_bytes(from_private_key)
+        from_keypair = keyring.keypair(args.from_id)
     except Exception as e:
         print(f"Error decrypting private key: {e}")
         traceback.print_exc()
+        emit_result(args.to_id, to_wallet["public_key"], "transfer-token", args.amount, args.ca, error=e)
         return
     try:
       # Get associated token accounts
@@ -128,6 +149,7 @@ def transfer_token(args: argparse.Namespace):
     except Exception as e:
         print(f"Error getting or creating token accounts: {e}")
         traceback.print_exc()
+        emit_result(args.to_id, to_wallet["public_key"], "transfer-token", args.amount, args.ca, error=e)
         return    
 
     try:
@@ -142,20 +164,17 @@ def transfer_token(args: argparse.Namespace):
             )
         )
 
+        body = [create_ata_ix, transfer_ix] if create_ata_ix else [transfer_ix]
         instructions = [
-          set_compute_unit_limit(args.unit_limit),
-          set_compute_unit_price(args.unit_price)
-        ]
-
-        if create_ata_ix:
-          instructions.append(create_ata_ix)
-        
-        instructions.append(transfer_ix)
+          set_compute_unit_limit(resolve_unit_limit(client, args.unit_limit, from_pubkey, body)),
+          set_compute_unit_price(resolve_unit_price(client, args.unit_price, [from_ata, to_ata]))
+        ] + body
         
         txn_signature = send_transaction(client, from_keypair, instructions, should_confirm=args.confirm)
         if txn_signature:
             print(f"Transaction Sent: {args.amount} ({args.ca}) tokens from {from_wallet['public_key']} to {to_wallet['public_key']}.")
             print(f"Transaction Signature: {txn_signature}")
+            emit_result(args.to_id, to_wallet["public_key"], "transfer-token", args.amount, args.ca, txn_signature)
             update_wallet_access_time(args.from_id)
             update_wallet_access_time(args.to_id)
         
@@ -163,11 +182,12 @@ def transfer_token(args: argparse.Namespace):
     except Exception as e:
         print(f"Error transferring token: {e}")
         traceback.print_exc()
+        emit_result(args.to_id, to_wallet["public_key"], "transfer-token", args.amount, args.ca, error=e)
 
 
-def bulk_transfer_sol(args: argparse.Namespace):
-    from_wallet = get_wallet_by_id(args.from_id)
-    to_wallets = get_wallets_by_ids(parse_ranges(args.to_ids))
+def bulk_transfer_sol(args: argparse.Namespace, keyring: Keyring):
+    to_wallets = keyring.load(parse_ranges(args.to_ids))
+    from_wallet = keyring.wallet(args.from_id)
     
     if not from_wallet or not all(to_wallets):
         print("Error: Wallet(s) not found.")
@@ -185,16 +205,16 @@ def bulk_transfer_sol(args: argparse.Namespace):
         args.amount = amount
         
         print(f"Wallet {wallet['id']} {wallet['public_key']} transferring {amount} SOL.")
-        transfer_sol(args)
+        transfer_sol(args, keyring)
         print()
 
         if args.random_delays:
             random_delay_from_range(args.random_delays)
 
 
-def bulk_transfer_token(args: argparse.Namespace):
-    from_wallet = get_wallet_by_id(args.from_id)
-    to_wallets = get_wallets_by_ids(parse_ranges(args.to_ids))
+def bulk_transfer_token(args: argparse.Namespace, keyring: Keyring):
+    to_wallets = keyring.load(parse_ranges(args.to_ids))
+    from_wallet = keyring.wallet(args.from_id)
     
     if not from_wallet or not all(to_wallets):
         print("Error: Wallet(s) not found.")
@@ -212,16 +232,167 @@ def bulk_transfer_token(args: argparse.Namespace):
         args.amount = amount
 
         print(f"Wallet {wallet['id']} {wallet['public_key']} transferring {amount} tokens.")
-        transfer_token(args)
+        transfer_token(args, keyring)
         print()
 
         if args.random_delays:
             random_delay_from_range(args.random_delays)
 
 
-def migrate(args: argparse.Namespace):
-    from_wallet = get_wallet_by_id(args.from_id)
-    to_wallet = get_wallet_by_id(args.to_id)
+def _fan_out_children(index: int, count: int, fanout: int) -> list[int]:
+    """
+    Children of a node in the funding tree, the destination wallets are laid out as a heap.
+    The source wallet is index -1 and funds wallets 0..fanout-1.
+    """
+    first = (index + 1) * fanout
+    return list(range(first, min(first + fanout, count)))
+
+
+def _fan_out_amounts(targets: list[int], fanout: int, fee: int) -> list[int]:
+    """
+    Lamports each destination wallet must receive: its own target plus everything it forwards plus its fee,
+    computed leaves first.
+    """
+    count = len(targets)
+    receive = [0] * count
+    for index in reversed(range(count)):
+        children = _fan_out_children(index, count, fanout)
+        receive[index] = targets[index] + sum(receive[c] for c in children) + (fee if children else 0)
+    return receive
+
+
+def fan_out_sol(args: argparse.Namespace, keyring: Keyring):
+    """
+    Distributes SOL to many wallets through a funding tree.
+    The source funds the first tier, then every funded wallet funds its own children in parallel with the rest of its tier,
+    so the number of sequential confirmations grows with log(wallets) instead of with the number of wallets.
+    """
+    to_wallets = [w for w in keyring.load(parse_ranges(args.to_ids)) if w["id"] != args.from_id]
+    from_wallet = keyring.wallet(args.from_id)
+
+    if not from_wallet or not to_wallets:
+        print("Error: Wallet(s) not found.")
+        return
+
+    if args.fanout < 2:
+        print("Error: --fanout must be at least 2.")
+        return
+
+    try:
+        lookup_tables = get_lookup_table_accounts(args.lookup_table)
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+
+    client = get_solana_client()
+    count = len(to_wallets)
+    to_pubkeys = [PublicKey.from_string(w["public_key"]) for w in to_wallets]
+    unit_price = resolve_unit_price(client, args.unit_price, [PublicKey.from_string(from_wallet["public_key"])])
+
+    # Every leaf gets its own (randomized) target, the tree amounts are derived from those
+    targets = []
+    for _ in to_wallets:
+        amount = randomize_by_percentage(args.amount, args.randomize) if args.randomize else args.amount
+        targets.append(int(Decimal(str(amount)) * LAMPORTS_PER_SOL))
+
+    rent_minimum = fetch_rent_exempt_minimum(client)
+    current_balances = fetch_multiple_lamports(client, to_pubkeys)
+    for wallet, target, balance in zip(to_wallets, targets, current_balances):
+        if balance + target < rent_minimum:
+            print(f"Error: Wallet {wallet['id']} would end with {balance + target} lamports, below the rent exempt minimum of {rent_minimum}.")
+            return
+
+    # The widest funding transaction is simulated with rent sized transfers, every tier reuses its limit
+    from_pubkey = PublicKey.from_string(from_wallet["public_key"])
+    widest = [
+        transfer(TransferParams(from_pubkey=from_pubkey, to_pubkey=to_pubkeys[child], lamports=rent_minimum))
+        for child in _fan_out_children(-1, count, args.fanout)
+    ]
+    try:
+        unit_limit = resolve_unit_limit(client, args.unit_limit, from_pubkey, widest, lookup_tables)
+    except Exception as e:
+        print(f"Error sizing compute unit limit: {e}")
+        return
+
+    # Fee paid by each wallet that funds its children (one signature, one transaction)
+    fee = SIGNATURE_FEE_LAMPORTS + priority_fee_lamports(unit_limit, unit_price)
+
+    receive = _fan_out_amounts(targets, args.fanout, fee)
+    total = sum(receive[c] for c in _fan_out_children(-1, count, args.fanout)) + fee
+    print(f"Funding {count} wallets with {Decimal(sum(targets)) / LAMPORTS_PER_SOL} SOL, "
+          f"{Decimal(total) / LAMPORTS_PER_SOL} SOL including fees, fanout {args.fanout}.")
+
+    # Only the source and wallets with children sign anything
+    senders = [-1] + [i for i in range(count) if _fan_out_children(i, count, args.fanout)]
+    try:
+        keypairs = {}
+        for index in senders:
+            wallet = from_wallet if index == -1 else to_wallets[index]
+            keypairs[index] = keyring.keypair(wallet["id"])
+    except Exception as e:
+        print(f"Error decrypting private key: {e}")
+        traceback.print_exc()
+        return
+
+    # Children spend what they were just sent, so wait for confirmation and preflight against confirmed state
+    txn_opts = TxOpts(skip_confirmation=False, preflight_commitment=Confirmed)
+
+    def fund_children(index: int):
+        keypair = keypairs[index]
+        instructions = [
+            set_compute_unit_limit(unit_limit),
+            set_compute_unit_price(unit_price)
+        ]
+        for child in _fan_out_children(index, count, args.fanout):
+            instructions.append(transfer(
+                TransferParams(
+                    from_pubkey=keypair.pubkey(),
+                    to_pubkey=to_pubkeys[child],
+                    lamports=receive[child]
+                )
+            ))
+        return send_transaction(client, keypair, instructions, opts=txn_opts, lookup_tables=lookup_tables)
+
+    tier = [-1]
+    depth = 0
+    failed = 0
+    while tier:
+        print(f"Tier {depth}: {len(tier)} funding transactions.")
+        funded = []
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = {index: executor.submit(fund_children, index) for index in tier}
+            for index, future in futures.items():
+                wallet = from_wallet if index == -1 else to_wallets[index]
+                children = _fan_out_children(index, count, args.fanout)
+                try:
+                    txn_signature = future.result()
+                    print(f"Wallet {wallet['id']} funded {len(children)} wallets. Signature: {txn_signature}")
+                    for child in children:
+                        emit_result(to_wallets[child]["id"], to_wallets[child]["public_key"], "fan-out-sol",
+                                    Decimal(targets[child]) / LAMPORTS_PER_SOL, "SOL", txn_signature)
+                    funded.extend(children)
+                    update_wallet_access_time(wallet["id"])
+                except Exception as e:
+                    # The whole subtree below a failed sender goes unfunded
+                    print(f"Error funding children of wallet {wallet['id']}: {e}")
+                    failed += 1
+                    unfunded = list(children)
+                    for child in unfunded:
+                        unfunded.extend(_fan_out_children(child, count, args.fanout))
+                    for child in unfunded:
+                        emit_result(to_wallets[child]["id"], to_wallets[child]["public_key"], "fan-out-sol",
+                                    Decimal(targets[child]) / LAMPORTS_PER_SOL, "SOL", error=f"Funding from wallet {wallet['id']} failed: {e}")
+
+        tier = [i for i in funded if _fan_out_children(i, count, args.fanout)]
+        depth += 1
+
+    print(f"Fan out complete in {depth} tiers, {failed} failed funding transactions.")
+
+
+def migrate(args: argparse.Namespace, keyring: Keyring):
+    keyring.load([args.from_id, args.to_id], include_deleted=True)
+    from_wallet = keyring.wallet(args.from_id)
+    to_wallet = keyring.wallet(args.to_id)
 
     if not from_wallet or not to_wallet:
         print("Error: Wallet(s) not found.")
@@ -241,7 +412,7 @@ def migrate(args: argparse.Namespace):
                   args.ca = str(token_ca)
                   args.amount = str(real_balance)
                   args.confirm = False
-                  transfer_token(args)
+                  transfer_token(args, keyring)
           except Exception as e:
               print(f"Error transferring token {entry['token_name']}: {e}")
               traceback.print_exc()
@@ -253,30 +424,146 @@ def migrate(args: argparse.Namespace):
           amount_to_transfer = Decimal(sol_balance) - Decimal(APPROX_RENT)  # Leave a little for rent
           args.amount = str(amount_to_transfer)
           args.confirm = False
-          transfer_sol(args)
+          transfer_sol(args, keyring)
       except Exception as e:
           print(f"Error transferring SOL during migration: {e}")
           return
 
 
+def sweep(args: argparse.Namespace, keyring: Keyring):
+    """
+    Sweeps SOL and/or a token from many wallets into one wallet.
+    The destination wallet pays all fees, source wallets co-sign packed transactions.
+    """
+    if not args.sol and not args.ca:
+        print("Error: must specify --sol and/or --ca.")
+        return
+
+    from_wallets = [w for w in keyring.load(parse_ranges(args.from_ids)) if w["id"] != args.to_id]
+    to_wallet = keyring.wallet(args.to_id)
+
+    if not to_wallet or not from_wallets:
+        print("Error: Wallet(s) not found.")
+        return
+
+    try:
+        lookup_tables = get_lookup_table_accounts(args.lookup_table)
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+
+    client = get_solana_client()
+    to_pubkey = PublicKey.from_string(to_wallet["public_key"])
+    from_pubkeys = [PublicKey.from_string(w["public_key"]) for w in from_wallets]
+
+    # Decrypt every key needed for the sweep once up front
+    try:
+        keypairs = {}
+        for wallet in [to_wallet] + from_wallets:
+            keypairs[wallet["id"]] = keyring.keypair(wallet["id"])
+    except Exception as e:
+        print(f"Error decrypting private key: {e}")
+        traceback.print_exc()
+        return
+
+    instructions_by_wallet = {w["id"]: [] for w in from_wallets}
+    unit_price = resolve_unit_price(client, args.unit_price, [to_pubkey])
+    prefix = []
+
+    if args.ca:
+        mint_pubkey = PublicKey.from_string(args.ca)
+        from_atas = [get_associated_token_address(owner=pubkey, mint=mint_pubkey) for pubkey in from_pubkeys]
+        to_ata = get_associated_token_address(owner=to_pubkey, mint=mint_pubkey)
+        token_amounts = fetch_token_account_amounts(client, from_atas)
+
+        for wallet, pubkey, ata, amount in zip(from_wallets, from_pubkeys, from_atas, token_amounts):
+            if amount > 0:
+                instructions_by_wallet[wallet["id"]].append(spl_transfer(
+                    SplTransferParams(
+                        source=ata,
+                        dest=to_ata,
+                        owner=pubkey,
+                        amount=amount,
+                        program_id=TOKEN_PROGRAM_ID
+                    )
+                ))
+
+        # Idempotent, so it is safe to include in every transaction
+        prefix.append(create_idempotent_associated_token_account(payer=to_pubkey, owner=to_pubkey, mint=mint_pubkey))
+
+    if args.sol:
+        # Source wallets do not pay fees so their whole balance can be swept
+        lamport_balances = fetch_multiple_lamports(client, from_pubkeys)
+        for wallet, pubkey, lamports in zip(from_wallets, from_pubkeys, lamport_balances):
+            if lamports > 0:
+                instructions_by_wallet[wallet["id"]].append(transfer(
+                    TransferParams(
+                        from_pubkey=pubkey,
+                        to_pubkey=to_pubkey,
+                        lamports=lamports
+                    )
+                ))
+
+    wallet_ids = [wallet_id for wallet_id, ixs in instructions_by_wallet.items() if ixs]
+    if not wallet_ids:
+        print("Nothing to sweep.")
+        return
+
+    groups = [instructions_by_wallet[wallet_id] for wallet_id in wallet_ids]
+    # The limit is set per transaction once its shape is known, packing uses a placeholder of the same size
+    budget = [set_compute_unit_limit(MAX_COMPUTE_UNITS), set_compute_unit_price(unit_price)]
+    batches = pack_instruction_groups(to_pubkey, groups, prefix=budget + prefix, lookup_tables=lookup_tables)
+    print(f"Sweeping {len(wallet_ids)} wallets into {to_wallet['public_key']} using {len(batches)} transactions.")
+
+    offset = 0
+    for batch in batches:
+        batch_ids = wallet_ids[offset:offset + len(batch)]
+        offset += len(batch)
+
+        body = prefix + [ix for group in batch for ix in group]
+        signers = [keypairs[wallet_id] for wallet_id in batch_ids]
+        try:
+            unit_limit = resolve_unit_limit(client, args.unit_limit, to_pubkey, body, lookup_tables)
+            instructions = [set_compute_unit_limit(unit_limit), set_compute_unit_price(unit_price)] + body
+            txn_signature = send_transaction(client, keypairs[to_wallet["id"]], instructions, should_confirm=args.confirm, signers=signers, lookup_tables=lookup_tables)
+            print(f"Transaction Sent: swept wallet IDs {', '.join(map(str, batch_ids))}.")
+            print(f"Signature: {txn_signature}")
+            for wallet_id in batch_ids:
+                emit_result(wallet_id, keyring.wallet(wallet_id)["public_key"], "sweep", signature=txn_signature)
+                update_wallet_access_time(wallet_id)
+        except Exception as e:
+            print(f"Error sending sweep transaction for wallet IDs {', '.join(map(str, batch_ids))}: {e}")
+            traceback.print_exc()
+            for wallet_id in batch_ids:
+                emit_result(wallet_id, keyring.wallet(wallet_id)["public_key"], "sweep", error=e)
+
+    update_wallet_access_time(to_wallet["id"])
+
+
 def transfers_command(args: argparse.Namespace):
     """
     Main dispatcher for 'transfers' subcommands.
     """
-    if args.transfers_cmd == "transfer-sol":
-        transfer_sol(args)
-    elif args.transfers_cmd == "bulk-transfer-sol":
-        bulk_transfer_sol(args)
-    elif args.transfers_cmd == "transfer-token":
-        transfer_token(args)
-    elif args.transfers_cmd == "bulk-transfer-token":
-        bulk_transfer_token(args)
-    elif args.transfers_cmd == "migrate":
-        migrate(args)
-    else:
-        print("Unknown sub-command for transfers")
-        if hasattr(args, 'parser'):
-            args.parser.print_help()
+    # Keys decrypted for this command are wiped when it returns
+    with Keyring() as keyring:
+        if args.transfers_cmd == "transfer-sol":
+            transfer_sol(args, keyring)
+        elif args.transfers_cmd == "bulk-transfer-sol":
+            bulk_transfer_sol(args, keyring)
+        elif args.transfers_cmd == "fan-out-sol":
+            fan_out_sol(args, keyring)
+        elif args.transfers_cmd == "transfer-token":
+            transfer_token(args, keyring)
+        elif args.transfers_cmd == "bulk-transfer-token":
+            bulk_transfer_token(args, keyring)
+        elif args.transfers_cmd == "migrate":
+            migrate(args, keyring)
+        elif args.transfers_cmd == "sweep":
+            sweep(args, keyring)
+        else:
+            print("Unknown sub-command for transfers")
+            if hasattr(args, 'parser'):
+                args.parser.print_help()
 
 
 def register(subparsers):
@@ -300,8 +587,8 @@ def register(subparsers):
     transfer_sol_parser.add_argument("--to-id", type=int, required=True, help="Destination wallet ID.")
     transfer_sol_parser.add_argument("--amount", required=True, help="Amount of SOL to transfer.")
     transfer_sol_parser.add_argument("--confirm", action="store_true", help="Confirm Transactions.")
-    transfer_sol_parser.add_argument("--unit-limit", type=int, default=100_000, help="Unit limit")
-    transfer_sol_parser.add_argument("--unit-price", type=int, default=1_000_000, help="Unit price")
+    transfer_sol_parser.add_argument("--unit-limit", type=parse_unit_limit, default=100_000, help="Unit limit, or 'auto' to size it from a simulation of each transaction shape")
+    transfer_sol_parser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
 
     # # bulk-transfer-sol
     bulk_transfer_sol_parser = transfers_subparsers.add_parser(
@@ -315,9 +602,26 @@ def register(subparsers):
                                             help="Randomize by this percentage.  For example if amount is 100 and randomize is 0.1 then values will range from 90 to 110.")
     bulk_transfer_sol_parser.add_argument("--random-delays", required=False, help="Insert random delays within this range in seconds (e.g. 1-20).")
     bulk_transfer_sol_parser.add_argument("--confirm", action="store_true", help="Confirm Transactions.")
-    bulk_transfer_sol_parser.add_argument("--unit-limit", type=int, default=100_000, help="Unit limit")
-    bulk_transfer_sol_parser.add_argument("--unit-price", type=int, default=1_000_000, help="Unit price")
-
+    bulk_transfer_sol_parser.add_argument("--unit-limit", type=parse_unit_limit, default=100_000, help="Unit limit, or 'auto' to size it from a simulation of each transaction shape")
+    bulk_transfer_sol_parser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
+    add_format_argument(bulk_transfer_sol_parser)
+
+    # fan-out-sol
+    fan_out_sol_parser = transfers_subparsers.add_parser(
+        "fan-out-sol",
+        help="Distribute SOL to many wallets through a funding tree, funded wallets fund the next tier in parallel."
+    )
+    fan_out_sol_parser.add_argument("--from-id", type=int, required=True, help="Source wallet ID.")
+    fan_out_sol_parser.add_argument("--to-ids", required=True, help="Comma separated list of destination wallet ID's.")
+    fan_out_sol_parser.add_argument("--amount", type=float, required=True, help="Amount of SOL each destination wallet ends up with.")
+    fan_out_sol_parser.add_argument("--randomize", type=float, required=False, 
+                                            help="Randomize by this percentage.  For example if amount is 100 and randomize is 0.1 then values will range from 90 to 110.")
+    fan_out_sol_parser.add_argument("--fanout", type=int, default=10, help="Number of wallets each wallet funds.")
+    fan_out_sol_parser.add_argument("--workers", type=int, default=16, help="Maximum funding transactions in flight per tier.")
+    fan_out_sol_parser.add_argument("--lookup-table", required=False, help="Lookup table names or addresses (comma separated) to send v0 transactions, packing more per transaction.")
+    fan_out_sol_parser.add_argument("--unit-limit", type=parse_unit_limit, default=100_000, help="Unit limit, or 'auto' to size it from a simulation of each transaction shape")
+    fan_out_sol_parser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
+    add_format_argument(fan_out_sol_parser)
 
     # transfer-token
     transfer_token_parser = transfers_subparsers.add_parser(
@@ -329,8 +633,8 @@ def register(subparsers):
     transfer_token_parser.add_argument("--amount", type=float, required=True, help="Amount of token to transfer.")
     transfer_token_parser.add_argument("--ca", required=True, help="Token contract/mint address (CA).")
     transfer_token_parser.add_argument("--confirm", action="store_true", help="Confirm Transactions.")
-    transfer_token_parser.add_argument("--unit-limit", type=int, default=100_000, help="Unit limit")
-    transfer_token_parser.add_argument("--unit-price", type=int, default=1_000_000, help="Unit price")
+    transfer_token_parser.add_argument("--unit-limit", type=parse_unit_limit, default=100_000, help="Unit limit, or 'auto' to size it from a simulation of each transaction shape")
+    transfer_token_parser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
     
     # bulk-transfer-token
     bulk_transfer_token_parser = transfers_subparsers.add_parser(
@@ -345,8 +649,9 @@ def register(subparsers):
     bulk_transfer_token_parser.add_argument("--random-delays", required=False, help="Insert random delays within this range in seconds (e.g. 1-20).")
     bulk_transfer_token_parser.add_argument("--ca", required=True, help="Token contract/mint address (CA).")
     bulk_transfer_token_parser.add_argument("--confirm", action="store_true", help="Confirm Transactions.")
-    bulk_transfer_token_parser.add_argument("--unit-limit", type=int, default=100_000, help="Unit limit")
-    bulk_transfer_token_parser.add_argument("--unit-price", type=int, default=1_000_000, help="Unit price")
+    bulk_transfer_token_parser.add_argument("--unit-limit", type=parse_unit_limit, default=100_000, help="Unit limit, or 'auto' to size it from a simulation of each transaction shape")
+    bulk_transfer_token_parser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
+    add_format_argument(bulk_transfer_token_parser)
 
     # migrate
     migrate_parser = transfers_subparsers.add_parser(
@@ -357,5 +662,20 @@ def register(subparsers):
     migrate_parser.add_argument("--to-id", type=int, required=True, help="Destination wallet ID.")
     migrate_parser.add_argument("--tokens", action="store_true", help="Migrate tokens.")
     migrate_parser.add_argument("--sol", action="store_true", help="Migrate SOL.")
-    migrate_parser.add_argument("--unit-limit", type=int, default=100_000, help="Unit limit")
-    migrate_parser.add_argument("--unit-price", type=int, default=1_000_000, help="Unit price")
+    migrate_parser.add_argument("--unit-limit", type=parse_unit_limit, default=100_000, help="Unit limit, or 'auto' to size it from a simulation of each transaction shape")
+    migrate_parser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
+
+    # sweep
+    sweep_parser = transfers_subparsers.add_parser(
+        "sweep",
+        help="Sweep SOL and/or a token from many wallets into one wallet (destination pays fees)."
+    )
+    sweep_parser.add_argument("--from-ids", required=True, help="Comma separated list of source wallet ID's.")
+    sweep_parser.add_argument("--to-id", type=int, required=True, help="Destination wallet ID, pays all fees.")
+    sweep_parser.add_argument("--sol", action="store_true", help="Sweep all SOL.")
+    sweep_parser.add_argument("--ca", required=False, help="Sweep all of this token contract/mint address (CA).")
+    sweep_parser.add_argument("--confirm", action="store_true", help="Confirm Transactions.")
+    sweep_parser.add_argument("--lookup-table", required=False, help="Lookup table names or addresses (comma separated) to send v0 transactions, packing more per transaction.")
+    sweep_parser.add_argument("--unit-limit", type=parse_unit_limit, default=100_000, help="Unit limit, or 'auto' to size it from a simulation of each transaction shape")
+    sweep_parser.add_argument("--unit-price", type=parse_unit_price, default=1_000_000, help="Unit price in micro-lamports, or 'auto' to estimate from recent priority fees")
+    add_format_argument(sweep_parser)
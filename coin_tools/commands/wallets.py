@@ -1,4 +1,7 @@
 import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 import base58
 from solders.keypair import Keypair #type: ignore
@@ -7,14 +10,38 @@ from coin_tools.db import (
     get_all_wallets,
     get_token_metadata,
     get_wallet_by_id,
+    get_encryption_keys,
+    get_hd_seed,
+    get_hd_seeds,
+    get_key_rotations,
+    get_key_version_counts,
+    get_wallet_keys,
+    complete_key_rotation,
+    insert_hd_seed,
+    insert_key_rotation,
     insert_wallet,
+    insert_wallets,
+    reserve_hd_indexes,
+    update_hd_seed,
     update_name,
-    update_private_key,
+    update_private_keys,
     update_wallet_access_time,
     upsert_token_metadata,
     update_wallet_status
 )
-from coin_tools.encryption import decrypt_data, encrypt_data
+from coin_tools.encryption import (
+    DERIVED_KEY_VERSION,
+    create_data_key,
+    decrypt_data,
+    encrypt_data,
+    get_active_data_key,
+    get_encryption_key,
+    get_hd_seed_bytes,
+    key_version,
+    reencrypt_batch,
+    rewrap_data_keys
+)
+from coin_tools.hd import SEED_BYTES, derivation_path, derive_private_key, format_path, hd_reference, is_hd_reference, parse_hd_reference
 from coin_tools.solana.utils import parse_private_key_bytes
 
 def __create_wallet(name: str):
@@ -25,6 +52,26 @@ def __create_wallet(name: str):
     id = insert_wallet(name, public_key_str, encrypted_key)
     return id, public_key_str
 
+def __bulk_create_hd_wallets(count: int, name_prefix: str, seed_id: int = None) -> list[int]:
+    """
+    Derives count wallets from an HD seed (a new one unless seed_id is given), only derivation references are stored.
+    """
+    if seed_id is None:
+        seed_id = insert_hd_seed(encrypt_data(os.urandom(SEED_BYTES)))
+        print(f"Created HD seed {seed_id}, back it up with `wallets hd-seeds --decrypt`.")
+    elif not get_hd_seed(seed_id):
+        print(f"No HD seed found with ID {seed_id}")
+        return []
+
+    first_index = reserve_hd_indexes(seed_id, count)
+    seed = get_hd_seed_bytes(seed_id, get_encryption_key())
+    wallets = []
+    for i in range(count):
+        index = first_index + i
+        keypair = Keypair.from_seed(derive_private_key(seed, derivation_path(index)))
+        wallets.append((f"{name_prefix}{i}", str(keypair.pubkey()), hd_reference(seed_id, index)))
+    return insert_wallets(wallets)
+
 def create_wallet(args: argparse.Namespace):
     name = args.name
     id, public_key_str = __create_wallet(name)
@@ -36,12 +83,16 @@ def bulk_create_wallets(args: argparse.Namespace):
     count = args.count
     name_prefix = args.prefix
 
-    ids_created = []
-
-    for i in range(count):
-        name = f"{name_prefix}{i}"
-        id, public_key = __create_wallet(name)
-        ids_created.append(id)
+    if args.hd:
+        ids_created = __bulk_create_hd_wallets(count, name_prefix, args.seed_id)
+        if not ids_created:
+            return
+    else:
+        ids_created = []
+        for i in range(count):
+            name = f"{name_prefix}{i}"
+            id, public_key = __create_wallet(name)
+            ids_created.append(id)
     
     print(f"{count} wallets created with prefix '{name_prefix}'.")
     print(f"Created IDs: {ids_created[0]}-{ids_created[-1]}")
@@ -73,6 +124,9 @@ def get_wallet(args: argparse.Namespace):
     print(f"  Public Key: {wallet['public_key']}")
     print(f"  Status: {wallet['status']}")
     print(f"  Last Accessed: {wallet['last_accessed_timestamp']}")
+    if is_hd_reference(wallet['private_key_encrypted']):
+        seed_id, index = parse_hd_reference(wallet['private_key_encrypted'])
+        print(f"  Derived From: HD seed {seed_id}, path {format_path(derivation_path(index))}")
 
     if args.decrypt:
         decrypted = decrypt_data(wallet['private_key_encrypted'])
@@ -110,6 +164,17 @@ def import_wallet(args: argparse.Namespace):
     print("Wallet imported successfully.")
     print(f"Public Key: {public_key_str}")
 
+def list_hd_seeds(args: argparse.Namespace):
+    seeds = get_hd_seeds()
+    if not seeds:
+        print("No HD seeds found.")
+        return
+
+    for seed in seeds:
+        print(f"HD Seed ID: {seed['id']}, Wallets Derived: {seed['next_index']}, Created: {seed['created_timestamp']}")
+        if args.decrypt:
+            print(f"  Seed (hex): {decrypt_data(seed['seed_encrypted']).hex()}")
+
 def rename_wallet(args: argparse.Namespace):
     update_name(args.id, args.name)
     print(f"Wallet ID {args.id} renamed to '{args.name}'.")
@@ -139,10 +204,13 @@ def manage_encryption(args: argparse.Namespace):
         print("You will need it to decrypt any data encrypted with this key.")
         print("You must set this key as the COINTOOLS_ENC_KEY environment variable.")
     elif args.rotate_key:
-        all_wallets = get_all_wallets()
-        num_wallets = len(all_wallets)
-        print(f"There are {num_wallets} wallets stored in this database")
-        print("Rotating the encryption key will re-encrypt all private keys.")
+        legacy = get_key_version_counts().get(0, 0)
+        if legacy:
+            print(f"Error: {legacy} wallets are still encrypted directly with the master key, run `wallets encryption --migrate` first.")
+            return
+
+        print(f"There are {len(get_all_wallets())} wallets stored in this database")
+        print("Rotating the encryption key will re-wrap the data keys that encrypt all private keys.")
         print("Current private keys will not be able to be read until the new key is set as COINTOOLS_ENC_KEY.")
         print("Be sure to back up the database and the current encryption key.")
         
@@ -150,19 +218,92 @@ def manage_encryption(args: argparse.Namespace):
         if not new_key:
             print("No key entered. Exiting.")
             return
-        
-        print("Rotating the encryption key...")
-        for wallet in all_wallets:
-            decrypted = decrypt_data(wallet['private_key_encrypted'])
-            re_encrypted = encrypt_data(decrypted, override_key=new_key)
-            update_private_key(wallet['id'], re_encrypted)
-        print("Encryption key rotation complete.")
+
+        try:
+            num_keys = rewrap_data_keys(new_key.encode())
+        except ValueError as e:
+            print(f"Error: invalid encryption key: {e}")
+            return
+        print(f"Encryption key rotation complete, {num_keys} data keys re-wrapped.")
         print("Please set the new key as the COINTOOLS_ENC_KEY environment variable.")
+    elif args.migrate or args.rotate_data_key:
+        incomplete = get_incomplete_key_rotation()
+        if incomplete:
+            print(f"Error: re-encryption to key version {incomplete['target_key_version']} started {incomplete['started_timestamp']} "
+                  "is not complete, finish it with `wallets encryption --resume`.")
+            return
+
+        if args.migrate:
+            if not get_key_version_counts().get(0):
+                print("All private keys already use envelope encryption.")
+                return
+            target = get_active_data_key(get_encryption_key())[0]
+        else:
+            target = create_data_key(get_encryption_key())
+            print(f"Created data key {target}, new wallets are encrypted with it.")
+        reencrypt_wallets(insert_key_rotation(target), target, args.batch_size, args.workers)
+    elif args.resume:
+        incomplete = get_incomplete_key_rotation()
+        if not incomplete:
+            print("No re-encryption to resume.")
+            return
+        reencrypt_wallets(incomplete["id"], incomplete["target_key_version"], args.batch_size, args.workers)
+    elif args.status:
+        print_encryption_status()
     else:
         print("Unknown sub-command for encryption")
         if hasattr(args, 'parser'):
             args.parser.print_help()
 
+def get_incomplete_key_rotation():
+    rotations = get_key_rotations()
+    if rotations and not rotations[0]["completed_timestamp"]:
+        return rotations[0]
+    return None
+
+def reencrypt_wallets(rotation_id: int, target_key_version: int, batch_size: int, workers: int = None):
+    """
+    Re-encrypts every private key not yet encrypted with the data key target_key_version.
+    Decryption and encryption run in a process pool, each batch is written in one transaction along with its
+    key_version, so an interrupted run leaves every row readable and `--resume` only redoes the rows left over.
+    """
+    pending = get_wallet_keys(exclude_key_versions=[target_key_version, DERIVED_KEY_VERSION])
+    if pending:
+        print(f"Re-encrypting {len(pending)} private keys with data key {target_key_version}...")
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        done = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(partial(reencrypt_batch, key_id=target_key_version), [[blob for _, blob in batch] for batch in batches])
+            # Batches are written in order while the workers carry on with the next ones
+            for batch, blobs in zip(batches, results):
+                update_private_keys([(wallet_id, blob) for (wallet_id, _), blob in zip(batch, blobs)])
+                done += len(batch)
+                print(f"   {done}/{len(pending)} re-encrypted.")
+
+    # HD wallets have no key of their own, their seeds are re-encrypted instead
+    for seed in get_hd_seeds():
+        if key_version(seed["seed_encrypted"]) != target_key_version:
+            update_hd_seed(seed["id"], reencrypt_batch([seed["seed_encrypted"]], target_key_version)[0])
+
+    complete_key_rotation(rotation_id)
+    print("Re-encryption complete.")
+
+def print_encryption_status():
+    key_ids = get_encryption_keys().keys()
+    print(f"Active data key: {max(key_ids) if key_ids else 'none'}")
+    counts = get_key_version_counts()
+    print("Wallets per key version:")
+    for version, count in counts.items():
+        label = {0: " (master key directly)", DERIVED_KEY_VERSION: " (derived from HD seeds)"}.get(version, "")
+        print(f"   {version}{label}: {count}")
+    if len(set(counts) - {DERIVED_KEY_VERSION}) > 1:
+        print(f"Warning: private keys are encrypted with {len(counts)} different keys.")
+
+    incomplete = get_incomplete_key_rotation()
+    if incomplete:
+        print(f"Re-encryption to key version {incomplete['target_key_version']} started {incomplete['started_timestamp']} "
+              "is not complete, finish it with `wallets encryption --resume`.")
+
 def delete_wallet(args: argparse.Namespace):
     print("Delete wallet stub, just soft deletion, accounts still exist on blockchain.")
     update_wallet_status(args.id, "deleted")
@@ -179,6 +320,8 @@ def wallets_command(args: argparse.Namespace):
         get_wallet(args)
     elif args.wallet_cmd == "import":
         import_wallet(args)
+    elif args.wallet_cmd == "hd-seeds":
+        list_hd_seeds(args)
     elif args.wallet_cmd == "rename":
         rename_wallet(args)
     elif args.wallet_cmd == "metadata":
@@ -210,6 +353,8 @@ def register(subparsers):
     bulk_create_parser = wallet_subparsers.add_parser("bulk-create", help="Bulk create wallets.")
     bulk_create_parser.add_argument("--count", type=int, required=True, help="Number of wallets to create.")
     bulk_create_parser.add_argument("--prefix", required=True, help="Prefix for wallet names.")
+    bulk_create_parser.add_argument("--hd", action="store_true", help="Derive the wallets from one encrypted HD seed instead of storing a key per wallet.")
+    bulk_create_parser.add_argument("--seed-id", type=int, required=False, help="With --hd, derive more wallets from this existing seed.")
 
     # list
     wallet_subparsers.add_parser("list", help="List all wallets.") 
@@ -224,6 +369,10 @@ def register(subparsers):
     import_parser.add_argument("--name", required=True, help="Name of the wallet")
     import_parser.add_argument("--private-key", required=True, help="Base58-encoded private key.")
 
+    # hd-seeds
+    hd_seeds_parser = wallet_subparsers.add_parser("hd-seeds", help="List the HD seeds wallets are derived from.")
+    hd_seeds_parser.add_argument("--decrypt", action="store_true", help="Print the seeds in hex, for backup")
+
     # rename
     rename_parser = wallet_subparsers.add_parser("rename", help="Rename a wallet.")
     rename_parser.add_argument("--id", type=int, required=True, help="Wallet ID")
@@ -243,6 +392,12 @@ def register(subparsers):
     encryption_parser = wallet_subparsers.add_parser("encryption", help="Manage encryption settings.")
     encryption_parser.add_argument("--generate-key", required=False, action="store_true", help="Generate a new encryption key.")
     encryption_parser.add_argument("--rotate-key", required=False, action="store_true", help="Rotate the encryption key.")
+    encryption_parser.add_argument("--migrate", required=False, action="store_true", help="Convert private keys encrypted directly with the master key to envelope encryption.")
+    encryption_parser.add_argument("--rotate-data-key", required=False, action="store_true", help="Create a new data key and re-encrypt every private key with it.")
+    encryption_parser.add_argument("--resume", required=False, action="store_true", help="Finish an interrupted --migrate or --rotate-data-key.")
+    encryption_parser.add_argument("--status", required=False, action="store_true", help="Show which keys the private keys are encrypted with.")
+    encryption_parser.add_argument("--batch-size", type=int, default=500, help="Private keys re-encrypted per transaction.")
+    encryption_parser.add_argument("--workers", type=int, required=False, help="Processes used to re-encrypt (defaults to CPU count).")
 
     # delete wallet
     delete_parser = wallet_subparsers.add_parser("delete", help="Delete a wallet (stub).")
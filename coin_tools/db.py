@@ -2,6 +2,9 @@ import os
 import sqlite3
 from datetime import datetime
 
+from coin_tools.key_format import key_version
+from coin_tools.stats import timed
+
 def get_db_path() -> str:
     """
     Reads the environment variable COINTOOLS_DB_PATH for the SQLite file.
@@ -12,6 +15,7 @@ def get_db_path() -> str:
         raise EnvironmentError("Environment variable COINTOOLS_DB_PATH is required but not set.")
     return db_path
 
+@timed("db")
 def init_db():
     """
     Initializes the SQLite database if it doesn't already exist.
@@ -40,10 +44,95 @@ def init_db():
             decimals INTEGER
         )
     ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS token_accounts (
+            owner TEXT NOT NULL,
+            mint TEXT NOT NULL,
+            ata TEXT NOT NULL,
+            created_timestamp TEXT NOT NULL,
+            PRIMARY KEY (owner, mint)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS nonce_accounts (
+            wallet_id INTEGER PRIMARY KEY,
+            public_key TEXT NOT NULL,
+            created_timestamp TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lookup_tables (
+            address TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            authority_wallet_id INTEGER NOT NULL,
+            addresses TEXT NOT NULL,
+            updated_timestamp TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS encryption_keys (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            wrapped_key BLOB NOT NULL,
+            created_timestamp TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS hd_seeds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            seed_encrypted BLOB NOT NULL,
+            next_index INTEGER NOT NULL,
+            created_timestamp TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS key_rotations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            target_key_version INTEGER NOT NULL,
+            started_timestamp TEXT NOT NULL,
+            completed_timestamp TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS balance_snapshots (
+            wallet_id INTEGER PRIMARY KEY,
+            public_key TEXT NOT NULL,
+            lamports INTEGER NOT NULL,
+            last_signature TEXT,
+            slot INTEGER NOT NULL,
+            updated_timestamp TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS token_balance_snapshots (
+            wallet_id INTEGER NOT NULL,
+            token_account TEXT NOT NULL,
+            mint TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            decimals INTEGER NOT NULL,
+            slot INTEGER NOT NULL,
+            PRIMARY KEY (wallet_id, token_account)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS token_balance_snapshots_mint ON token_balance_snapshots (mint)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS compute_unit_estimates (
+            shape TEXT PRIMARY KEY,
+            units INTEGER NOT NULL,
+            updated_timestamp TEXT NOT NULL
+        )
+    ''')
+
+    # Databases created before key versions get the column, filled in from each private key blob
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(wallets)")]
+    if "key_version" not in columns:
+        conn.create_function("key_version", 1, key_version, deterministic=True)
+        cursor.execute("ALTER TABLE wallets ADD COLUMN key_version INTEGER NOT NULL DEFAULT 0")
+        cursor.execute("UPDATE wallets SET key_version = key_version(private_key_encrypted)")
 
     conn.commit()
     conn.close()
 
+@timed("db")
 def get_all_wallets():
     """
     Returns a list of all wallets in DB as dictionaries
@@ -61,6 +150,7 @@ def get_all_wallets():
     # Convert to list of dicts
     return [dict(row) for row in rows]
 
+@timed("db")
 def get_wallets_by_name_prefix(name: str):
     """
     Returns a list of all wallets in DB as dictionaries searching by name (case insensitive prefix).
@@ -77,22 +167,26 @@ def get_wallets_by_name_prefix(name: str):
     # Convert to list of dicts
     return [dict(row) for row in rows]
 
-def get_wallets_by_ids(ids: list[int]):
+@timed("db")
+def get_wallets_by_ids(ids: list[int], include_deleted: bool = False):
     """
     Returns a list of all wallets in DB as dictionaries searching by ID.
+    Deleted wallets are left out unless include_deleted, like get_wallet_by_id does for an ID named explicitly.
     """
     db_path = get_db_path()
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
-    cursor.execute("SELECT * FROM wallets where status <> 'deleted' and id IN ({})".format(','.join('?' * len(ids))), ids)
+    status_filter = "" if include_deleted else "status <> 'deleted' and "
+    cursor.execute("SELECT * FROM wallets where {}id IN ({})".format(status_filter, ','.join('?' * len(ids))), ids)
     rows = cursor.fetchall()
     conn.close()
 
     # Convert to list of dicts
     return [dict(row) for row in rows]
 
+@timed("db")
 def get_wallet_by_id(wallet_id: int):
     """
     Returns a single wallet by ID or None if not found.
@@ -110,6 +204,7 @@ def get_wallet_by_id(wallet_id: int):
         return dict(row)
     return None
 
+@timed("db")
 def update_wallet_access_time(wallet_id: int):
     """
     Updates the 'last_accessed_timestamp' for the given wallet ID.
@@ -125,6 +220,7 @@ def update_wallet_access_time(wallet_id: int):
     conn.commit()
     conn.close()
 
+@timed("db")
 def update_name(wallet_id: int, name: str):
     """
     Updates the 'name' for the given wallet ID.
@@ -140,6 +236,7 @@ def update_name(wallet_id: int, name: str):
     conn.commit()
     conn.close()
 
+@timed("db")
 def update_private_key(wallet_id: int, private_key_encrypted: bytes):
     """
     Updates the 'private_key_encrypted' for the given wallet ID.
@@ -149,12 +246,49 @@ def update_private_key(wallet_id: int, private_key_encrypted: bytes):
     cursor = conn.cursor()
 
     cursor.execute(
-        "UPDATE wallets SET private_key_encrypted=? WHERE id=?",
-        (private_key_encrypted, wallet_id)
+        "UPDATE wallets SET private_key_encrypted=?, key_version=? WHERE id=?",
+        (private_key_encrypted, key_version(private_key_encrypted), wallet_id)
     )
     conn.commit()
     conn.close()
 
+@timed("db")
+def get_wallet_keys(exclude_key_versions: list[int] = None) -> list[tuple[int, bytes]]:
+    """
+    Returns (id, private_key_encrypted) for every wallet, deleted ones included,
+    optionally only those whose key_version is not in exclude_key_versions.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    exclude_key_versions = exclude_key_versions or []
+    cursor.execute(
+        "SELECT id, private_key_encrypted FROM wallets WHERE key_version NOT IN ({}) ORDER BY id".format(','.join('?' * len(exclude_key_versions))),
+        exclude_key_versions
+    )
+    rows = cursor.fetchall()
+    conn.close()
+
+    return rows
+
+@timed("db")
+def update_private_keys(keys: list[tuple[int, bytes]]):
+    """
+    Updates the 'private_key_encrypted' of many (wallet ID, private_key_encrypted) pairs in one transaction.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.executemany(
+        "UPDATE wallets SET private_key_encrypted=?, key_version=? WHERE id=?",
+        [(private_key_encrypted, key_version(private_key_encrypted), wallet_id) for wallet_id, private_key_encrypted in keys]
+    )
+    conn.commit()
+    conn.close()
+
+@timed("db")
 def update_wallet_status(wallet_id: int, status: str):
     """
     Updates the 'status' for the given wallet ID.
@@ -170,6 +304,7 @@ def update_wallet_status(wallet_id: int, status: str):
     conn.commit()
     conn.close()
 
+@timed("db")
 def insert_wallet(name: str, public_key: str, private_key_encrypted: bytes):
     """
     Inserts a new wallet record into the `wallets` table.
@@ -179,14 +314,15 @@ def insert_wallet(name: str, public_key: str, private_key_encrypted: bytes):
     cursor = conn.cursor()
 
     cursor.execute('''
-        INSERT INTO wallets (name, public_key, private_key_encrypted, status, last_accessed_timestamp)
-        VALUES (?, ?, ?, ?, ?)
+        INSERT INTO wallets (name, public_key, private_key_encrypted, status, last_accessed_timestamp, key_version)
+        VALUES (?, ?, ?, ?, ?, ?)
     ''', (
         name,
         public_key,
         private_key_encrypted,
         'active',
-        str(datetime.now())
+        str(datetime.now()),
+        key_version(private_key_encrypted)
     ))
     wallet_id = cursor.lastrowid
     conn.commit()
@@ -194,6 +330,29 @@ def insert_wallet(name: str, public_key: str, private_key_encrypted: bytes):
 
     return wallet_id
 
+@timed("db")
+def insert_wallets(wallets: list[tuple[str, str, bytes]]) -> list[int]:
+    """
+    Inserts many (name, public_key, private_key_encrypted) wallet records in one transaction, returns their IDs.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    now = str(datetime.now())
+    wallet_ids = []
+    for name, public_key, private_key_encrypted in wallets:
+        cursor.execute('''
+            INSERT INTO wallets (name, public_key, private_key_encrypted, status, last_accessed_timestamp, key_version)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (name, public_key, private_key_encrypted, 'active', now, key_version(private_key_encrypted)))
+        wallet_ids.append(cursor.lastrowid)
+    conn.commit()
+    conn.close()
+
+    return wallet_ids
+
+@timed("db")
 def get_token_metadata():
     """
     Returns a list of all tokens in DB as a dictionary
@@ -213,6 +372,7 @@ def get_token_metadata():
         tokens[row['ca']] = dict(row)
     return tokens
 
+@timed("db")
 def upsert_token_metadata(ca: str, coin: str, ticker: str, uri: str, decimals: int):
     """
     Inserts or updates a token_metadata record in the `token_metadata` table.
@@ -228,4 +388,457 @@ def upsert_token_metadata(ca: str, coin: str, ticker: str, uri: str, decimals: i
     ''', (ca, coin, ticker, uri, decimals))
     conn.commit()
     conn.close()
-    
\ No newline at end of file
+    
+
+@timed("db")
+def get_token_account(owner: str, mint: str):
+    """
+    Returns the known associated token account address for an owner and mint, or None if not known to exist.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT ata FROM token_accounts WHERE owner=? AND mint=?", (owner, mint))
+    row = cursor.fetchone()
+    conn.close()
+
+    if row:
+        return row[0]
+    return None
+
+@timed("db")
+def get_token_account_owners(mint: str) -> set[str]:
+    """
+    Returns the set of owners with an associated token account for the mint known to exist.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT owner FROM token_accounts WHERE mint=?", (mint,))
+    rows = cursor.fetchall()
+    conn.close()
+
+    return {row[0] for row in rows}
+
+@timed("db")
+def insert_token_accounts(token_accounts: list[tuple[str, str, str]]):
+    """
+    Records (owner, mint, ata) rows for associated token accounts known to exist on chain.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    now = str(datetime.now())
+    cursor.executemany('''
+        INSERT INTO token_accounts (owner, mint, ata, created_timestamp)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(owner, mint) DO NOTHING
+    ''', [(owner, mint, ata, now) for owner, mint, ata in token_accounts])
+    conn.commit()
+    conn.close()
+
+@timed("db")
+def get_nonce_accounts(wallet_ids: list[int] = None) -> dict[int, str]:
+    """
+    Returns a dict of wallet ID to nonce account public key, for the given wallets or all wallets.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    if wallet_ids is None:
+        cursor.execute("SELECT wallet_id, public_key FROM nonce_accounts")
+    else:
+        cursor.execute("SELECT wallet_id, public_key FROM nonce_accounts WHERE wallet_id IN ({})".format(','.join('?' * len(wallet_ids))), wallet_ids)
+    rows = cursor.fetchall()
+    conn.close()
+
+    return {row[0]: row[1] for row in rows}
+
+@timed("db")
+def insert_nonce_account(wallet_id: int, public_key: str):
+    """
+    Records the durable nonce account owned by a wallet, replacing any previous one.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        INSERT INTO nonce_accounts (wallet_id, public_key, created_timestamp)
+        VALUES (?, ?, ?)
+        ON CONFLICT(wallet_id) DO UPDATE SET public_key=excluded.public_key, created_timestamp=excluded.created_timestamp
+    ''', (wallet_id, public_key, str(datetime.now())))
+    conn.commit()
+    conn.close()
+
+@timed("db")
+def get_lookup_tables():
+    """
+    Returns all cached address lookup tables as dictionaries, addresses are returned as a list of strings.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT * FROM lookup_tables ORDER BY name")
+    rows = cursor.fetchall()
+    conn.close()
+
+    tables = []
+    for row in rows:
+        table = dict(row)
+        table["addresses"] = table["addresses"].split(",") if table["addresses"] else []
+        tables.append(table)
+    return tables
+
+@timed("db")
+def upsert_lookup_table(address: str, name: str, authority_wallet_id: int, addresses: list[str]):
+    """
+    Inserts or updates the cached contents of an address lookup table.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        INSERT INTO lookup_tables (address, name, authority_wallet_id, addresses, updated_timestamp)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(address) DO UPDATE SET name=excluded.name, authority_wallet_id=excluded.authority_wallet_id,
+            addresses=excluded.addresses, updated_timestamp=excluded.updated_timestamp
+    ''', (address, name, authority_wallet_id, ",".join(addresses), str(datetime.now())))
+    conn.commit()
+    conn.close()
+
+@timed("db")
+def get_compute_unit_estimate(shape: str):
+    """
+    Returns the cached compute unit limit for a transaction shape, or None if it has not been simulated.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT units FROM compute_unit_estimates WHERE shape=?", (shape,))
+    row = cursor.fetchone()
+    conn.close()
+
+    if row:
+        return row[0]
+    return None
+
+@timed("db")
+def upsert_compute_unit_estimate(shape: str, units: int):
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        INSERT INTO compute_unit_estimates (shape, units, updated_timestamp)
+        VALUES (?, ?, ?)
+        ON CONFLICT(shape) DO UPDATE SET units=excluded.units, updated_timestamp=excluded.updated_timestamp
+    ''', (shape, units, str(datetime.now())))
+    conn.commit()
+    conn.close()
+
+@timed("db")
+def get_encryption_keys() -> dict[int, bytes]:
+    """
+    Returns data key ID -> data key wrapped by the master key.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT id, wrapped_key FROM encryption_keys")
+    rows = cursor.fetchall()
+    conn.close()
+
+    return dict(rows)
+
+@timed("db")
+def insert_encryption_key(wrapped_key: bytes) -> int:
+    """
+    Inserts a wrapped data key, returns its ID.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "INSERT INTO encryption_keys (wrapped_key, created_timestamp) VALUES (?, ?)",
+        (wrapped_key, str(datetime.now()))
+    )
+    key_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+
+    return key_id
+
+@timed("db")
+def update_encryption_keys(wrapped_keys: dict[int, bytes]):
+    """
+    Replaces the wrapped form of many data keys in one transaction.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.executemany(
+        "UPDATE encryption_keys SET wrapped_key=? WHERE id=?",
+        [(wrapped_key, key_id) for key_id, wrapped_key in wrapped_keys.items()]
+    )
+    conn.commit()
+    conn.close()
+
+@timed("db")
+def get_key_version_counts() -> dict[int, int]:
+    """
+    Returns key version -> number of wallets (deleted ones included) encrypted with it.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT key_version, COUNT(*) FROM wallets GROUP BY key_version ORDER BY key_version")
+    rows = cursor.fetchall()
+    conn.close()
+
+    return dict(rows)
+
+@timed("db")
+def get_key_rotations():
+    """
+    Returns every key rotation as dictionaries, newest first.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT * FROM key_rotations ORDER BY id DESC")
+    rows = cursor.fetchall()
+    conn.close()
+
+    return [dict(row) for row in rows]
+
+@timed("db")
+def insert_key_rotation(target_key_version: int) -> int:
+    """
+    Records the start of a re-encryption of every wallet to target_key_version, returns its ID.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "INSERT INTO key_rotations (target_key_version, started_timestamp) VALUES (?, ?)",
+        (target_key_version, str(datetime.now()))
+    )
+    rotation_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+
+    return rotation_id
+
+@timed("db")
+def complete_key_rotation(rotation_id: int):
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "UPDATE key_rotations SET completed_timestamp=? WHERE id=?",
+        (str(datetime.now()), rotation_id)
+    )
+    conn.commit()
+    conn.close()
+
+@timed("db")
+def insert_hd_seed(seed_encrypted: bytes) -> int:
+    """
+    Inserts an encrypted HD master seed, returns its ID.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "INSERT INTO hd_seeds (seed_encrypted, next_index, created_timestamp) VALUES (?, 0, ?)",
+        (seed_encrypted, str(datetime.now()))
+    )
+    seed_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+
+    return seed_id
+
+@timed("db")
+def get_hd_seeds():
+    """
+    Returns every HD master seed as dictionaries with keys: id, seed_encrypted, next_index, created_timestamp.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT * FROM hd_seeds ORDER BY id")
+    rows = cursor.fetchall()
+    conn.close()
+
+    return [dict(row) for row in rows]
+
+@timed("db")
+def get_hd_seed(seed_id: int):
+    """
+    Returns one HD master seed or None if not found.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT * FROM hd_seeds WHERE id=?", (seed_id,))
+    row = cursor.fetchone()
+    conn.close()
+
+    return dict(row) if row else None
+
+@timed("db")
+def reserve_hd_indexes(seed_id: int, count: int) -> int:
+    """
+    Reserves count consecutive derivation indexes of a seed, returns the first one.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    # Write lock up front, two processes never get the same indexes
+    cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("SELECT next_index FROM hd_seeds WHERE id=?", (seed_id,))
+    first_index = cursor.fetchone()[0]
+    cursor.execute("UPDATE hd_seeds SET next_index=? WHERE id=?", (first_index + count, seed_id))
+    conn.commit()
+    conn.close()
+
+    return first_index
+
+@timed("db")
+def update_hd_seed(seed_id: int, seed_encrypted: bytes):
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("UPDATE hd_seeds SET seed_encrypted=? WHERE id=?", (seed_encrypted, seed_id))
+    conn.commit()
+    conn.close()
+
+@timed("db")
+def get_balance_snapshots(wallet_ids: list[int] = None) -> dict[int, dict]:
+    """
+    Returns wallet ID to snapshot, for the given wallets or all wallets. A snapshot is a dictionary with keys:
+    wallet_id, public_key, lamports, last_signature, slot, updated_timestamp and tokens, the wallet's token account
+    rows as dictionaries with keys: token_account, mint, amount, decimals, slot.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    where, params = "", []
+    if wallet_ids is not None:
+        where, params = "WHERE wallet_id IN ({})".format(','.join('?' * len(wallet_ids))), wallet_ids
+    cursor.execute(f"SELECT * FROM balance_snapshots {where}", params)
+    snapshots = {row["wallet_id"]: {**dict(row), "tokens": []} for row in cursor.fetchall()}
+    cursor.execute(f"SELECT * FROM token_balance_snapshots {where} ORDER BY wallet_id, mint", params)
+    for row in cursor.fetchall():
+        token = dict(row)
+        snapshots[token.pop("wallet_id")]["tokens"].append(token)
+    conn.close()
+
+    return snapshots
+
+@timed("db")
+def upsert_balance_snapshots(snapshots: list[dict]):
+    """
+    Replaces the snapshots of the given wallets, token rows included, in one transaction.
+    Takes dictionaries shaped like the ones get_balance_snapshots returns, without updated_timestamp.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    now = str(datetime.now())
+    for snapshot in snapshots:
+        cursor.execute('''
+            INSERT INTO balance_snapshots (wallet_id, public_key, lamports, last_signature, slot, updated_timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(wallet_id) DO UPDATE SET public_key=excluded.public_key, lamports=excluded.lamports,
+                last_signature=excluded.last_signature, slot=excluded.slot, updated_timestamp=excluded.updated_timestamp
+        ''', (snapshot["wallet_id"], snapshot["public_key"], snapshot["lamports"], snapshot["last_signature"], snapshot["slot"], now))
+        cursor.execute("DELETE FROM token_balance_snapshots WHERE wallet_id=?", (snapshot["wallet_id"],))
+        cursor.executemany('''
+            INSERT INTO token_balance_snapshots (wallet_id, token_account, mint, amount, decimals, slot)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (snapshot["wallet_id"], t["token_account"], t["mint"], t["amount"], t["decimals"], t["slot"])
+            for t in snapshot["tokens"]
+        ])
+    conn.commit()
+    conn.close()
+
+@timed("db")
+def get_sol_exposure(wallet_ids: list[int] = None) -> dict:
+    """
+    Returns the SOL held by the snapshotted wallets as a dictionary with keys: wallets, lamports, min_slot, max_slot.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    where, params = "", []
+    if wallet_ids is not None:
+        where, params = "WHERE wallet_id IN ({})".format(','.join('?' * len(wallet_ids))), wallet_ids
+    cursor.execute(f'''
+        SELECT COUNT(*) AS wallets, COALESCE(SUM(lamports), 0) AS lamports, MIN(slot) AS min_slot, MAX(slot) AS max_slot
+        FROM balance_snapshots {where}
+    ''', params)
+    row = cursor.fetchone()
+    conn.close()
+
+    return dict(row)
+
+@timed("db")
+def get_token_exposure(mint: str = None, wallet_ids: list[int] = None) -> list[dict]:
+    """
+    Returns the snapshotted holdings per mint, largest first, as dictionaries with keys:
+    mint, decimals, amount (raw), holders, min_slot, max_slot. Empty token accounts are left out.
+    """
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    conditions, params = ["amount > 0"], []
+    if mint is not None:
+        conditions.append("mint=?")
+        params.append(mint)
+    if wallet_ids is not None:
+        conditions.append("wallet_id IN ({})".format(','.join('?' * len(wallet_ids))))
+        params += wallet_ids
+    cursor.execute(f'''
+        SELECT mint, MAX(decimals) AS decimals, SUM(amount) AS amount, COUNT(DISTINCT wallet_id) AS holders,
+            MIN(slot) AS min_slot, MAX(slot) AS max_slot
+        FROM token_balance_snapshots WHERE {' AND '.join(conditions)}
+        GROUP BY mint ORDER BY SUM(amount) DESC
+    ''', params)
+    rows = cursor.fetchall()
+    conn.close()
+
+    return [dict(row) for row in rows]
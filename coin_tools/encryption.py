@@ -1,6 +1,28 @@
+"""
+Envelope encryption of private keys.
+
+Private keys are encrypted with a Fernet data key stored in the encryption_keys table, wrapped (encrypted)
+by the master key in COINTOOLS_ENC_KEY. A wallet blob is b"env1:<data key id>:<fernet token>", rotating the
+master key only re-wraps the data keys instead of re-encrypting every wallet. Blobs without the prefix are
+the original format, encrypted directly with the master key; they stay readable until `wallets encryption --migrate`.
+The wallets table records the data key of every blob as its key_version, 0 for the original format.
+HD wallets (see hd.py) store a derivation reference instead of a key, decrypt_data derives their private key from the seed.
+"""
 import os
+from functools import lru_cache
 from cryptography.fernet import Fernet
 
+from coin_tools.db import get_db_path, get_encryption_keys, get_hd_seed, insert_encryption_key, update_encryption_keys
+from coin_tools.hd import derivation_path, derive_private_key, is_hd_reference, parse_hd_reference
+from coin_tools.key_format import DERIVED_KEY_VERSION, ENVELOPE_PREFIX, is_envelope, key_version
+
+# (db path, master key, data key id) -> unwrapped data key
+data_keys = {}
+# (db path, master key) -> ID of the data key new blobs are encrypted with
+active_key_ids = {}
+# (db path, master key, seed id) -> decrypted HD master seed
+hd_seeds = {}
+
 def get_encryption_key() -> bytes:
     """
     Retrieve the encryption key from an environment variable.
@@ -11,18 +33,95 @@ def get_encryption_key() -> bytes:
         raise EnvironmentError("Environment variable COINTOOLS_ENC_KEY is required but not set.")
     return key.encode('utf-8')
 
-def encrypt_data(data: bytes, override_key = None) -> bytes:
+@lru_cache(maxsize=32)
+def get_fernet(key: bytes) -> Fernet:
+    """
+    Returns the Fernet for a key, built once per key instead of on every call.
+    """
+    return Fernet(key)
+
+def get_data_key(key_id: int, master_key: bytes) -> Fernet:
+    """
+    Returns the data key with this ID, unwrapped with the master key.
+    """
+    cache_key = (get_db_path(), master_key, key_id)
+    if cache_key not in data_keys:
+        wrapped_key = get_encryption_keys().get(key_id)
+        if wrapped_key is None:
+            raise ValueError(f"Data key {key_id} not found in the encryption_keys table.")
+        data_keys[cache_key] = get_fernet(master_key).decrypt(wrapped_key)
+    return get_fernet(data_keys[cache_key])
+
+def create_data_key(master_key: bytes) -> int:
+    """
+    Adds a new data key wrapped by the master key, it becomes the active data key. Returns its ID.
+    """
+    key_id = insert_encryption_key(get_fernet(master_key).encrypt(Fernet.generate_key()))
+    active_key_ids[(get_db_path(), master_key)] = key_id
+    return key_id
+
+def get_active_data_key(master_key: bytes) -> tuple[int, Fernet]:
     """
-    Encrypts bytes using Fernet symmetric encryption.
+    Returns the newest data key, creating the first one if the DB has none.
     """
-    key = get_encryption_key() if not override_key else override_key
-    f = Fernet(key)
-    return f.encrypt(data)
+    cache_key = (get_db_path(), master_key)
+    if cache_key not in active_key_ids:
+        key_ids = get_encryption_keys().keys()
+        if key_ids:
+            active_key_ids[cache_key] = max(key_ids)
+        else:
+            create_data_key(master_key)
+    key_id = active_key_ids[cache_key]
+    return key_id, get_data_key(key_id, master_key)
+
+def encrypt_data(data: bytes) -> bytes:
+    """
+    Encrypts bytes with the active data key.
+    """
+    key_id, f = get_active_data_key(get_encryption_key())
+    return ENVELOPE_PREFIX + str(key_id).encode() + b":" + f.encrypt(data)
+
+def reencrypt_batch(encrypted_data: list[bytes], key_id: int) -> list[bytes]:
+    """
+    Decrypts blobs and encrypts them again with the data key key_id. Runs in worker processes during re-encryption.
+    """
+    f = get_data_key(key_id, get_encryption_key())
+    prefix = ENVELOPE_PREFIX + str(key_id).encode() + b":"
+    return [prefix + f.encrypt(decrypt_data(blob)) for blob in encrypted_data]
 
 def decrypt_data(encrypted_data: bytes) -> bytes:
     """
-    Decrypts bytes using Fernet symmetric encryption.
+    Decrypts an envelope blob, or a blob in the original format encrypted directly with the master key.
     """
     key = get_encryption_key()
-    f = Fernet(key)
+    if is_hd_reference(encrypted_data):
+        seed_id, index = parse_hd_reference(encrypted_data)
+        return derive_private_key(get_hd_seed_bytes(seed_id, key), derivation_path(index))
+    if is_envelope(encrypted_data):
+        key_id, token = bytes(encrypted_data[len(ENVELOPE_PREFIX):]).split(b":", 1)
+        return get_data_key(int(key_id), key).decrypt(token)
+    f = get_fernet(key)
     return f.decrypt(encrypted_data)
+
+def get_hd_seed_bytes(seed_id: int, master_key: bytes) -> bytes:
+    """
+    Returns the decrypted HD master seed, decrypted once per process.
+    """
+    cache_key = (get_db_path(), master_key, seed_id)
+    if cache_key not in hd_seeds:
+        seed = get_hd_seed(seed_id)
+        if seed is None:
+            raise ValueError(f"HD seed {seed_id} not found in the hd_seeds table.")
+        hd_seeds[cache_key] = decrypt_data(seed["seed_encrypted"])
+    return hd_seeds[cache_key]
+
+def rewrap_data_keys(new_master_key: bytes) -> int:
+    """
+    Re-wraps every data key from the current master key to new_master_key in one transaction.
+    Returns the number of data keys re-wrapped.
+    """
+    old = get_fernet(get_encryption_key())
+    new = get_fernet(new_master_key)
+    rewrapped = {key_id: new.encrypt(old.decrypt(wrapped_key)) for key_id, wrapped_key in get_encryption_keys().items()}
+    update_encryption_keys(rewrapped)
+    return len(rewrapped)
@@ -0,0 +1,49 @@
+"""
+Deterministic (HD) wallets.
+
+Wallets made with `wallets bulk-create --hd` store no private key of their own. Their private_key_encrypted
+column holds the reference b"hd1:<seed id>:<index>" and the key is derived on demand from the encrypted master
+seed in the hd_seeds table, along the SLIP-0010 ed25519 path m/44'/501'/<index>'/0' used by Solana wallets.
+"""
+import hashlib
+import hmac
+
+HD_PREFIX = b"hd1:"
+HARDENED = 0x80000000
+SEED_BYTES = 32
+SOLANA_PURPOSE, SOLANA_COIN_TYPE = 44, 501
+
+
+def derivation_path(index: int) -> list[int]:
+    return [SOLANA_PURPOSE, SOLANA_COIN_TYPE, index, 0]
+
+
+def format_path(path: list[int]) -> str:
+    return "m/" + "/".join(f"{i}'" for i in path)
+
+
+def derive_private_key(seed: bytes, path: list[int]) -> bytes:
+    """
+    SLIP-0010 ed25519 derivation, every level is hardened. Returns the 32 byte private key (a Keypair seed).
+    """
+    digest = hmac.new(b"ed25519 seed", seed, hashlib.sha512).digest()
+    key, chain_code = digest[:32], digest[32:]
+    for index in path:
+        data = b"\x00" + key + (index | HARDENED).to_bytes(4, "big")
+        digest = hmac.new(chain_code, data, hashlib.sha512).digest()
+        key, chain_code = digest[:32], digest[32:]
+    return key
+
+
+def hd_reference(seed_id: int, index: int) -> bytes:
+    return HD_PREFIX + f"{seed_id}:{index}".encode()
+
+
+def is_hd_reference(private_key_encrypted: bytes) -> bool:
+    return bytes(private_key_encrypted[:len(HD_PREFIX)]) == HD_PREFIX
+
+
+def parse_hd_reference(reference: bytes) -> tuple[int, int]:
+    """Returns (seed id, index) of a b"hd1:<seed id>:<index>" reference."""
+    seed_id, index = bytes(reference[len(HD_PREFIX):]).split(b":")
+    return int(seed_id), int(index)
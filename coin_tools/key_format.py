@@ -0,0 +1,25 @@
+"""
+Formats of the private_key_encrypted column, kept free of DB and key access so db.py can record key versions.
+
+b"env1:<data key id>:<fernet token>" is an envelope blob (see encryption.py), b"hd1:<seed id>:<index>" an HD
+derivation reference (see hd.py), anything else the original format encrypted directly with the master key.
+"""
+from coin_tools.hd import is_hd_reference
+
+ENVELOPE_PREFIX = b"env1:"
+DERIVED_KEY_VERSION = -1  # key_version of HD wallets, nothing to re-encrypt
+
+
+def is_envelope(encrypted_data: bytes) -> bool:
+    return bytes(encrypted_data[:len(ENVELOPE_PREFIX)]) == ENVELOPE_PREFIX
+
+
+def key_version(encrypted_data: bytes) -> int:
+    """
+    ID of the data key a blob is encrypted with, 0 for a blob encrypted directly with the master key.
+    """
+    if is_hd_reference(encrypted_data):
+        return DERIVED_KEY_VERSION
+    if not is_envelope(encrypted_data):
+        return 0
+    return int(bytes(encrypted_data[len(ENVELOPE_PREFIX):]).split(b":", 1)[0])
@@ -0,0 +1,90 @@
+"""
+Session keyring.
+
+Loads the selected wallets from the DB in one query and decrypts each private key at most once, the Keypairs
+are then shared by every step of a command (bulk loops, migrate, sweeps) instead of being decrypted per call.
+close() (or leaving the `with` block) overwrites the decrypted key bytes and drops the Keypairs.
+Wallets held by a running key agent (see agent.py) are neither read from the DB nor decrypted, the agent signs for them.
+"""
+from solders.keypair import Keypair  #type: ignore
+
+from coin_tools.agent import AgentError, AgentSigner, get_agent_client
+from coin_tools.db import get_wallets_by_ids
+from coin_tools.encryption import decrypt_data
+from coin_tools.solana.utils import parse_private_key_bytes
+from coin_tools.tracing import span
+
+
+class Keyring:
+    def __init__(self, use_agent: bool = True):
+        self.wallets = {}
+        self.keypairs = {}
+        self.secrets = {}
+        self.agent = get_agent_client() if use_agent else None
+        self.agent_wallets = {}
+        if self.agent:
+            try:
+                self.agent_wallets = self.agent.wallets()
+            except (OSError, ValueError, AgentError) as e:
+                print(f"Warning: key agent unavailable, decrypting locally: {e}")
+                self.agent = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def load(self, wallet_ids: list[int], include_deleted: bool = False) -> list[dict]:
+        """
+        Fetches the wallets not loaded yet in one DB query, returns the wallets found ordered by ID like get_wallets_by_ids.
+        Deleted wallets are loaded too but only returned with include_deleted, pass it for IDs named explicitly
+        rather than enumerated from a range.
+        """
+        for wallet_id in wallet_ids:
+            if wallet_id in self.agent_wallets:
+                self.wallets.setdefault(wallet_id, self.agent_wallets[wallet_id])
+        missing = [wallet_id for wallet_id in dict.fromkeys(wallet_ids) if wallet_id not in self.wallets]
+        if missing:
+            with span("db_lookup", count=len(missing)):
+                for wallet in get_wallets_by_ids(missing, include_deleted=True):
+                    self.wallets[wallet["id"]] = wallet
+        wallets = (self.wallets[wallet_id] for wallet_id in set(wallet_ids) if wallet_id in self.wallets)
+        return sorted((w for w in wallets if include_deleted or w.get("status") != "deleted"), key=lambda w: w["id"])
+
+    def wallet(self, wallet_id: int) -> dict:
+        """Returns the wallet row, deleted or not like get_wallet_by_id, or None if there is no such wallet."""
+        self.load([wallet_id], include_deleted=True)
+        return self.wallets.get(wallet_id)
+
+    def keypair(self, wallet_id: int) -> Keypair:
+        """
+        Returns the wallet's Keypair, decrypting its private key on first use, or an AgentSigner if the key agent holds it.
+        Raises KeyError if there is no such wallet.
+        """
+        keypair = self.keypairs.get(wallet_id)
+        if keypair is None and wallet_id in self.agent_wallets:
+            keypair = AgentSigner(self.agent, wallet_id, self.agent_wallets[wallet_id]["public_key"])
+            self.keypairs[wallet_id] = keypair
+        elif keypair is None:
+            wallet = self.wallet(wallet_id)
+            if wallet is None:
+                raise KeyError(f"No wallet found with ID={wallet_id}")
+            with span("decrypt", wallet_id=wallet_id):
+                secret = bytearray(decrypt_data(wallet["private_key_encrypted"]))
+            self.secrets[wallet_id] = secret
+            with span("parse_key", wallet_id=wallet_id):
+                keypair = parse_private_key_bytes(bytes(secret))
+            self.keypairs[wallet_id] = keypair
+        return keypair
+
+    def close(self):
+        """
+        Zeroes the decrypted key bytes held by the keyring and forgets every Keypair.
+        Python cannot wipe immutable bytes or the Keypair's own copy, those are released once unreferenced.
+        """
+        for secret in self.secrets.values():
+            secret[:] = bytes(len(secret))
+        self.secrets.clear()
+        self.keypairs.clear()
+        self.wallets.clear()
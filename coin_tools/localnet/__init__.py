@@ -0,0 +1,8 @@
+"""
+Local stand-in for a Solana RPC node, for offline end to end benchmarks.
+
+ledger.py keeps SOL balances, SPL mints and token accounts, nonce accounts, lookup tables and pump.fun
+bonding curves in memory and executes the transactions coin_tools sends. server.py serves it over JSON-RPC
+with injectable latency and errors. Run it with `python -m coin_tools.localnet` and point COINTOOLS_RPC_URL
+(and COINTOOLS_BUNDLE_URL) at it.
+"""
@@ -0,0 +1,3 @@
+from coin_tools.localnet.server import main
+
+main()
@@ -0,0 +1,651 @@
+"""
+In-memory ledger for the local RPC stand-in.
+
+Executes the instructions coin_tools builds: system transfers, account creation and nonces, SPL token
+transfers and closes, associated token account creation, lookup table create/extend and pump.fun buys
+and sells against constant product bonding curves. Instructions of other programs succeed without effect.
+Every transaction runs against a copy-on-write overlay so a failing instruction rolls back the whole
+transaction (or bundle), only the fee is kept, as on chain.
+"""
+import hashlib
+import os
+import struct
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, replace
+
+from solana.constants import SYSTEM_PROGRAM_ID
+from solders.address_lookup_table_account import ID as LOOKUP_TABLE_PROGRAM_ID, LOOKUP_TABLE_META_SIZE  #type: ignore
+from solders.compute_budget import ID as COMPUTE_BUDGET_PROGRAM_ID  #type: ignore
+from solders.hash import Hash  #type: ignore
+from solders.message import MessageV0  #type: ignore
+from solders.pubkey import Pubkey as PublicKey  #type: ignore
+from solders.transaction import VersionedTransaction  #type: ignore
+from spl.token.constants import ASSOCIATED_TOKEN_PROGRAM_ID, TOKEN_PROGRAM_ID
+from spl.token.instructions import get_associated_token_address
+
+from coin_tools.pump_fun.constants import FEE_RECIPIENT, PUMP_FUN_PROGRAM
+
+SIGNATURE_FEE_LAMPORTS = 5000
+DEFAULT_UNIT_LIMIT = 200_000  # per instruction when the transaction sets no compute unit limit
+BLOCKHASH_VALID_BLOCKS = 150
+RECENT_BLOCKHASHES = 300  # blockhashes remembered, older ones are reported as not found
+RECENT_FEE_SLOTS = 150  # slots reported by getRecentPrioritizationFees
+MINT_SIZE = 82
+TOKEN_ACCOUNT_SIZE = 165
+NONCE_ACCOUNT_SIZE = 80
+PUMP_FUN_FEE_BPS = 100
+
+# Compute units charged per instruction, rough mainnet figures
+PROGRAM_UNITS = {
+    COMPUTE_BUDGET_PROGRAM_ID: 150,
+    SYSTEM_PROGRAM_ID: 150,
+    TOKEN_PROGRAM_ID: 4_500,
+    ASSOCIATED_TOKEN_PROGRAM_ID: 22_000,
+    LOOKUP_TABLE_PROGRAM_ID: 1_200,
+    PUMP_FUN_PROGRAM: 38_000,
+}
+DEFAULT_PROGRAM_UNITS = 1_000
+
+# Launch state of a pump.fun bonding curve
+INITIAL_VIRTUAL_TOKEN_RESERVES = 1_073_000_000_000_000
+INITIAL_VIRTUAL_SOL_RESERVES = 30_000_000_000
+INITIAL_REAL_TOKEN_RESERVES = 793_100_000_000_000
+TOKEN_TOTAL_SUPPLY = 1_000_000_000_000_000
+PUMP_FUN_DECIMALS = 6
+BONDING_CURVE_DISCRIMINATOR = bytes.fromhex("17b7f83760d8ac60")
+BUY_DISCRIMINATOR = bytes.fromhex("66063d1201daebea")
+SELL_DISCRIMINATOR = bytes.fromhex("33e685a4017f83ad")
+TOO_MUCH_SOL_REQUIRED = 6002
+TOO_LITTLE_SOL_RECEIVED = 6003
+CUSTOM_INSUFFICIENT_FUNDS = 1
+
+
+@dataclass
+class Account:
+    lamports: int
+    data: bytes = b""
+    owner: PublicKey = SYSTEM_PROGRAM_ID
+    executable: bool = False
+
+
+class InstructionError(Exception):
+    def __init__(self, error):
+        super().__init__(str(error))
+        self.error = error  # "InvalidAccountData" style name or a custom program error code
+
+
+class TransactionError(Exception):
+    def __init__(self, err, logs: list[str] = None, units: int = 0):
+        super().__init__(str(err))
+        self.err = err  # RPC JSON form, e.g. {"InstructionError": [1, {"Custom": 1}]} or "BlockhashNotFound"
+        self.logs = logs or []
+        self.units = units
+
+
+def rent_exempt_minimum(size: int) -> int:
+    """Lamports for an account of size bytes to be rent exempt: two years of rent on the data plus 128 bytes of overhead."""
+    return (128 + size) * 3480 * 2
+
+
+def pack_mint(supply: int, decimals: int) -> bytes:
+    return struct.pack("<I32sQBBI32s", 0, bytes(32), supply, decimals, 1, 0, bytes(32))
+
+
+def pack_token_account(mint: PublicKey, owner: PublicKey, amount: int) -> bytes:
+    return struct.pack("<32s32sQI32sBIQQI32s", bytes(mint), bytes(owner), amount, 0, bytes(32), 1, 0, 0, 0, 0, bytes(32))
+
+
+def pack_nonce(authority: PublicKey, nonce: Hash) -> bytes:
+    return struct.pack("<II32s32sQ", 1, 1, bytes(authority), bytes(nonce), SIGNATURE_FEE_LAMPORTS)
+
+
+def pack_lookup_table(authority: PublicKey, addresses: list[PublicKey], slot: int) -> bytes:
+    meta = struct.pack("<IQQBB32sH", 1, 2**64 - 1, slot, 0, 1, bytes(authority), 0)
+    return meta + b"".join(bytes(address) for address in addresses)
+
+
+def pack_bonding_curve(virtual_token: int, virtual_sol: int, real_token: int, real_sol: int, supply: int, complete: bool = False) -> bytes:
+    return BONDING_CURVE_DISCRIMINATOR + struct.pack("<QQQQQ?", virtual_token, virtual_sol, real_token, real_sol, supply, complete) + bytes(32)
+
+
+def token_account_fields(data: bytes) -> tuple[PublicKey, PublicKey, int]:
+    """Returns mint, owner and amount of a token account."""
+    mint, owner, amount = struct.unpack_from("<32s32sQ", data)
+    return PublicKey(mint), PublicKey(owner), amount
+
+
+def error_message(err) -> str:
+    """Formats a transaction error the way preflight failures are reported by an RPC node."""
+    if isinstance(err, dict) and "InstructionError" in err:
+        index, error = err["InstructionError"]
+        if isinstance(error, dict) and "Custom" in error:
+            return f"Error processing Instruction {index}: custom program error: {hex(error['Custom'])}"
+        return f"Error processing Instruction {index}: {error}"
+    return str(err)
+
+
+class Overlay:
+    """Copy-on-write view of the ledger accounts, changes are applied with Ledger.commit."""
+
+    def __init__(self, ledger: "Ledger"):
+        self.ledger = ledger
+        self.changes = {}  # pubkey -> Account, None when closed
+
+    def get(self, pubkey: PublicKey):
+        if pubkey in self.changes:
+            return self.changes[pubkey]
+        account = self.ledger.accounts.get(pubkey)
+        if account is None:
+            return None
+        account = replace(account)
+        self.changes[pubkey] = account
+        return account
+
+    def put(self, pubkey: PublicKey, account):
+        self.changes[pubkey] = account
+
+    def lamports(self, pubkey: PublicKey) -> int:
+        account = self.get(pubkey)
+        return account.lamports if account else 0
+
+    def debit(self, pubkey: PublicKey, lamports: int, error=CUSTOM_INSUFFICIENT_FUNDS):
+        account = self.get(pubkey)
+        if account is None or account.lamports < lamports:
+            raise InstructionError(error)
+        account.lamports -= lamports
+
+    def credit(self, pubkey: PublicKey, lamports: int):
+        account = self.get(pubkey)
+        if account is None:
+            account = Account(lamports=0)
+            self.put(pubkey, account)
+        account.lamports += lamports
+
+    def token_account(self, pubkey: PublicKey):
+        account = self.get(pubkey)
+        if account is None or account.owner != TOKEN_PROGRAM_ID or len(account.data) != TOKEN_ACCOUNT_SIZE:
+            raise InstructionError("InvalidAccountData")
+        return account
+
+    def move_tokens(self, source: PublicKey, destination: PublicKey, amount: int):
+        source_account = self.token_account(source)
+        destination_account = self.token_account(destination)
+        mint, owner, balance = token_account_fields(source_account.data)
+        if token_account_fields(destination_account.data)[0] != mint:
+            raise InstructionError(3)  # MintMismatch
+        if balance < amount:
+            raise InstructionError(CUSTOM_INSUFFICIENT_FUNDS)
+        source_account.data = pack_token_account(mint, owner, balance - amount)
+        _, destination_owner, destination_balance = token_account_fields(destination_account.data)
+        destination_account.data = pack_token_account(mint, destination_owner, destination_balance + amount)
+
+
+class Ledger:
+    """
+    Accounts keyed by pubkey plus slot, block height, recent blockhashes and signature statuses.
+    All public methods are thread safe, the HTTP server calls them from a thread per connection.
+    """
+
+    def __init__(self, finalize_slots: int = 32):
+        self.accounts = {}  # pubkey -> Account
+        self.token_accounts_by_owner = {}  # owner -> set of token account pubkeys
+        self.slot = 1
+        self.block_height = 1
+        self.blockhashes = OrderedDict()  # Hash -> last valid block height
+        self.statuses = {}  # Signature -> (slot, err)
+        self.signatures_by_address = {}  # pubkey -> signatures of the transactions referencing it, oldest first
+        self.fees = deque()  # (slot, writable accounts, unit price) of landed transactions
+        self.finalize_slots = finalize_slots
+        self.lock = threading.RLock()
+        self.advance()
+
+    # Clock
+
+    def advance(self):
+        """Produces a block: the slot and block height move on and a new blockhash becomes current."""
+        with self.lock:
+            self.slot += 1
+            self.block_height += 1
+            blockhash = Hash(hashlib.sha256(struct.pack("<Q", self.slot) + os.urandom(8)).digest())
+            self.blockhashes[blockhash] = self.block_height + BLOCKHASH_VALID_BLOCKS
+            while len(self.blockhashes) > RECENT_BLOCKHASHES:
+                self.blockhashes.popitem(last=False)
+            while self.fees and self.fees[0][0] <= self.slot - RECENT_FEE_SLOTS:
+                self.fees.popleft()
+
+    def latest_blockhash(self) -> tuple[Hash, int]:
+        with self.lock:
+            return next(reversed(self.blockhashes.items()))
+
+    # Seeding
+
+    def set_account(self, pubkey: PublicKey, account):
+        with self.lock:
+            self.commit({pubkey: account})
+
+    def fund(self, pubkey: PublicKey, lamports: int):
+        with self.lock:
+            account = self.accounts.get(pubkey)
+            self.set_account(pubkey, replace(account, lamports=account.lamports + lamports) if account else Account(lamports=lamports))
+
+    def create_mint(self, mint: PublicKey, decimals: int = PUMP_FUN_DECIMALS, supply: int = TOKEN_TOTAL_SUPPLY):
+        self.set_account(mint, Account(rent_exempt_minimum(MINT_SIZE), pack_mint(supply, decimals), TOKEN_PROGRAM_ID))
+
+    def create_token_account(self, owner: PublicKey, mint: PublicKey, amount: int = 0) -> PublicKey:
+        ata = get_associated_token_address(owner, mint)
+        self.set_account(ata, Account(rent_exempt_minimum(TOKEN_ACCOUNT_SIZE), pack_token_account(mint, owner, amount), TOKEN_PROGRAM_ID))
+        return ata
+
+    def create_pump_curve(self, mint: PublicKey, virtual_sol_reserves: int = INITIAL_VIRTUAL_SOL_RESERVES,
+                          virtual_token_reserves: int = INITIAL_VIRTUAL_TOKEN_RESERVES) -> PublicKey:
+        """Creates a mint and its pump.fun bonding curve holding the unsold supply, returns the bonding curve."""
+        bonding_curve, _ = PublicKey.find_program_address([b"bonding-curve", bytes(mint)], PUMP_FUN_PROGRAM)
+        sold = INITIAL_VIRTUAL_TOKEN_RESERVES - virtual_token_reserves
+        real_sol = virtual_sol_reserves - INITIAL_VIRTUAL_SOL_RESERVES
+        with self.lock:
+            self.create_mint(mint)
+            self.set_account(bonding_curve, Account(
+                rent_exempt_minimum(150) + real_sol,
+                pack_bonding_curve(virtual_token_reserves, virtual_sol_reserves, INITIAL_REAL_TOKEN_RESERVES - sold, real_sol, TOKEN_TOTAL_SUPPLY),
+                PUMP_FUN_PROGRAM,
+            ))
+            self.create_token_account(bonding_curve, mint, TOKEN_TOTAL_SUPPLY - sold)
+            if FEE_RECIPIENT not in self.accounts:
+                self.fund(FEE_RECIPIENT, rent_exempt_minimum(0))
+        return bonding_curve
+
+    # Reads
+
+    def get_account(self, pubkey: PublicKey):
+        with self.lock:
+            account = self.accounts.get(pubkey)
+            return replace(account) if account else None
+
+    def get_token_accounts(self, owner: PublicKey, mint: PublicKey = None) -> list[tuple[PublicKey, Account]]:
+        with self.lock:
+            results = []
+            for pubkey in sorted(self.token_accounts_by_owner.get(owner, ()), key=bytes):
+                account = self.accounts[pubkey]
+                if mint is None or token_account_fields(account.data)[0] == mint:
+                    results.append((pubkey, replace(account)))
+            return results
+
+    def signature_statuses(self, signatures: list) -> list:
+        """Returns (slot, confirmations, err, confirmation status) per signature, None for unknown ones."""
+        with self.lock:
+            results = []
+            for signature in signatures:
+                status = self.statuses.get(signature)
+                if status is None:
+                    results.append(None)
+                    continue
+                slot, err = status
+                depth = self.slot - slot
+                if depth >= self.finalize_slots:
+                    results.append((slot, None, err, "finalized"))
+                else:
+                    results.append((slot, depth, err, "confirmed" if depth > 0 else "processed"))
+            return results
+
+    def signatures_for_address(self, address: PublicKey, limit: int, before=None, until=None) -> list:
+        """Returns (signature, slot, err) of the transactions referencing an address, newest first, between before and until (both excluded)."""
+        with self.lock:
+            results = []
+            for signature in reversed(self.signatures_by_address.get(address, [])):
+                if before is not None:
+                    if signature == before:
+                        before = None
+                    continue
+                if signature == until or len(results) >= limit:
+                    break
+                results.append((signature, *self.statuses[signature]))
+            return results
+
+    def prioritization_fees(self, accounts: list[PublicKey]) -> list[tuple[int, int]]:
+        """Returns (slot, fee) for recent slots, the fee being the lowest unit price paid by a transaction locking the accounts."""
+        wanted = set(accounts)
+        with self.lock:
+            by_slot = {slot: 0 for slot in range(max(1, self.slot - RECENT_FEE_SLOTS + 1), self.slot + 1)}
+            lowest = {}
+            for slot, writable, price in self.fees:
+                if not wanted or wanted & writable:
+                    lowest[slot] = min(lowest.get(slot, price), price)
+            by_slot.update(lowest)
+            return sorted(by_slot.items())
+
+    # Writes
+
+    def commit(self, changes: dict):
+        """Applies overlay changes, keeping the owner index of token accounts current."""
+        for pubkey, account in changes.items():
+            previous = self.accounts.get(pubkey)
+            if previous is not None and previous.owner == TOKEN_PROGRAM_ID and len(previous.data) == TOKEN_ACCOUNT_SIZE:
+                self.token_accounts_by_owner.get(token_account_fields(previous.data)[1], set()).discard(pubkey)
+            if account is None:
+                self.accounts.pop(pubkey, None)
+                continue
+            self.accounts[pubkey] = account
+            if account.owner == TOKEN_PROGRAM_ID and len(account.data) == TOKEN_ACCOUNT_SIZE:
+                self.token_accounts_by_owner.setdefault(token_account_fields(account.data)[1], set()).add(pubkey)
+
+    def simulate(self, raw_transaction: bytes, sig_verify: bool = False) -> tuple:
+        """Runs a transaction without applying it. Returns (err, logs, units consumed)."""
+        transaction = VersionedTransaction.from_bytes(raw_transaction)
+        with self.lock:
+            try:
+                if sig_verify:
+                    self.verify(transaction)
+                overlay = Overlay(self)
+                logs, units = self.execute(overlay, transaction, check_blockhash=False)
+                return None, logs, units
+            except TransactionError as e:
+                return e.err, e.logs, e.units
+
+    def send(self, raw_transaction: bytes, skip_preflight: bool = False):
+        """
+        Executes a signed transaction and returns its signature. Failing transactions raise TransactionError when
+        preflight is on; with preflight skipped they land with the error and pay the fee, unless the fee or blockhash
+        check fails, in which case they are dropped.
+        """
+        transaction = VersionedTransaction.from_bytes(raw_transaction)
+        signature = transaction.signatures[0]
+        with self.lock:
+            if signature in self.statuses:
+                return signature
+            self.verify(transaction)
+            self.land(transaction, skip_preflight)
+            return signature
+
+    def send_bundle(self, raw_transactions: list[bytes]) -> list:
+        """Executes transactions in order, all of them land or none do. Returns their signatures."""
+        transactions = [VersionedTransaction.from_bytes(raw) for raw in raw_transactions]
+        with self.lock:
+            overlay = Overlay(self)
+            landed = []
+            for transaction in transactions:
+                self.verify(transaction)
+                self.charge_fee(overlay, transaction)
+                self.execute(overlay, transaction)
+                landed.append(transaction)
+            self.commit(overlay.changes)
+            for transaction in landed:
+                self.record(transaction, None)
+            return [transaction.signatures[0] for transaction in landed]
+
+    def verify(self, transaction: VersionedTransaction):
+        if not all(transaction.verify_with_results()):
+            raise TransactionError("SignatureFailure")
+
+    def land(self, transaction: VersionedTransaction, skip_preflight: bool):
+        fee_overlay = Overlay(self)
+        self.charge_fee(fee_overlay, transaction)
+        overlay = Overlay(self)
+        overlay.changes = {pubkey: replace(account) for pubkey, account in fee_overlay.changes.items()}
+        try:
+            self.execute(overlay, transaction)
+        except TransactionError as e:
+            if not skip_preflight or e.err == "BlockhashNotFound":
+                raise
+            self.commit(fee_overlay.changes)
+            self.record(transaction, e.err)
+            return
+        self.commit(overlay.changes)
+        self.record(transaction, None)
+
+    def record(self, transaction: VersionedTransaction, err):
+        self.statuses[transaction.signatures[0]] = (self.slot, err)
+        message = transaction.message
+        header, keys = message.header, message.account_keys
+        for key in keys:
+            self.signatures_by_address.setdefault(key, []).append(transaction.signatures[0])
+        signed = header.num_required_signatures
+        writable = set(keys[:signed - header.num_readonly_signed_accounts] + keys[signed:len(keys) - header.num_readonly_unsigned_accounts])
+        self.fees.append((self.slot, writable, self.compute_budget(transaction)[1]))
+
+    # Execution
+
+    def compute_budget(self, transaction: VersionedTransaction) -> tuple[int, int]:
+        """Returns the compute unit limit and unit price set by the transaction."""
+        message = transaction.message
+        keys = message.account_keys
+        limit, price, count = None, 0, 0
+        for ix in message.instructions:
+            if keys[ix.program_id_index] != COMPUTE_BUDGET_PROGRAM_ID:
+                count += 1
+                continue
+            data = bytes(ix.data)
+            if data[0] == 2:
+                limit = struct.unpack_from("<I", data, 1)[0]
+            elif data[0] == 3:
+                price = struct.unpack_from("<Q", data, 1)[0]
+        return (limit if limit is not None else DEFAULT_UNIT_LIMIT * count), price
+
+    def charge_fee(self, overlay: Overlay, transaction: VersionedTransaction):
+        limit, price = self.compute_budget(transaction)
+        fee = SIGNATURE_FEE_LAMPORTS * len(transaction.signatures) + -(-limit * price // 1_000_000)
+        payer = transaction.message.account_keys[0]
+        if overlay.lamports(payer) < fee:
+            raise TransactionError("InsufficientFundsForFee")
+        overlay.debit(payer, fee)
+
+    def resolve_keys(self, overlay: Overlay, message) -> list[PublicKey]:
+        """Static account keys followed by the writable and then the readonly keys loaded from lookup tables."""
+        keys = list(message.account_keys)
+        if not isinstance(message, MessageV0):
+            return keys
+        writable, readonly = [], []
+        for lookup in message.address_table_lookups:
+            table = overlay.get(lookup.account_key)
+            if table is None or table.owner != LOOKUP_TABLE_PROGRAM_ID:
+                raise TransactionError("AddressLookupTableNotFound")
+            addresses = table.data[LOOKUP_TABLE_META_SIZE:]
+            try:
+                writable += [PublicKey(addresses[i * 32:(i + 1) * 32]) for i in bytes(lookup.writable_indexes)]
+                readonly += [PublicKey(addresses[i * 32:(i + 1) * 32]) for i in bytes(lookup.readonly_indexes)]
+            except ValueError:
+                raise TransactionError("InvalidAddressLookupTableIndex")
+        return keys + writable + readonly
+
+    def execute(self, overlay: Overlay, transaction: VersionedTransaction, check_blockhash: bool = True) -> tuple[list[str], int]:
+        """Runs every instruction on the overlay, raising TransactionError on the first failure. Returns logs and units."""
+        message = transaction.message
+        if check_blockhash and message.recent_blockhash not in self.blockhashes and not self.is_nonce_transaction(overlay, message):
+            raise TransactionError("BlockhashNotFound")
+        if check_blockhash and self.blockhashes.get(message.recent_blockhash, self.block_height) < self.block_height:
+            raise TransactionError("BlockhashNotFound")
+
+        keys = self.resolve_keys(overlay, message)
+        signers = set(keys[:message.header.num_required_signatures])
+        limit, _ = self.compute_budget(transaction)
+        logs, units = [], 0
+        for index, ix in enumerate(message.instructions):
+            program_id = keys[ix.program_id_index]
+            accounts = [keys[i] for i in bytes(ix.accounts)]
+            units += PROGRAM_UNITS.get(program_id, DEFAULT_PROGRAM_UNITS)
+            logs.append(f"Program {program_id} invoke [1]")
+            if units > limit:
+                logs.append(f"Program {program_id} failed: exceeded CUs meter at BPF instruction")
+                raise TransactionError({"InstructionError": [index, "ComputationalBudgetExceeded"]}, logs, limit)
+            try:
+                handler = PROGRAM_HANDLERS.get(program_id)
+                if handler:
+                    handler(self, overlay, accounts, bytes(ix.data), signers)
+            except InstructionError as e:
+                error = {"Custom": e.error} if isinstance(e.error, int) else e.error
+                logs.append(f"Program {program_id} failed: {error}")
+                raise TransactionError({"InstructionError": [index, error]}, logs, units)
+            except (IndexError, struct.error):
+                logs.append(f"Program {program_id} failed: invalid instruction data")
+                raise TransactionError({"InstructionError": [index, "InvalidInstructionData"]}, logs, units)
+            logs.append(f"Program {program_id} success")
+        return logs, units
+
+    def is_nonce_transaction(self, overlay: Overlay, message) -> bool:
+        """A transaction whose first instruction advances a nonce account holding its blockhash."""
+        if not message.instructions:
+            return False
+        ix = message.instructions[0]
+        keys = message.account_keys
+        if keys[ix.program_id_index] != SYSTEM_PROGRAM_ID or bytes(ix.data)[:4] != struct.pack("<I", 4):
+            return False
+        nonce_account = overlay.get(keys[bytes(ix.accounts)[0]])
+        return nonce_account is not None and len(nonce_account.data) == NONCE_ACCOUNT_SIZE and nonce_account.data[40:72] == bytes(message.recent_blockhash)
+
+    def require_signer(self, signers: set, pubkey: PublicKey):
+        if pubkey not in signers:
+            raise InstructionError("MissingRequiredSignature")
+
+    def system_instruction(self, overlay: Overlay, accounts: list, data: bytes, signers: set):
+        kind = struct.unpack_from("<I", data)[0]
+        if kind == 0:  # create account
+            lamports, space = struct.unpack_from("<QQ", data, 4)
+            owner = PublicKey(data[20:52])
+            payer, new_account = accounts[0], accounts[1]
+            self.require_signer(signers, new_account)
+            if overlay.get(new_account) is not None and (overlay.get(new_account).data or overlay.get(new_account).owner != SYSTEM_PROGRAM_ID):
+                raise InstructionError(0)  # AccountAlreadyInUse
+            overlay.debit(payer, lamports)
+            overlay.credit(new_account, lamports)
+            account = overlay.get(new_account)
+            account.data, account.owner = bytes(space), owner
+        elif kind == 2:  # transfer
+            lamports = struct.unpack_from("<Q", data, 4)[0]
+            self.require_signer(signers, accounts[0])
+            overlay.debit(accounts[0], lamports)
+            overlay.credit(accounts[1], lamports)
+        elif kind == 4:  # advance nonce
+            account = overlay.get(accounts[0])
+            if account is None or len(account.data) != NONCE_ACCOUNT_SIZE:
+                raise InstructionError("InvalidAccountData")
+            authority = PublicKey(account.data[8:40])
+            self.require_signer(signers, authority)
+            account.data = pack_nonce(authority, self.latest_blockhash()[0])
+        elif kind == 5:  # withdraw nonce, withdrawing everything closes the account
+            lamports = struct.unpack_from("<Q", data, 4)[0]
+            account = overlay.get(accounts[0])
+            if account is None or len(account.data) != NONCE_ACCOUNT_SIZE:
+                raise InstructionError("InvalidAccountData")
+            self.require_signer(signers, PublicKey(account.data[8:40]))
+            overlay.debit(accounts[0], lamports)
+            overlay.credit(accounts[1], lamports)
+            if account.lamports == 0:
+                overlay.put(accounts[0], None)
+        elif kind == 6:  # initialize nonce
+            account = overlay.get(accounts[0])
+            if account is None or len(account.data) != NONCE_ACCOUNT_SIZE:
+                raise InstructionError("InvalidAccountData")
+            account.data = pack_nonce(PublicKey(data[4:36]), self.latest_blockhash()[0])
+
+    def token_instruction(self, overlay: Overlay, accounts: list, data: bytes, signers: set):
+        kind = data[0]
+        if kind in (3, 12):  # transfer, transfer checked
+            amount = struct.unpack_from("<Q", data, 1)[0]
+            source, destination, authority = (accounts[0], accounts[1], accounts[2]) if kind == 3 else (accounts[0], accounts[2], accounts[3])
+            if token_account_fields(overlay.token_account(source).data)[1] != authority:
+                raise InstructionError(4)  # OwnerMismatch
+            self.require_signer(signers, authority)
+            overlay.move_tokens(source, destination, amount)
+        elif kind == 9:  # close account
+            account = overlay.token_account(accounts[0])
+            _, owner, amount = token_account_fields(account.data)
+            self.require_signer(signers, owner)
+            if amount:
+                raise InstructionError(11)  # NonNativeHasBalance
+            overlay.credit(accounts[1], account.lamports)
+            overlay.put(accounts[0], None)
+        elif kind in (8, 15):  # burn, burn checked
+            amount = struct.unpack_from("<Q", data, 1)[0]
+            account = overlay.token_account(accounts[0])
+            mint, owner, balance = token_account_fields(account.data)
+            self.require_signer(signers, owner)
+            if balance < amount:
+                raise InstructionError(CUSTOM_INSUFFICIENT_FUNDS)
+            account.data = pack_token_account(mint, owner, balance - amount)
+
+    def associated_token_instruction(self, overlay: Overlay, accounts: list, data: bytes, signers: set):
+        payer, ata, owner, mint = accounts[:4]
+        if ata != get_associated_token_address(owner, mint):
+            raise InstructionError("InvalidSeeds")
+        if overlay.get(ata) is not None and overlay.get(ata).owner == TOKEN_PROGRAM_ID:
+            if data[:1] == b"\x01":  # idempotent create
+                return
+            raise InstructionError(0)  # AccountAlreadyInUse
+        mint_account = overlay.get(mint)
+        if mint_account is None or mint_account.owner != TOKEN_PROGRAM_ID:
+            raise InstructionError("InvalidAccountData")
+        rent = rent_exempt_minimum(TOKEN_ACCOUNT_SIZE)
+        overlay.debit(payer, rent)
+        overlay.credit(ata, rent)
+        account = overlay.get(ata)
+        account.data, account.owner = pack_token_account(mint, owner, 0), TOKEN_PROGRAM_ID
+
+    def lookup_table_instruction(self, overlay: Overlay, accounts: list, data: bytes, signers: set):
+        kind = struct.unpack_from("<I", data)[0]
+        table, authority, payer = accounts[:3]
+        if kind == 0:  # create
+            rent = rent_exempt_minimum(LOOKUP_TABLE_META_SIZE)
+            overlay.debit(payer, rent)
+            overlay.credit(table, rent)
+            account = overlay.get(table)
+            account.data, account.owner = pack_lookup_table(authority, [], self.slot), LOOKUP_TABLE_PROGRAM_ID
+        elif kind == 2:  # extend
+            self.require_signer(signers, authority)
+            account = overlay.get(table)
+            if account is None or account.owner != LOOKUP_TABLE_PROGRAM_ID:
+                raise InstructionError("InvalidAccountData")
+            count = struct.unpack_from("<Q", data, 4)[0]
+            added = data[12:12 + 32 * count]
+            rent = rent_exempt_minimum(len(account.data) + len(added)) - account.lamports
+            if rent > 0:
+                overlay.debit(payer, rent)
+                overlay.credit(table, rent)
+            account.data = account.data + added
+
+    def pump_fun_instruction(self, overlay: Overlay, accounts: list, data: bytes, signers: set):
+        discriminator = data[:8]
+        amount, limit = struct.unpack_from("<QQ", data, 8)
+        fee_recipient, bonding_curve, curve_tokens, user_tokens, user = accounts[1], accounts[3], accounts[4], accounts[5], accounts[6]
+        self.require_signer(signers, user)
+        curve = overlay.get(bonding_curve)
+        if curve is None or curve.owner != PUMP_FUN_PROGRAM:
+            raise InstructionError("InvalidAccountData")
+        virtual_token, virtual_sol, real_token, real_sol, supply, complete = struct.unpack_from("<QQQQQ?", curve.data, 8)
+        if complete:
+            raise InstructionError(6005)  # BondingCurveComplete
+
+        if discriminator == BUY_DISCRIMINATOR:
+            amount = min(amount, real_token)
+            cost = amount * virtual_sol // (virtual_token - amount) + 1
+            fee = cost * PUMP_FUN_FEE_BPS // 10_000
+            if cost + fee > limit:
+                raise InstructionError(TOO_MUCH_SOL_REQUIRED)
+            overlay.move_tokens(curve_tokens, user_tokens, amount)
+            overlay.debit(user, cost + fee)
+            overlay.credit(bonding_curve, cost)
+            overlay.credit(fee_recipient, fee)
+            virtual_token, virtual_sol, real_token, real_sol = virtual_token - amount, virtual_sol + cost, real_token - amount, real_sol + cost
+        elif discriminator == SELL_DISCRIMINATOR:
+            proceeds = amount * virtual_sol // (virtual_token + amount)
+            fee = proceeds * PUMP_FUN_FEE_BPS // 10_000
+            if proceeds - fee < limit:
+                raise InstructionError(TOO_LITTLE_SOL_RECEIVED)
+            overlay.move_tokens(user_tokens, curve_tokens, amount)
+            overlay.debit(bonding_curve, proceeds)
+            overlay.credit(user, proceeds - fee)
+            overlay.credit(fee_recipient, fee)
+            virtual_token, virtual_sol, real_token, real_sol = virtual_token + amount, virtual_sol - proceeds, real_token + amount, real_sol - proceeds
+        else:
+            raise InstructionError("InvalidInstructionData")
+
+        curve = overlay.get(bonding_curve)
+        curve.data = pack_bonding_curve(virtual_token, virtual_sol, real_token, real_sol, supply, real_token == 0)
+
+
+PROGRAM_HANDLERS = {
+    SYSTEM_PROGRAM_ID: Ledger.system_instruction,
+    TOKEN_PROGRAM_ID: Ledger.token_instruction,
+    ASSOCIATED_TOKEN_PROGRAM_ID: Ledger.associated_token_instruction,
+    LOOKUP_TABLE_PROGRAM_ID: Ledger.lookup_table_instruction,
+    PUMP_FUN_PROGRAM: Ledger.pump_fun_instruction,
+}
@@ -0,0 +1,426 @@
+"""
+JSON-RPC server for the in-memory ledger, speaking enough of the Solana RPC API for coin_tools.
+
+Latency and failures can be injected per request: a fixed latency with jitter (overridable per method),
+a rate of JSON-RPC errors and a rate of HTTP 429 responses, from a seeded generator so runs are repeatable.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import base58
+from solana.constants import LAMPORTS_PER_SOL
+from solders.keypair import Keypair  #type: ignore
+from solders.pubkey import Pubkey as PublicKey  #type: ignore
+from solders.signature import Signature  #type: ignore
+from spl.token.constants import TOKEN_PROGRAM_ID
+
+from coin_tools.localnet.ledger import (
+    TOKEN_ACCOUNT_SIZE,
+    Ledger,
+    TransactionError,
+    error_message,
+    rent_exempt_minimum,
+    token_account_fields,
+)
+
+DEFAULT_PORT = 8899
+DEFAULT_SLOT_MS = 400
+U64_MAX = 2**64 - 1
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str, data=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+@dataclass
+class Faults:
+    latency: float = 0.0  # seconds added to every request
+    jitter: float = 0.0  # +/- seconds, uniformly distributed
+    method_latency: dict = field(default_factory=dict)  # method -> seconds, replaces latency
+    error_rate: float = 0.0  # fraction of requests answered with a JSON-RPC error
+    throttle_rate: float = 0.0  # fraction of requests answered with HTTP 429
+    seed: int = None
+
+    def __post_init__(self):
+        self.random = random.Random(self.seed)
+        self.lock = threading.Lock()
+
+    def delay(self, method: str) -> float:
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.method_latency.get(method, self.latency) + jitter)
+
+    def roll(self) -> str:
+        """Returns 'throttle', 'error' or None for the next request."""
+        with self.lock:
+            value = self.random.random()
+        if value < self.throttle_rate:
+            return "throttle"
+        if value < self.throttle_rate + self.error_rate:
+            return "error"
+        return None
+
+
+def parse_pubkey(value) -> PublicKey:
+    try:
+        return PublicKey.from_string(value)
+    except Exception:
+        raise RpcError(-32602, f"Invalid param: Invalid pubkey {value!r}")
+
+
+def decode_transaction(encoded: str, config: dict) -> bytes:
+    try:
+        if config.get("encoding", "base58") == "base64":
+            return base64.b64decode(encoded)
+        return base58.b58decode(encoded)
+    except Exception:
+        raise RpcError(-32602, "Invalid param: failed to decode transaction")
+
+
+class RpcMethods:
+    """One method per supported RPC call, each takes the params list and returns the JSON result."""
+
+    def __init__(self, ledger: Ledger):
+        self.ledger = ledger
+
+    def context(self, value) -> dict:
+        return {"context": {"apiVersion": "2.0.0", "slot": self.ledger.slot}, "value": value}
+
+    @staticmethod
+    def encode_account(account, config: dict):
+        if account is None:
+            return None
+        if config.get("encoding") == "base58":
+            data = [base58.b58encode(account.data).decode("ascii"), "base58"]
+        else:
+            data = [base64.b64encode(account.data).decode("ascii"), "base64"]
+        return {
+            "data": data,
+            "executable": account.executable,
+            "lamports": account.lamports,
+            "owner": str(account.owner),
+            "rentEpoch": U64_MAX,
+            "space": len(account.data),
+        }
+
+    def getHealth(self, params):
+        return "ok"
+
+    def getVersion(self, params):
+        return {"solana-core": "2.0.0", "feature-set": 0}
+
+    def getSlot(self, params):
+        return self.ledger.slot
+
+    def getBlockHeight(self, params):
+        return self.ledger.block_height
+
+    def getLatestBlockhash(self, params):
+        blockhash, last_valid_block_height = self.ledger.latest_blockhash()
+        return self.context({"blockhash": str(blockhash), "lastValidBlockHeight": last_valid_block_height})
+
+    def getMinimumBalanceForRentExemption(self, params):
+        return rent_exempt_minimum(int(params[0]))
+
+    def getBalance(self, params):
+        account = self.ledger.get_account(parse_pubkey(params[0]))
+        return self.context(account.lamports if account else 0)
+
+    def getAccountInfo(self, params):
+        config = params[1] if len(params) > 1 else {}
+        return self.context(self.encode_account(self.ledger.get_account(parse_pubkey(params[0])), config))
+
+    def getMultipleAccounts(self, params):
+        config = params[1] if len(params) > 1 else {}
+        if len(params[0]) > 100:
+            raise RpcError(-32602, "Too many inputs provided; max 100")
+        return self.context([self.encode_account(self.ledger.get_account(parse_pubkey(key)), config) for key in params[0]])
+
+    def getTokenAccountsByOwner(self, params):
+        owner = parse_pubkey(params[0])
+        account_filter = params[1]
+        config = params[2] if len(params) > 2 else {}
+        mint = None
+        if "mint" in account_filter:
+            mint = parse_pubkey(account_filter["mint"])
+        elif parse_pubkey(account_filter.get("programId")) != TOKEN_PROGRAM_ID:
+            return self.context([])
+        return self.context([
+            {"pubkey": str(pubkey), "account": self.encode_account(account, config)}
+            for pubkey, account in self.ledger.get_token_accounts(owner, mint)
+        ])
+
+    def getTokenAccountBalance(self, params):
+        account = self.ledger.get_account(parse_pubkey(params[0]))
+        if account is None or account.owner != TOKEN_PROGRAM_ID or len(account.data) != TOKEN_ACCOUNT_SIZE:
+            raise RpcError(-32602, "Invalid param: could not find account")
+        mint, _, amount = token_account_fields(account.data)
+        decimals = self.ledger.get_account(mint).data[44]
+        ui_amount = Decimal(amount) / Decimal(10) ** decimals
+        return self.context({"amount": str(amount), "decimals": decimals, "uiAmount": float(ui_amount), "uiAmountString": str(ui_amount)})
+
+    def getRecentPrioritizationFees(self, params):
+        accounts = [parse_pubkey(key) for key in params[0]] if params else []
+        return [{"slot": slot, "prioritizationFee": fee} for slot, fee in self.ledger.prioritization_fees(accounts)]
+
+    def getSignatureStatuses(self, params):
+        try:
+            signatures = [Signature.from_string(s) for s in params[0]]
+        except Exception:
+            raise RpcError(-32602, "Invalid param: Invalid signature")
+        statuses = []
+        for status in self.ledger.signature_statuses(signatures):
+            if status is None:
+                statuses.append(None)
+                continue
+            slot, confirmations, err, confirmation_status = status
+            statuses.append({
+                "slot": slot,
+                "confirmations": confirmations,
+                "err": err,
+                "confirmationStatus": confirmation_status,
+                "status": {"Ok": None} if err is None else {"Err": err},
+            })
+        return self.context(statuses)
+
+    def getSignaturesForAddress(self, params):
+        config = params[1] if len(params) > 1 else {}
+        try:
+            before, until = (Signature.from_string(config[k]) if config.get(k) else None for k in ("before", "until"))
+        except Exception:
+            raise RpcError(-32602, "Invalid param: Invalid signature")
+        signatures = self.ledger.signatures_for_address(parse_pubkey(params[0]), min(config.get("limit") or 1000, 1000), before, until)
+        statuses = self.ledger.signature_statuses([signature for signature, _, _ in signatures])
+        return [{
+            "signature": str(signature),
+            "slot": slot,
+            "err": err,
+            "memo": None,
+            "blockTime": None,
+            "confirmationStatus": status[3],
+        } for (signature, slot, err), status in zip(signatures, statuses)]
+
+    def simulateTransaction(self, params):
+        config = params[1] if len(params) > 1 else {}
+        raw = decode_transaction(params[0], config)
+        err, logs, units = self.ledger.simulate(raw, sig_verify=config.get("sigVerify", False))
+        return self.context({"err": err, "logs": logs, "accounts": None, "unitsConsumed": units, "returnData": None})
+
+    def sendTransaction(self, params):
+        config = params[1] if len(params) > 1 else {}
+        raw = decode_transaction(params[0], config)
+        try:
+            return str(self.ledger.send(raw, skip_preflight=config.get("skipPreflight", False)))
+        except TransactionError as e:
+            if e.err == "SignatureFailure":
+                raise RpcError(-32003, "Transaction signature verification failure")
+            raise RpcError(-32002, f"Transaction simulation failed: {error_message(e.err)}", {
+                "err": e.err, "logs": e.logs, "accounts": None, "unitsConsumed": e.units, "returnData": None,
+            })
+
+    def sendBundle(self, params):
+        raws = [decode_transaction(encoded, {}) for encoded in params[0]]
+        if not 1 <= len(raws) <= 5:
+            raise RpcError(-32602, "bundle must contain 1 to 5 transactions")
+        try:
+            signatures = self.ledger.send_bundle(raws)
+        except TransactionError as e:
+            raise RpcError(-32603, f"bundle failed: {error_message(e.err)}")
+        return hashlib.sha256(b"".join(bytes(s) for s in signatures)).hexdigest()
+
+
+class RpcHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, the client reuses connections
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return self.reply(200, {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}})
+
+        requests = request if isinstance(request, list) else [request]
+        methods = [r.get("method", "") for r in requests]
+        self.server.localnet.count(methods)
+
+        faults = self.server.localnet.faults
+        delay = max(faults.delay(method) for method in methods) if methods else 0
+        if delay:
+            time.sleep(delay)
+        fault = faults.roll()
+        if fault == "throttle":
+            return self.reply(429, {"jsonrpc": "2.0", "id": None, "error": {"code": 429, "message": "Too many requests for a specific RPC call"}})
+
+        responses = [self.dispatch(r, fault == "error") for r in requests]
+        self.reply(200, responses if isinstance(request, list) else responses[0])
+
+    def dispatch(self, request: dict, inject_error: bool) -> dict:
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        if inject_error:
+            response["error"] = {"code": -32005, "message": "Node is behind by 42 slots", "data": {"numSlotsBehind": 42}}
+            return response
+
+        handler = getattr(self.server.localnet.methods, request.get("method", ""), None)
+        if handler is None:
+            response["error"] = {"code": -32601, "message": "Method not found"}
+            return response
+        try:
+            response["result"] = handler(request.get("params") or [])
+        except RpcError as e:
+            response["error"] = {"code": e.code, "message": e.message}
+            if e.data is not None:
+                response["error"]["data"] = e.data
+        except (IndexError, KeyError, TypeError, ValueError) as e:
+            response["error"] = {"code": -32602, "message": f"Invalid params: {e}"}
+        return response
+
+    def reply(self, status: int, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.localnet.verbose:
+            super().log_message(format, *args)
+
+
+class LocalnetHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # the default backlog of 5 refuses connections when a bulk command opens many at once
+
+
+class LocalnetServer:
+    """
+    Serves a ledger over HTTP and produces a block every slot_seconds.
+    Use start/stop to run it in the background of a benchmark, or serve_forever from the command line.
+    """
+
+    def __init__(self, ledger: Ledger = None, host: str = "127.0.0.1", port: int = DEFAULT_PORT, faults: Faults = None,
+                 slot_seconds: float = DEFAULT_SLOT_MS / 1000, verbose: bool = False):
+        self.ledger = ledger or Ledger()
+        self.methods = RpcMethods(self.ledger)
+        self.faults = faults or Faults()
+        self.slot_seconds = slot_seconds
+        self.verbose = verbose
+        self.request_counts = Counter()  # method -> requests served
+        self.counts_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.httpd = LocalnetHTTPServer((host, port), RpcHandler)
+        self.httpd.localnet = self
+        self.threads = []
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, methods: list[str]):
+        with self.counts_lock:
+            self.request_counts.update(methods)
+
+    def produce_blocks(self):
+        while not self.stopped.wait(self.slot_seconds):
+            self.ledger.advance()
+
+    def start(self):
+        self.threads = [
+            threading.Thread(target=self.produce_blocks, name="localnet-slots", daemon=True),
+            threading.Thread(target=self.httpd.serve_forever, name="localnet-http", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        for thread in self.threads:
+            thread.join()
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+def parse_assignment(value: str) -> tuple[str, float]:
+    """Parses KEY=NUMBER arguments."""
+    key, sep, number = value.partition("=")
+    try:
+        if not sep:
+            raise ValueError
+        return key, float(number)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected KEY=NUMBER, got {value!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m coin_tools.localnet", description="Local Solana RPC stand-in for offline benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on.")
+    parser.add_argument("--slot-ms", type=float, default=DEFAULT_SLOT_MS, help="Milliseconds per slot.")
+    parser.add_argument("--finalize-slots", type=int, default=32, help="Slots until a landed transaction is finalized.")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latency added to every request.")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Uniform +/- jitter on the latency.")
+    parser.add_argument("--method-latency", type=parse_assignment, action="append", default=[], metavar="METHOD=MS", help="Latency for one method, e.g. sendTransaction=120. Repeatable.")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with a JSON-RPC error.")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Fraction of requests answered with HTTP 429.")
+    parser.add_argument("--seed", type=int, help="Seed for latency jitter and fault injection.")
+    parser.add_argument("--fund", type=parse_assignment, action="append", default=[], metavar="PUBKEY=SOL", help="Fund an account. Repeatable.")
+    parser.add_argument("--fund-wallets", type=float, metavar="SOL", help="Fund every wallet in the coin_tools DB.")
+    parser.add_argument("--pump-mint", action="append", default=[], help="Create a pump.fun mint and bonding curve, 'new' for a random mint. Repeatable.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request.")
+    args = parser.parse_args()
+
+    ledger = Ledger(finalize_slots=args.finalize_slots)
+    for pubkey, sol in args.fund:
+        ledger.fund(parse_pubkey(pubkey), int(Decimal(str(sol)) * LAMPORTS_PER_SOL))
+    if args.fund_wallets:
+        from coin_tools.db import get_all_wallets
+        wallets = get_all_wallets()
+        for wallet in wallets:
+            ledger.fund(PublicKey.from_string(wallet["public_key"]), int(Decimal(str(args.fund_wallets)) * LAMPORTS_PER_SOL))
+        print(f"Funded {len(wallets)} wallets with {args.fund_wallets} SOL")
+    for mint in args.pump_mint:
+        mint_pubkey = Keypair().pubkey() if mint == "new" else parse_pubkey(mint)
+        bonding_curve = ledger.create_pump_curve(mint_pubkey)
+        print(f"Pump.fun mint {mint_pubkey}, bonding curve {bonding_curve}")
+
+    faults = Faults(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        method_latency={method: ms / 1000 for method, ms in args.method_latency},
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed,
+    )
+    server = LocalnetServer(ledger, args.host, args.port, faults, args.slot_ms / 1000, args.verbose)
+    print(f"Localnet listening on {server.url}, export COINTOOLS_RPC_URL={server.url} COINTOOLS_BUNDLE_URL={server.url}")
+    server.serve_forever()
+    print(f"Served {sum(server.request_counts.values())} requests: {dict(server.request_counts.most_common())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,27 @@ from coin_tools.commands.wallets import register as register_wallets
 from coin_tools.commands.balances import register as register_balances
 from coin_tools.commands.transfers import register as register_transfers
 from coin_tools.commands.pump_fun import register as register_pumpfun
+from coin_tools.commands.tokens import register as register_tokens
+from coin_tools.commands.nonces import register as register_nonces
+from coin_tools.commands.lookup_tables import register as register_lookup_tables
+from coin_tools.commands.agent import register as register_agent
+from coin_tools.output import start_output, stop_output
+from coin_tools.solana.rpc import print_rpc_stats, set_verbose
+from coin_tools.stats import print_stats, write_stats
+from coin_tools.tracing import run_profiled, start_trace, stop_trace
 
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog="coin-tools",
         description="Tools for working on the Solana blockchain."
     )
-                                                
-    # Initialize DB
-    init_db()
+
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print RPC concurrency changes and limiter stats.")
+    parser.add_argument("--stats", action="store_true", help="Print per method RPC and DB call counts, bytes and latencies at exit.")
+    parser.add_argument("--stats-file", required=False, help="Write call stats to this file, Prometheus text if it ends in .prom, JSON otherwise.")
+    parser.add_argument("--trace", required=False, help="Write a JSON line per traced phase (decrypt, sign, send, ...) to this file.")
+    parser.add_argument("--profile", required=False, help="Run the command under cProfile and tracemalloc and write the report to this file.")
 
     subparsers = parser.add_subparsers(dest="command", help="Sub-commands")
     # Register sub-commands
@@ -24,31 +35,71 @@ def main():
     register_balances(subparsers)
     register_transfers(subparsers)
     register_pumpfun(subparsers)
+    register_tokens(subparsers)
+    register_nonces(subparsers)
+    register_lookup_tables(subparsers)
+    register_agent(subparsers)
+    return parser
 
-    args = parser.parse_args()
 
-    # If no command is specified, print help
-    if not args.command:
-        parser.print_help()
-    else:
-        if hasattr(args, 'func'):
-            args.func(args)
-        else:
-            parser.print_help()
-
-if __name__ == "__main__":
-    start = datetime.datetime.now()
+def print_banner(start: datetime.datetime):
     print()
     print("   ______      _     ______            __    ")
     print("  / ____/___  (_)___/_  __/___  ____  / /____")
-    print(" / /   / __ \/ / __ \/ / / __ \/ __ \/ / ___/")
+    print(" / /   / __ \\/ / __ \\/ / / __ \\/ __ \\/ / ___/")
     print("/ /___/ /_/ / / / / / / / /_/ / /_/ / (__  ) ")
-    print("\____/\____/_/_/ /_/_/  \____/\____/_/____/  ")
+    print("\\____/\\____/_/_/ /_/_/  \\____/\\____/_/____/  ")
     print()
     print("Welcome to the Coin Tools CLI!")
     print("Current Time: ", start.strftime("%Y-%m-%d %H:%M:%S"))
     print("Command Line: ", " ".join(sys.argv[1:]))
     print()
-    main()
+
+
+def main():
+    start = datetime.datetime.now()
+    parser = build_parser()
+    # Parsed before the banner: with --format ndjson|csv stdout only carries records, the banner and all other output go to stderr
+    args = parser.parse_args()
+    output_format = getattr(args, "format", "text")
+    if output_format != "text":
+        start_output(output_format, sys.stdout)
+        sys.stdout = sys.stderr
+
+    print_banner(start)
+
+    # Initialize DB
+    init_db()
+
+    set_verbose(args.verbose)
+
+    # If no command is specified, print help
+    if not args.command:
+        parser.print_help()
+    else:
+        if hasattr(args, 'func'):
+            if args.trace:
+                start_trace(args.trace)
+            try:
+                if args.profile:
+                    run_profiled(lambda: args.func(args), args.profile)
+                else:
+                    args.func(args)
+            finally:
+                stop_trace()
+                stop_output()
+        else:
+            parser.print_help()
+
+    if args.stats:
+        print()
+        print_stats()
+    if args.stats_file:
+        write_stats(args.stats_file)
+
     print()
-    print("Time Taken: ", round((datetime.datetime.now() - start).total_seconds(), 1), "seconds")
\ No newline at end of file
+    print_rpc_stats()
+    print("Time Taken: ", round((datetime.datetime.now() - start).total_seconds(), 1), "seconds")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
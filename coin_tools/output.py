@@ -0,0 +1,114 @@
+"""
+Machine readable command output.
+
+With `--format ndjson` or `--format csv`, the balances and bulk commands emit one record per result (a wallet's
+holding, a wallet's trade or transfer) on stdout as it completes, while the banner, progress and errors go to
+stderr. Records are buffered and written out in chunks at most FLUSH_SECONDS apart, so a downstream pipeline
+starts on the first wallets long before a scan of thousands finishes. CSV columns come from the first record.
+"""
+import csv
+import io
+import json
+import os
+import threading
+
+FORMATS = ["text", "ndjson", "csv"]
+FLUSH_RECORDS = 512  # buffered records that trigger a write before the timer does
+FLUSH_SECONDS = 0.5
+
+record_writer = None
+
+
+class RecordWriter:
+    def __init__(self, stream, output_format: str):
+        self.stream = stream
+        self.output_format = output_format
+        self.buffer = io.StringIO()
+        self.csv_writer = None
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.flusher = threading.Thread(target=self.flush_periodically, name="output-flush", daemon=True)
+        self.flusher.start()
+
+    def write(self, record: dict):
+        with self.lock:
+            if self.output_format == "ndjson":
+                self.buffer.write(json.dumps(record, default=str) + "\n")
+            else:
+                if self.csv_writer is None:
+                    self.csv_writer = csv.DictWriter(self.buffer, fieldnames=list(record), extrasaction="ignore", lineterminator="\n")
+                    self.csv_writer.writeheader()
+                self.csv_writer.writerow(record)
+            self.pending += 1
+            if self.pending >= FLUSH_RECORDS:
+                self.flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def flush_locked(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.pending = 0
+        if not data or self.stream is None:
+            return
+        try:
+            self.stream.write(data)
+            self.stream.flush()
+        except BrokenPipeError:
+            # The reader went away (e.g. `| head`), drop the rest instead of failing the command
+            os.dup2(os.open(os.devnull, os.O_WRONLY), self.stream.fileno())
+            self.stream = None
+
+    def flush_periodically(self):
+        while not self.stopped.wait(FLUSH_SECONDS):
+            self.flush()
+
+    def close(self):
+        self.stopped.set()
+        self.flusher.join()
+        self.flush()
+
+
+def add_format_argument(parser):
+    parser.add_argument("--format", choices=FORMATS, default="text",
+                        help="text, or one NDJSON/CSV record per result on stdout with everything else on stderr.")
+
+
+def start_output(output_format: str, stream):
+    global record_writer
+    record_writer = RecordWriter(stream, output_format)
+
+
+def stop_output():
+    global record_writer
+    if record_writer:
+        record_writer.close()
+        record_writer = None
+
+
+def machine_output() -> bool:
+    """True when results go out as records instead of text."""
+    return record_writer is not None
+
+
+def emit(record: dict):
+    """Writes a record when --format is ndjson or csv, does nothing for text output."""
+    if record_writer:
+        record_writer.write(record)
+
+
+def emit_result(wallet_id: int, public_key: str, action: str, amount=None, unit: str = None, signature=None, error=None):
+    """Emits the outcome of one wallet's trade or transfer, the record shape shared by the bulk commands."""
+    emit({
+        "wallet_id": wallet_id,
+        "public_key": public_key,
+        "action": action,
+        "amount": amount,
+        "unit": unit,
+        "signature": str(signature) if signature else None,
+        "error": str(error) if error else None,
+    })
@@ -18,40 +18,24 @@ from coin_tools.pump_fun.constants import (
     RENT,
 )
 
+from coin_tools.tracing import span
+from coin_tools.solana.compute import resolve_unit_limit
+from coin_tools.solana.fees import resolve_unit_price
 from coin_tools.solana.utils import send_transaction
 
 from coin_tools.solana.tokens import fetch_or_create_token_account
 from solana.constants import SYSTEM_PROGRAM_ID, LAMPORTS_PER_SOL
 from spl.token.constants import TOKEN_PROGRAM_ID
 
-from coin_tools.pump_fun.coin_data import fetch_coin_data, sol_for_tokens
+from coin_tools.pump_fun.coin_data import CoinData, fetch_coin_data, sol_for_tokens
 
 
-def buy(
-    client: Client,
-    buyer_keypair: Keypair,
-    mint_pubkey: PublicKey,
-    amount_in_sol: float,
-    slippage: int = 5,
-    unit_limit: int = 100_000,
-    unit_price: int = 1_000_000,
-    confirm: bool = False,
-    jito_tip: int = 30_000
-) -> str:
-    coin_data = fetch_coin_data(client, mint_pubkey)
-
-    if coin_data is None or coin_data.complete:
-        raise Exception(
-            "Warning: This token has bonded and is only tradable on Raydium."
-        )
-
-    token_metadata =  coin_data.metadata
-    token_dec = 10 ** token_metadata["decimals"]
-    buyer_pubkey = buyer_keypair.pubkey()
-    buyer_token_account, create_ata_ix = fetch_or_create_token_account(
-        client, buyer_pubkey, buyer_pubkey, mint_pubkey, buyer_keypair
-    )
-    
+def buy_quote(coin_data: CoinData, amount_in_sol: float, slippage: int = 5) -> tuple[int, int]:
+    """
+    Quotes a buy against the bonding curve reserves in coin_data.
+    Returns the raw token amount and the max lamports to spend after slippage.
+    """
+    token_dec = 10 ** coin_data.metadata["decimals"]
     sol_reserves = coin_data.virtual_sol_reserves / LAMPORTS_PER_SOL
     token_reserves = coin_data.virtual_token_reserves / token_dec
     
@@ -60,16 +44,19 @@ def buy(
     
     slippage_adjustment = 1 + (slippage / 100)
     max_sol_cost = int((amount_in_sol * slippage_adjustment) * LAMPORTS_PER_SOL)
-    print(f"Amount: {amount / token_dec}, Max Sol Cost: {max_sol_cost / LAMPORTS_PER_SOL}")
+    return amount, max_sol_cost
 
 
+def build_buy_instruction(coin_data: CoinData, buyer_pubkey: PublicKey, buyer_token_account: PublicKey, amount: int, max_sol_cost: int) -> Instruction:
+    """
+    Builds the pump.fun buy instruction, does not touch the network.
+    """
     MINT = coin_data.mint
     BONDING_CURVE = coin_data.bonding_curve
     ASSOCIATED_BONDING_CURVE = coin_data.associated_bonding_curve
     BUYER = buyer_pubkey
     BUYER_TOKEN_ACCOUNT = buyer_token_account 
 
-    print("Creating swap instructions...")
     keys = [
         AccountMeta(pubkey=GLOBAL, is_signer=False, is_writable=False),
         AccountMeta(pubkey=FEE_RECIPIENT, is_signer=False, is_writable=True),
@@ -89,19 +76,53 @@ def buy(
     data.extend(bytes.fromhex("66063d1201daebea"))
     data.extend(struct.pack("<Q", amount))
     data.extend(struct.pack("<Q", max_sol_cost))
-    swap_ix = Instruction(PUMP_FUN_PROGRAM, bytes(data), keys)
+    return Instruction(PUMP_FUN_PROGRAM, bytes(data), keys)
 
-    instructions = [
-        set_compute_unit_limit(unit_limit),
-        set_compute_unit_price(unit_price + jito_tip) # add a bit for JITO, this is not the right way to do it
-    ]
 
-    if create_ata_ix:
-        instructions.append(create_ata_ix)
+def buy(
+    client: Client,
+    buyer_keypair: Keypair,
+    mint_pubkey: PublicKey,
+    amount_in_sol: float,
+    slippage: int = 5,
+    unit_limit: int = 100_000,
+    unit_price: int = 1_000_000,
+    confirm: bool = False,
+    jito_tip: int = 30_000,
+    rebroadcast: bool = False
+) -> str:
+    with span("fetch_curve"):
+        coin_data = fetch_coin_data(client, mint_pubkey)
 
-    instructions.append(swap_ix)
+    if coin_data is None or coin_data.complete:
+        raise Exception(
+            "Warning: This token has bonded and is only tradable on Raydium."
+        )
+
+    token_dec = 10 ** coin_data.metadata["decimals"]
+    buyer_pubkey = buyer_keypair.pubkey()
+    with span("ata_check"):
+        buyer_token_account, create_ata_ix = fetch_or_create_token_account(
+            client, buyer_pubkey, buyer_pubkey, mint_pubkey, buyer_keypair
+        )
+    
+    with span("quote"):
+        amount, max_sol_cost = buy_quote(coin_data, amount_in_sol, slippage)
+    print(f"Amount: {amount / token_dec}, Max Sol Cost: {max_sol_cost / LAMPORTS_PER_SOL}")
+
+    print("Creating swap instructions...")
+    with span("build"):
+        swap_ix = build_buy_instruction(coin_data, buyer_pubkey, buyer_token_account, amount, max_sol_cost)
+
+    unit_price = resolve_unit_price(client, unit_price, [coin_data.bonding_curve, FEE_RECIPIENT])
+    body = [create_ata_ix, swap_ix] if create_ata_ix else [swap_ix]
+    unit_limit = resolve_unit_limit(client, unit_limit, buyer_pubkey, body)
+    instructions = [
+        set_compute_unit_limit(unit_limit),
+        set_compute_unit_price(int(unit_price + jito_tip)) # add a bit for JITO, this is not the right way to do it
+    ] + body
     
     print("Sending transaction...")
-    txn_signature = send_transaction(client, buyer_keypair, instructions, should_confirm=confirm)
+    txn_signature = send_transaction(client, buyer_keypair, instructions, should_confirm=confirm, rebroadcast=rebroadcast)
 
     return txn_signature
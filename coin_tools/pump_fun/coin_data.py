@@ -24,21 +24,22 @@ class CoinData:
     metadata: Optional[dict] = None
 
 
+BONDING_CURVE_LAYOUT = Struct(
+    Padding(8),
+    "virtualTokenReserves" / Int64ul,
+    "virtualSolReserves" / Int64ul,
+    "realTokenReserves" / Int64ul,
+    "realSolReserves" / Int64ul,
+    "tokenTotalSupply" / Int64ul,
+    "complete" / Flag
+)
+
+
 def fetch_virtual_reserves(client: Client, bonding_curve: PublicKey):
-    bonding_curve_struct = Struct(
-        Padding(8),
-        "virtualTokenReserves" / Int64ul,
-        "virtualSolReserves" / Int64ul,
-        "realTokenReserves" / Int64ul,
-        "realSolReserves" / Int64ul,
-        "tokenTotalSupply" / Int64ul,
-        "complete" / Flag
-    )
-    
     try:
         account_info = client.get_account_info(bonding_curve)
         data = account_info.value.data
-        parsed_data = bonding_curve_struct.parse(data)
+        parsed_data = BONDING_CURVE_LAYOUT.parse(data)
         return parsed_data
     except Exception:
         return None
@@ -5,4 +5,6 @@ FEE_RECIPIENT = PublicKey.from_string("CebN5WGQ4jvEPvsVU4EoHEpgzq1VV7AbicfhtW4xC
 RENT = PublicKey.from_string("SysvarRent111111111111111111111111111111111")
 EVENT_AUTHORITY = PublicKey.from_string("Ce6TQqeHC9p8KetsN6JsjHK7UTZk7nasjjnr7XxXp9F1")
 PUMP_FUN_PROGRAM = PublicKey.from_string("6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P")
-JITO_TIP_ADDRESS = PublicKey.from_string("T1pyyaTNZsKv2WcRAB8oVnk93mLJw2XzjtVYqCsaHqt")
\ No newline at end of file
+JITO_TIP_ADDRESS = PublicKey.from_string("T1pyyaTNZsKv2WcRAB8oVnk93mLJw2XzjtVYqCsaHqt")
+# Accounts every pump.fun trade references, worth putting in an address lookup table
+STATIC_ACCOUNTS = [GLOBAL, FEE_RECIPIENT, RENT, EVENT_AUTHORITY, PUMP_FUN_PROGRAM, JITO_TIP_ADDRESS]
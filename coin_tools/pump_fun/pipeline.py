@@ -0,0 +1,184 @@
+"""
+Two stage pipeline for bulk pump.fun buys.
+
+Stage one plans every wallet's buy against a single bonding curve snapshot and signs all the transactions
+ahead of time in a process pool with a shared blockhash.
+Stage two bursts the signed transactions out at a controlled rate.
+Plans signed against durable nonces can be saved and sent later.
+In bundle mode transactions are grouped into bundles, the last transaction of each bundle carries the tip.
+"""
+import base64
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Optional
+
+from solana.constants import LAMPORTS_PER_SOL
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price  # type: ignore
+from solders.hash import Hash  # type: ignore
+from solders.pubkey import Pubkey as PublicKey  # type: ignore
+from solana.rpc.api import Client
+from solders.system_program import AdvanceNonceAccountParams, TransferParams, advance_nonce_account, transfer  # type: ignore
+from spl.token.instructions import create_idempotent_associated_token_account, get_associated_token_address
+
+from coin_tools.encryption import decrypt_data
+from coin_tools.pump_fun.buy import build_buy_instruction, buy_quote
+from coin_tools.pump_fun.coin_data import CoinData
+from coin_tools.pump_fun.constants import JITO_TIP_ADDRESS
+from coin_tools.solana.bundles import MAX_BUNDLE_TRANSACTIONS
+from coin_tools.solana.compute import resolve_unit_limit
+from coin_tools.solana.utils import parse_private_key_bytes, sign_nonce_transaction, sign_transaction
+
+
+@dataclass
+class PlannedBuy:
+    wallet_id: int
+    public_key: str
+    private_key_encrypted: bytes
+    amount_in_sol: float
+    amount: int
+    max_sol_cost: int
+    create_ata: bool
+    nonce_account: Optional[str] = None
+    nonce: Optional[str] = None
+    bundle: Optional[int] = None
+    tip_lamports: int = 0
+    unit_limit: Optional[int] = None
+
+
+def plan_buys(coin_data: CoinData, wallets: list[dict], amounts_in_sol: list[float], ata_exists: list[bool], slippage: int) -> list[PlannedBuy]:
+    """
+    Quotes every wallet's buy in order, moving the curve reserves after each one
+    so later buys are quoted against the price the earlier buys leave behind.
+    """
+    reserves = CoinData(**vars(coin_data))
+    plans = []
+    for wallet, amount_in_sol, exists in zip(wallets, amounts_in_sol, ata_exists):
+        amount, max_sol_cost = buy_quote(reserves, amount_in_sol, slippage)
+        plans.append(PlannedBuy(
+            wallet_id=wallet["id"],
+            public_key=wallet["public_key"],
+            private_key_encrypted=wallet["private_key_encrypted"],
+            amount_in_sol=amount_in_sol,
+            amount=amount,
+            max_sol_cost=max_sol_cost,
+            create_ata=not exists,
+        ))
+        reserves.virtual_sol_reserves += int(amount_in_sol * LAMPORTS_PER_SOL)
+        reserves.virtual_token_reserves -= amount
+    return plans
+
+
+def assign_bundles(plans: list[PlannedBuy], tip_lamports: int, bundle_size: int = MAX_BUNDLE_TRANSACTIONS):
+    """
+    Groups plans into bundles in order, the last plan of each bundle pays the tip.
+    """
+    for i, plan in enumerate(plans):
+        plan.bundle = i // bundle_size
+        is_last = (i + 1) % bundle_size == 0 or i == len(plans) - 1
+        plan.tip_lamports = tip_lamports if is_last else 0
+
+
+def planned_buy_instructions(plan: PlannedBuy, coin_data: CoinData) -> list:
+    """
+    Builds the instructions of a planned buy without the compute budget instructions.
+    """
+    buyer_pubkey = PublicKey.from_string(plan.public_key)
+    buyer_token_account = get_associated_token_address(owner=buyer_pubkey, mint=coin_data.mint)
+
+    instructions = []
+    if plan.create_ata:
+        instructions.append(create_idempotent_associated_token_account(
+            payer=buyer_pubkey,
+            owner=buyer_pubkey,
+            mint=coin_data.mint
+        ))
+
+    instructions.append(build_buy_instruction(coin_data, buyer_pubkey, buyer_token_account, plan.amount, plan.max_sol_cost))
+
+    if plan.tip_lamports:
+        instructions.append(transfer(TransferParams(from_pubkey=buyer_pubkey, to_pubkey=JITO_TIP_ADDRESS, lamports=plan.tip_lamports)))
+    return instructions
+
+
+def size_planned_buys(client: Client, plans: list[PlannedBuy], coin_data: CoinData):
+    """
+    Sets each plan's compute unit limit from the cached limit of its shape (ATA create, tip, nonce),
+    simulating a shape only the first time it is seen.
+    """
+    for plan in plans:
+        instructions = planned_buy_instructions(plan, coin_data)
+        if plan.nonce_account:
+            instructions.insert(0, advance_nonce_account(AdvanceNonceAccountParams(
+                nonce_pubkey=PublicKey.from_string(plan.nonce_account),
+                authorized_pubkey=PublicKey.from_string(plan.public_key)
+            )))
+        plan.unit_limit = resolve_unit_limit(client, "auto", PublicKey.from_string(plan.public_key), instructions)
+
+
+def sign_planned_buy(plan: PlannedBuy, coin_data: CoinData, recent_blockhash: Hash, unit_limit: int, unit_price: int) -> bytes:
+    """
+    Decrypts the wallet key, builds and signs one buy transaction. Runs in a worker process, no network access.
+    A limit set on the plan by size_planned_buys takes precedence over unit_limit.
+    """
+    buyer_keypair = parse_private_key_bytes(decrypt_data(plan.private_key_encrypted))
+    if str(buyer_keypair.pubkey()) != plan.public_key:
+        raise Exception(f"Wallet {plan.wallet_id} private key does not match public key {plan.public_key}.")
+
+    instructions = [
+        set_compute_unit_limit(plan.unit_limit or unit_limit),
+        set_compute_unit_price(unit_price)
+    ] + planned_buy_instructions(plan, coin_data)
+
+    if plan.nonce_account:
+        transaction = sign_nonce_transaction(buyer_keypair, instructions, PublicKey.from_string(plan.nonce_account), Hash.from_string(plan.nonce))
+    else:
+        transaction = sign_transaction(buyer_keypair, instructions, recent_blockhash)
+    return bytes(transaction)
+
+
+def sign_planned_buys(plans: list[PlannedBuy], coin_data: CoinData, recent_blockhash: Optional[Hash], unit_limit: int, unit_price: int, workers: int = None) -> list[bytes]:
+    """
+    Signs every planned buy in a process pool. Returns serialized transactions in plan order.
+    Plans with a nonce are signed against it, the rest against recent_blockhash.
+    """
+    sign = partial(
+        sign_planned_buy,
+        coin_data=coin_data,
+        recent_blockhash=recent_blockhash,
+        unit_limit=unit_limit,
+        unit_price=unit_price
+    )
+    chunksize = max(1, len(plans) // ((workers or os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(sign, plans, chunksize=chunksize))
+
+
+def save_signed_transactions(path: str, plans: list[PlannedBuy], transactions: list[bytes]):
+    """
+    Writes signed transactions as JSON lines so they can be sent later with `pump-fun send-plan`.
+    """
+    with open(path, "w") as f:
+        for plan, transaction in zip(plans, transactions):
+            f.write(json.dumps({
+                "wallet_id": plan.wallet_id,
+                "amount_in_sol": plan.amount_in_sol,
+                "bundle": plan.bundle,
+                "transaction": base64.b64encode(transaction).decode("ascii"),
+            }) + "\n")
+
+
+def load_signed_transactions(path: str) -> list[dict]:
+    """
+    Reads signed transactions written by save_signed_transactions, the transaction is decoded to bytes.
+    """
+    entries = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                entry["transaction"] = base64.b64decode(entry["transaction"])
+                entries.append(entry)
+    return entries
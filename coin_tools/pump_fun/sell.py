@@ -18,6 +18,9 @@ from coin_tools.pump_fun.constants import (
     PUMP_FUN_PROGRAM
 )
 
+from coin_tools.tracing import span
+from coin_tools.solana.compute import resolve_unit_limit
+from coin_tools.solana.fees import resolve_unit_price
 from coin_tools.solana.utils import send_transaction
 
 from coin_tools.solana.tokens import fetch_or_create_token_account
@@ -36,9 +39,11 @@ def sell(
     unit_limit: int = 100_000,
     unit_price: int = 1_000_000,
     confirm: bool = False,
-    jito_tip: int = 30_000
+    jito_tip: int = 30_000,
+    rebroadcast: bool = False
 ) -> str:
-    coin_data = fetch_coin_data(client, mint_pubkey)
+    with span("fetch_curve"):
+        coin_data = fetch_coin_data(client, mint_pubkey)
 
     if coin_data is None or coin_data.complete:
         raise Exception(
@@ -48,9 +53,10 @@ def sell(
     token_metadata = coin_data.metadata
     token_dec = 10 ** token_metadata["decimals"]
     seller_pubkey = seller_keypair.pubkey()
-    seller_token_account, create_ata_ix = fetch_or_create_token_account(
-        client, seller_pubkey, seller_pubkey, mint_pubkey, seller_keypair
-    )
+    with span("ata_check"):
+        seller_token_account, create_ata_ix = fetch_or_create_token_account(
+            client, seller_pubkey, seller_pubkey, mint_pubkey, seller_keypair
+        )
     
     virtual_sol_reserves = coin_data.virtual_sol_reserves / LAMPORTS_PER_SOL
     virtual_token_reserves = coin_data.virtual_token_reserves / token_dec
@@ -89,17 +95,15 @@ def sell(
     data.extend(struct.pack("<Q", min_sol_output))
     swap_ix = Instruction(PUMP_FUN_PROGRAM, bytes(data), keys)
 
+    unit_price = resolve_unit_price(client, unit_price, [coin_data.bonding_curve, FEE_RECIPIENT])
+    body = [create_ata_ix, swap_ix] if create_ata_ix else [swap_ix]
+    unit_limit = resolve_unit_limit(client, unit_limit, seller_pubkey, body)
     instructions = [
         set_compute_unit_limit(unit_limit),
-        set_compute_unit_price(unit_price + jito_tip) # add a bit for JITO, this is not the right way to do it
-    ]
-
-    if create_ata_ix:
-        instructions.append(create_ata_ix)
-
-    instructions.append(swap_ix)
+        set_compute_unit_price(int(unit_price + jito_tip)) # add a bit for JITO, this is not the right way to do it
+    ] + body
     
     print("Sending transaction...")
-    txn_signature = send_transaction(client, seller_keypair, instructions, should_confirm=confirm)
+    txn_signature = send_transaction(client, seller_keypair, instructions, should_confirm=confirm, rebroadcast=rebroadcast)
 
     return txn_signature
@@ -0,0 +1,129 @@
+"""
+Sends one signed transaction to every configured RPC endpoint at once and keeps rebroadcasting it,
+without preflight and with RPC side retries off, until it is seen on chain or its blockhash expires.
+Per endpoint timings are kept so providers can be compared.
+"""
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from solana.rpc.api import Client
+from solana.rpc.types import TxOpts
+
+REBROADCAST_INTERVAL = 1.0  # seconds between sends while nobody has seen the transaction
+SETTLE_INTERVALS = 5  # polls to wait for lagging endpoints once one has seen the transaction
+BLOCKHASH_VALID_BLOCKS = 150  # expiry used for nonce transactions, which have no last valid block height
+
+# Every broadcast made by this process, reported by print_broadcast_report
+broadcast_results = []
+
+
+@dataclass
+class EndpointStats:
+    url: str
+    sends: int = 0
+    errors: int = 0
+    send_latency: Optional[float] = None  # round trip of the first sendTransaction
+    landed_after: Optional[float] = None  # seconds from the first send until this endpoint saw the signature
+    last_error: Optional[str] = None
+
+
+@dataclass
+class BroadcastResult:
+    signature: str
+    landed: bool
+    elapsed: float
+    error: Optional[str] = None  # set when the transaction landed but failed
+    endpoints: list[EndpointStats] = field(default_factory=list)
+
+
+def broadcast_transaction(clients: list[Client], transaction, last_valid_block_height: int, interval: float = REBROADCAST_INTERVAL) -> BroadcastResult:
+    """
+    Broadcasts a signed transaction to every client until it lands or the block height passes last_valid_block_height.
+    The first client is used to check the block height.
+    """
+    signature = transaction.signatures[0]
+    raw_transaction = bytes(transaction)
+    txn_opts = TxOpts(skip_confirmation=True, skip_preflight=True, max_retries=0)
+    stats = [EndpointStats(url=client._provider.endpoint_uri) for client in clients]
+    result = BroadcastResult(signature=str(signature), landed=False, elapsed=0, endpoints=stats)
+
+    def send(i: int):
+        sent = time.monotonic()
+        try:
+            clients[i].send_raw_transaction(raw_transaction, opts=txn_opts)
+        except Exception as e:
+            stats[i].errors += 1
+            stats[i].last_error = str(e)
+        stats[i].sends += 1
+        if stats[i].send_latency is None:
+            stats[i].send_latency = time.monotonic() - sent
+
+    def poll(i: int):
+        if stats[i].landed_after is not None:
+            return
+        try:
+            status = clients[i].get_signature_statuses([signature]).value[0]
+        except Exception as e:
+            stats[i].last_error = str(e)
+            return
+        if status is not None:
+            stats[i].landed_after = time.monotonic() - start
+            if status.err:
+                result.error = str(status.err)
+
+    start = time.monotonic()
+    settle = 0
+    with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+        while True:
+            if not result.landed:
+                list(executor.map(send, range(len(clients))))
+
+            time.sleep(interval)
+            list(executor.map(poll, range(len(clients))))
+
+            if any(s.landed_after is not None for s in stats):
+                result.landed = True
+                settle += 1
+                if settle >= SETTLE_INTERVALS or all(s.landed_after is not None for s in stats):
+                    break
+            elif clients[0].get_block_height().value > last_valid_block_height:
+                break
+
+    result.elapsed = time.monotonic() - start
+    broadcast_results.append(result)
+    return result
+
+
+def summarize_broadcasts(results: list[BroadcastResult]) -> list[dict]:
+    """
+    Aggregates broadcast results per endpoint: how often it saw the transaction land, and how fast.
+    """
+    summary = {}
+    for result in results:
+        for endpoint in result.endpoints:
+            entry = summary.setdefault(endpoint.url, {"url": endpoint.url, "sends": 0, "errors": 0, "landed": 0, "send_latency": [], "landed_after": []})
+            entry["sends"] += endpoint.sends
+            entry["errors"] += endpoint.errors
+            if endpoint.send_latency is not None:
+                entry["send_latency"].append(endpoint.send_latency)
+            if endpoint.landed_after is not None:
+                entry["landed"] += 1
+                entry["landed_after"].append(endpoint.landed_after)
+    return list(summary.values())
+
+
+def print_broadcast_report(results: list[BroadcastResult] = None):
+    results = broadcast_results if results is None else results
+    if not results:
+        return
+
+    landed = sum(1 for r in results if r.landed)
+    print(f"Broadcast {len(results)} transactions, {landed} landed.")
+    for entry in summarize_broadcasts(results):
+        send_latency = f"{statistics.median(entry['send_latency']):.3f}s" if entry["send_latency"] else "n/a"
+        landed_after = f"{statistics.median(entry['landed_after']):.3f}s" if entry["landed_after"] else "n/a"
+        print(f"   {entry['url']}: Seen {entry['landed']}/{len(results)}, Median Time To Land: {landed_after}, "
+              f"Median Send Latency: {send_latency}, Sends: {entry['sends']}, Errors: {entry['errors']}")
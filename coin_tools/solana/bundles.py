@@ -0,0 +1,35 @@
+import os
+
+import base58
+import httpx
+
+DEFAULT_BUNDLE_URL = "https://mainnet.block-engine.jito.wtf/api/v1/bundles"
+MAX_BUNDLE_TRANSACTIONS = 5
+
+
+def get_bundle_url() -> str:
+    """Returns the block engine bundle endpoint, COINTOOLS_BUNDLE_URL overrides the default (e.g. to point at a local stand-in)."""
+    return os.getenv("COINTOOLS_BUNDLE_URL", DEFAULT_BUNDLE_URL)
+
+
+def send_bundle(transactions: list[bytes], url: str = None, timeout: float = 10) -> str:
+    """
+    Submits up to MAX_BUNDLE_TRANSACTIONS signed transactions as one bundle, they land in order in the same slot or not at all.
+    Returns the bundle id.
+    """
+    if not transactions or len(transactions) > MAX_BUNDLE_TRANSACTIONS:
+        raise ValueError(f"A bundle holds 1 to {MAX_BUNDLE_TRANSACTIONS} transactions, got {len(transactions)}.")
+
+    body = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "sendBundle",
+        "params": [[base58.b58encode(transaction).decode("ascii") for transaction in transactions]],
+    }
+    response = httpx.post(url or get_bundle_url(), json=body, timeout=timeout)
+    response.raise_for_status()
+    result = response.json()
+
+    if "error" in result:
+        raise Exception(f"Failed to send bundle: {result['error']}")
+    return result["result"]
@@ -0,0 +1,92 @@
+from itertools import groupby
+
+from solana.constants import SYSTEM_PROGRAM_ID
+from solana.rpc.api import Client
+from solders.address_lookup_table_account import AddressLookupTableAccount  #type: ignore
+from solders.compute_budget import ID as COMPUTE_BUDGET_PROGRAM_ID, set_compute_unit_limit, set_compute_unit_price  #type: ignore
+from solders.instruction import Instruction  #type: ignore
+from solders.pubkey import Pubkey as PublicKey  #type: ignore
+from solders.signature import Signature  #type: ignore
+from solders.transaction import Transaction, VersionedTransaction  #type: ignore
+from spl.token.constants import ASSOCIATED_TOKEN_PROGRAM_ID, TOKEN_PROGRAM_ID
+
+from coin_tools.db import get_compute_unit_estimate, upsert_compute_unit_estimate
+from coin_tools.solana.utils import MAX_COMPUTE_UNITS, compile_message
+
+COMPUTE_UNIT_MARGIN = 0.15  # headroom over the simulated units, covers curve state and nonce advances
+MIN_COMPUTE_UNIT_MARGIN = 1_000
+
+# Bytes of instruction data that select the instruction, anything after is arguments.
+# Programs not listed are assumed to be anchor programs with an 8 byte discriminator.
+DISCRIMINATOR_LENGTHS = {
+    SYSTEM_PROGRAM_ID: 4,
+    TOKEN_PROGRAM_ID: 1,
+    ASSOCIATED_TOKEN_PROGRAM_ID: 1,
+}
+
+# shape -> compute unit limit, saves a DB read per transaction in bulk runs
+compute_unit_cache = {}
+
+
+def instruction_shape(instructions: list[Instruction]) -> str:
+    """
+    Describes which instructions a transaction runs, ignoring amounts and accounts, e.g. a pump.fun buy with
+    an ATA create or a packed transfer of 8. Compute budget instructions are left out.
+    """
+    parts = []
+    for ix in instructions:
+        if ix.program_id == COMPUTE_BUDGET_PROGRAM_ID:
+            continue
+        length = DISCRIMINATOR_LENGTHS.get(ix.program_id, 8)
+        parts.append(f"{ix.program_id}:{bytes(ix.data[:length]).hex()}")
+
+    # Runs of the same instruction collapse to part*count so packed transactions get short keys
+    shape = []
+    for part, group in groupby(parts):
+        count = len(list(group))
+        shape.append(part if count == 1 else f"{part}*{count}")
+    return ";".join(shape)
+
+
+def simulate_compute_units(client: Client, payer: PublicKey, instructions: list[Instruction], lookup_tables: list[AddressLookupTableAccount] = None) -> int:
+    """
+    Simulates the instructions unsigned at the max compute limit and returns the units consumed.
+    """
+    instructions = [set_compute_unit_limit(MAX_COMPUTE_UNITS), set_compute_unit_price(0)] + [
+        ix for ix in instructions if ix.program_id != COMPUTE_BUDGET_PROGRAM_ID
+    ]
+    recent_blockhash = client.get_latest_blockhash().value.blockhash
+    message = compile_message(payer, instructions, recent_blockhash, lookup_tables)
+    signatures = [Signature.default()] * message.header.num_required_signatures
+    if lookup_tables:
+        transaction = VersionedTransaction.populate(message, signatures)
+    else:
+        transaction = Transaction.populate(message, signatures)
+
+    result = client.simulate_transaction(transaction, sig_verify=False).value
+    if result.err:
+        raise Exception(f"Simulation failed: {result.err}, logs: {result.logs}")
+    return result.units_consumed
+
+
+def resolve_unit_limit(client: Client, unit_limit, payer: PublicKey, instructions: list[Instruction], lookup_tables: list[AddressLookupTableAccount] = None) -> int:
+    """
+    Returns unit_limit as an int. When it is 'auto' the limit comes from the cache for the instructions' shape,
+    or the instructions are simulated once and the consumed units plus a margin are cached for that shape.
+    """
+    if unit_limit != "auto":
+        return int(unit_limit)
+
+    shape = instruction_shape(instructions)
+    if shape in compute_unit_cache:
+        return compute_unit_cache[shape]
+
+    units = get_compute_unit_estimate(shape)
+    if units is None:
+        consumed = simulate_compute_units(client, payer, instructions, lookup_tables)
+        units = min(MAX_COMPUTE_UNITS, consumed + max(int(consumed * COMPUTE_UNIT_MARGIN), MIN_COMPUTE_UNIT_MARGIN))
+        upsert_compute_unit_estimate(shape, units)
+        print(f"Simulated {consumed} compute units, unit limit set to {units}")
+
+    compute_unit_cache[shape] = units
+    return units
@@ -0,0 +1,67 @@
+import os
+import time
+
+from solana.rpc.api import Client
+from solders.pubkey import Pubkey as PublicKey  #type: ignore
+
+from coin_tools.solana.rpc import CoinToolsClient
+
+SLOT_SECONDS = 0.4
+FEE_CACHE_SLOTS = 4  # re-sample an account's fees after this many slots
+DEFAULT_FEE_PERCENTILE = 75
+
+# account -> (monotonic time fetched, {slot: fee in micro-lamports per compute unit})
+priority_fee_cache = {}
+
+
+def get_fee_percentile() -> int:
+    """Percentile of recent fees targeted by `--unit-price auto`, COINTOOLS_FEE_PERCENTILE overrides the default."""
+    return int(os.getenv("COINTOOLS_FEE_PERCENTILE", DEFAULT_FEE_PERCENTILE))
+
+
+def fetch_recent_prioritization_fees(client: CoinToolsClient, account: PublicKey) -> dict[int, int]:
+    """
+    Fetches the recent prioritization fees paid by transactions that write-locked the account, keyed by slot.
+    """
+    samples = client.make_raw_request("getRecentPrioritizationFees", [[str(account)]])
+    return {sample["slot"]: sample["prioritizationFee"] for sample in samples}
+
+
+def fetch_priority_fee(client: Client, accounts: list[PublicKey], percentile: int = None) -> int:
+    """
+    Estimates the unit price (micro-lamports) needed to land a transaction writing to these accounts.
+    Each account's recent fees are cached for a few slots; per slot the highest fee across accounts is taken,
+    since the busiest account decides the price, then the percentile across slots is returned.
+    """
+    percentile = get_fee_percentile() if percentile is None else percentile
+    now = time.monotonic()
+
+    fees_by_slot = {}
+    for account in accounts:
+        cached = priority_fee_cache.get(str(account))
+        if cached and now - cached[0] < FEE_CACHE_SLOTS * SLOT_SECONDS:
+            account_fees = cached[1]
+        else:
+            account_fees = fetch_recent_prioritization_fees(client, account)
+            priority_fee_cache[str(account)] = (now, account_fees)
+
+        for slot, fee in account_fees.items():
+            fees_by_slot[slot] = max(fee, fees_by_slot.get(slot, 0))
+
+    if not fees_by_slot:
+        return 0
+
+    fees = sorted(fees_by_slot.values())
+    index = min(len(fees) - 1, int(len(fees) * percentile / 100))
+    return fees[index]
+
+
+def resolve_unit_price(client: Client, unit_price, accounts: list[PublicKey]) -> int:
+    """
+    Returns unit_price as an int, estimating it from recent fees on the accounts when it is 'auto'.
+    """
+    if unit_price == "auto":
+        estimate = fetch_priority_fee(client, accounts)
+        print(f"Estimated unit price: {estimate} micro-lamports")
+        return estimate
+    return int(unit_price)
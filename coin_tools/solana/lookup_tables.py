@@ -0,0 +1,40 @@
+from solana.rpc.api import Client
+from solders.address_lookup_table_account import AddressLookupTable, AddressLookupTableAccount  #type: ignore
+from solders.pubkey import Pubkey as PublicKey  #type: ignore
+
+from coin_tools.db import get_lookup_tables
+
+MAX_EXTEND_ADDRESSES = 20  # addresses per extend instruction that fit in one transaction
+
+
+def fetch_lookup_table_addresses(client: Client, table_pubkey: PublicKey) -> list[PublicKey]:
+    """
+    Fetches the addresses stored in an address lookup table from the blockchain.
+    """
+    resp = client.get_account_info(table_pubkey)
+    if resp.value is None:
+        raise RuntimeError(f"No lookup table account found: {table_pubkey}")
+
+    return list(AddressLookupTable.deserialize(bytes(resp.value.data)).addresses)
+
+
+def get_lookup_table_accounts(refs: str) -> list[AddressLookupTableAccount]:
+    """
+    Returns lookup table accounts from the DB cache for a comma separated list of table names or addresses,
+    so compiling v0 messages does not need a round trip per table.
+    """
+    if not refs:
+        return []
+
+    tables = get_lookup_tables()
+    accounts = []
+    for ref in refs.split(","):
+        matches = [t for t in tables if ref in (t["name"], t["address"])]
+        if not matches:
+            raise Exception(f"Unknown lookup table {ref}, create it or run `lookup-tables sync --table {ref}`.")
+        for table in matches:
+            accounts.append(AddressLookupTableAccount(
+                key=PublicKey.from_string(table["address"]),
+                addresses=[PublicKey.from_string(address) for address in table["addresses"]]
+            ))
+    return accounts
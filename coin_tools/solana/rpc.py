@@ -0,0 +1,427 @@
+"""
+RPC client layer shared by every command.
+
+CoinToolsProvider replaces the HTTP provider of solana-py's Client. Reads that sit in front of trades are hedged:
+if the primary endpoint has not answered within the hedge delay the same read goes to the next endpoint
+in COINTOOLS_RPC_URLS and whichever answers first wins. The delay is COINTOOLS_HEDGE_DELAY_MS when set,
+otherwise the p90 of recent primary latencies.
+
+Requests to each endpoint pass through an AdaptiveLimiter, so every command shares one in-flight limit
+that grows while the endpoint is healthy and halves when it answers 429 or times out.
+
+Identical reads in flight at the same time share one request, and read responses are kept in a bounded LRU
+for a per-method TTL: a slot for chain state, longer for values that rarely change. Long lived entries are
+saved to COINTOOLS_RPC_CACHE_PATH, when set, and reused by the next run.
+"""
+import atexit
+import json
+import os
+import statistics
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+import httpx
+from solana.rpc.api import Client
+from solana.rpc.commitment import Commitment
+from solana.rpc.providers.core import _after_request_unparsed
+from solana.rpc.providers.http import HTTPProvider
+
+from coin_tools import stats
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_HEDGE_DELAY = 0.25  # seconds, used until enough latencies are sampled
+MIN_LATENCY_SAMPLES = 20
+LATENCY_WINDOW = 200
+HEDGE_WORKERS = 32
+
+INITIAL_CONCURRENCY = 8
+MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 64
+HEALTHY_LATENCY = 1.0  # seconds, slower successes do not raise the limit
+DECREASE_FACTOR = 0.5
+DECREASE_WINDOW = 1.0  # seconds, a burst of throttles from one overload only cuts the limit once
+THROTTLE_RETRIES = 3
+THROTTLE_BACKOFF = 0.25  # seconds, doubled on each retry
+
+SLOT_SECONDS = 0.4
+DEFAULT_CACHE_SIZE = 4096  # responses kept in memory
+PERSIST_MIN_TTL = 60  # seconds, shorter lived responses are not worth saving between runs
+
+# Seconds a read response stays fresh. Chain state lives for a slot, enough to fold repeats within one step of a command
+CACHE_TTLS = {
+    "getAccountInfo": SLOT_SECONDS,
+    "getBalance": SLOT_SECONDS,
+    "getBlockHeight": SLOT_SECONDS,
+    "getLatestBlockhash": 5 * SLOT_SECONDS,
+    "getMinimumBalanceForRentExemption": 24 * 60 * 60,
+    "getMultipleAccounts": SLOT_SECONDS,
+    "getSlot": SLOT_SECONDS,
+    "getTokenAccountBalance": SLOT_SECONDS,
+    "getTokenAccountsByOwner": SLOT_SECONDS,
+    "getTokenSupply": 60,
+}
+
+# Reads safe to send twice, sends and simulations are never hedged or coalesced
+HEDGED_METHODS = {
+    "getAccountInfo",
+    "getBalance",
+    "getBlockHeight",
+    "getLatestBlockhash",
+    "getMinimumBalanceForRentExemption",
+    "getMultipleAccounts",
+    "getRecentPrioritizationFees",
+    "getSignatureStatuses",
+    "getSignaturesForAddress",
+    "getSlot",
+    "getTokenAccountBalance",
+    "getTokenAccountsByOwner",
+    "getTokenSupply",
+}
+
+
+# Shared by every client in the process so hedging state, latencies and limits carry across calls
+rpc_provider = None
+verbose = False
+
+
+def set_verbose(enabled: bool):
+    """Prints limiter changes as they happen and limiter state with the RPC stats."""
+    global verbose
+    verbose = enabled
+
+
+def get_max_concurrency() -> int:
+    return int(os.getenv("COINTOOLS_RPC_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+
+
+def get_cache_path():
+    """File the long lived part of the response cache is saved to between runs, or None."""
+    return os.getenv("COINTOOLS_RPC_CACHE_PATH")
+
+
+def get_rpc_urls() -> list[str]:
+    """
+    Returns COINTOOLS_RPC_URL followed by any extra endpoints in the comma separated COINTOOLS_RPC_URLS.
+    """
+    urls = [os.getenv("COINTOOLS_RPC_URL")] + os.getenv("COINTOOLS_RPC_URLS", "").split(",")
+    urls = list(dict.fromkeys(url.strip() for url in urls if url and url.strip()))
+    if not urls:
+        raise EnvironmentError("COINTOOLS_RPC_URL environment variable is not set.")
+    return urls
+
+
+def request_method(content: str) -> str:
+    """
+    Returns the method of a serialized JSON-RPC request. Solders class names do not always match it,
+    SendRawTransaction and SendLegacyTransaction are both sent as sendTransaction.
+    """
+    return json.loads(content)["method"]
+
+
+def get_hedge_delay():
+    """Fixed hedge delay in seconds from COINTOOLS_HEDGE_DELAY_MS, or None to use the observed p90."""
+    delay_ms = os.getenv("COINTOOLS_HEDGE_DELAY_MS")
+    return int(delay_ms) / 1000 if delay_ms else None
+
+
+def is_throttle(error: Exception) -> bool:
+    """True for the errors that mean the endpoint is overloaded: HTTP 429 and timeouts."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429
+    return isinstance(error, httpx.TimeoutException)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on in-flight requests to one endpoint. Each healthy response adds 1/limit, so the limit grows
+    by about one per round of requests, a throttle multiplies it by DECREASE_FACTOR.
+    """
+
+    def __init__(self, name: str, initial: int = INITIAL_CONCURRENCY, minimum: int = MIN_CONCURRENCY, maximum: int = None):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum or get_max_concurrency()
+        self.limit = float(min(initial, self.maximum))
+        self.peak_limit = self.limit
+        self.in_flight = 0
+        self.throttle_events = 0
+        self.last_decrease = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float = None, throttled: bool = False):
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self.throttle_events += 1
+                stats.increment("rpc_throttles")
+                if now - self.last_decrease > DECREASE_WINDOW:
+                    previous = self.limit
+                    self.limit = max(self.minimum, self.limit * DECREASE_FACTOR)
+                    self.last_decrease = now
+                    if verbose:
+                        print(f"RPC throttled by {self.name}, concurrency limit {int(previous)} -> {int(self.limit)}")
+            elif latency is not None and latency < HEALTHY_LATENCY:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self.peak_limit = max(self.peak_limit, self.limit)
+            self.condition.notify_all()
+
+
+class ResponseCache:
+    """
+    LRU of raw RPC responses keyed by request body, each entry expires at a wall clock time so it can be persisted.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # body -> (expires, raw response)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.time():
+                self.misses += 1
+                stats.increment("rpc_cache_misses")
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            stats.increment("rpc_cache_hits")
+            return entry[1]
+
+    def put(self, key: str, raw: str, ttl: float):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, raw)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def load(self, path: str):
+        if not os.path.exists(path):
+            return
+        with open(path) as f:
+            saved = json.load(f)
+        now = time.time()
+        with self.lock:
+            for key, (expires, raw) in saved.items():
+                if expires > now:
+                    self.entries[key] = (expires, raw)
+
+    def save(self, path: str):
+        now = time.time()
+        with self.lock:
+            saved = {key: entry for key, entry in self.entries.items() if entry[0] > now + PERSIST_MIN_TTL}
+        with open(path, "w") as f:
+            json.dump(saved, f)
+
+
+class CoinToolsProvider(HTTPProvider):
+    """HTTP provider that hedges reads to a secondary endpoint and adapts its concurrency to each endpoint."""
+
+    def __init__(self, endpoint: str, hedge_endpoint: str = None, hedge_delay: float = None, timeout: float = DEFAULT_TIMEOUT):
+        super().__init__(endpoint, timeout=timeout)
+        self.hedge_provider = HTTPProvider(hedge_endpoint, timeout=timeout) if hedge_endpoint else None
+        self.hedge_delay = hedge_delay
+        self.executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS) if hedge_endpoint else None
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.limiters = {self: AdaptiveLimiter(str(endpoint))}
+        if self.hedge_provider:
+            self.limiters[self.hedge_provider] = AdaptiveLimiter(str(hedge_endpoint))
+        self.lock = threading.Lock()
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.cache = ResponseCache()
+        self.in_flight = {}  # body -> Future of the request every identical caller waits on
+        self.coalesced = 0
+
+    def current_hedge_delay(self) -> float:
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        with self.lock:
+            latencies = list(self.latencies)
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return DEFAULT_HEDGE_DELAY
+        return statistics.quantiles(latencies, n=10)[-1]
+
+    def post(self, provider: HTTPProvider, content: str, started: threading.Event = None) -> str:
+        """
+        Posts to one endpoint inside its limiter, retrying with backoff when throttled.
+        started is set once the limiter lets the first attempt through.
+        """
+        headers = {"Content-Type": "application/json"}
+        if provider.extra_headers:
+            headers.update(provider.extra_headers)
+        limiter = self.limiters[provider]
+
+        for attempt in range(THROTTLE_RETRIES + 1):
+            limiter.acquire()
+            if started:
+                started.set()
+            start = time.monotonic()
+            try:
+                raw = _after_request_unparsed(provider.session.post(url=provider.endpoint_uri, headers=headers, content=content))
+            except Exception as e:
+                limiter.release(throttled=is_throttle(e))
+                if not is_throttle(e) or attempt == THROTTLE_RETRIES:
+                    raise
+                time.sleep(THROTTLE_BACKOFF * 2 ** attempt)
+                continue
+
+            latency = time.monotonic() - start
+            limiter.release(latency=latency)
+            if provider is self:
+                with self.lock:
+                    self.latencies.append(latency)
+            return raw
+
+    def dispatch(self, method: str, content: str) -> str:
+        """
+        Answers a read from the cache or from an identical request already in flight, otherwise sends it.
+        A response carrying a JSON-RPC error is not cached.
+        """
+        if method not in HEDGED_METHODS:
+            return self.send(method, content)
+
+        ttl = CACHE_TTLS.get(method)
+        if ttl:
+            raw = self.cache.get(content)
+            if raw is not None:
+                return raw
+
+        with self.lock:
+            future = self.in_flight.get(content)
+            leader = future is None
+            if leader:
+                future = self.in_flight[content] = Future()
+            else:
+                self.coalesced += 1
+                stats.increment("rpc_coalesced")
+        if not leader:
+            return future.result()
+
+        try:
+            raw = self.send(method, content)
+            if ttl and "error" not in json.loads(raw):
+                self.cache.put(content, raw, ttl)
+            future.set_result(raw)
+            return raw
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[content]
+
+    def send(self, method: str, content: str) -> str:
+        """Sends a request over the network, recording its latency, response size and errors under its method."""
+        start = time.perf_counter()
+        try:
+            raw = self.hedged_send(method, content)
+        except Exception:
+            stats.record_call("rpc", method, time.perf_counter() - start, error=True)
+            raise
+        stats.record_call("rpc", method, time.perf_counter() - start, len(raw))
+        return raw
+
+    def hedged_send(self, method: str, content: str) -> str:
+        """Posts a JSON-RPC request body, hedging it when it is a read and a secondary endpoint is configured."""
+        if self.hedge_provider is None or method not in HEDGED_METHODS:
+            return self.post(self, content)
+
+        # The hedge delay runs from when the primary is on the wire, time queued for a worker or held back by the
+        # limiter is not slowness of the endpoint and hedging it would double traffic just as the limiter backs off
+        started = threading.Event()
+        primary = self.executor.submit(self.post, self, content, started)
+        primary.add_done_callback(lambda _: started.set())
+        started.wait()
+        done, _ = wait([primary], timeout=self.current_hedge_delay())
+        if done:
+            return primary.result()
+
+        with self.lock:
+            self.hedges += 1
+        stats.increment("rpc_hedges")
+        secondary = self.executor.submit(self.post, self.hedge_provider, content)
+        pending = {primary, secondary}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    raw = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if future is secondary:
+                    with self.lock:
+                        self.hedge_wins += 1
+                    stats.increment("rpc_hedge_wins")
+                return raw
+        raise error
+
+    def make_request_unparsed(self, body) -> str:
+        content = body.to_json()
+        return self.dispatch(request_method(content), content)
+
+    def make_raw_request(self, method: str, params: list):
+        """Makes a JSON-RPC request solders has no type for, returns the decoded result."""
+        content = json.dumps({"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+        response = json.loads(self.dispatch(method, content))
+        if "error" in response:
+            raise Exception(f"{method} failed: {response['error']}")
+        return response["result"]
+
+
+class CoinToolsClient(Client):
+    """
+    solana-py Client whose requests go through a CoinToolsProvider.
+    Client only takes an endpoint and keeps the HTTPProvider it builds in the private _provider attribute that
+    every request method reads. This is the one place relying on that, check it when upgrading solana-py.
+    """
+
+    def __init__(self, provider: CoinToolsProvider, commitment: Commitment = None):
+        super().__init__(provider.endpoint_uri, commitment=commitment, timeout=provider.timeout)
+        self._provider = provider
+
+    def make_raw_request(self, method: str, params: list):
+        """Makes a JSON-RPC request solders has no type for, returns the decoded result."""
+        return self._provider.make_raw_request(method, params)
+
+
+def get_rpc_provider() -> CoinToolsProvider:
+    """Returns the provider shared by every client, created on first use. The second endpoint, if any, takes hedged reads."""
+    global rpc_provider
+    if rpc_provider is None:
+        urls = get_rpc_urls()
+        rpc_provider = CoinToolsProvider(urls[0], hedge_endpoint=urls[1] if len(urls) > 1 else None, hedge_delay=get_hedge_delay())
+        cache_path = get_cache_path()
+        if cache_path:
+            try:
+                rpc_provider.cache.load(cache_path)
+            except Exception as e:
+                print(f"Warning: ignoring unreadable RPC cache {cache_path}: {e}")
+            atexit.register(rpc_provider.cache.save, cache_path)
+    return rpc_provider
+
+
+def print_rpc_stats():
+    if rpc_provider is None:
+        return
+    if rpc_provider.hedge_provider:
+        print(f"RPC Hedges: {rpc_provider.hedges}, Won By Secondary: {rpc_provider.hedge_wins}, "
+              f"Hedge Delay: {rpc_provider.current_hedge_delay() * 1000:.0f} ms")
+    if verbose:
+        print(f"RPC Cache: Hits: {rpc_provider.cache.hits}, Misses: {rpc_provider.cache.misses}, Coalesced: {rpc_provider.coalesced}")
+        for limiter in rpc_provider.limiters.values():
+            print(f"RPC Concurrency {limiter.name}: Limit: {int(limiter.limit)}, Peak: {int(limiter.peak_limit)}, "
+                  f"Throttle Events: {limiter.throttle_events}")
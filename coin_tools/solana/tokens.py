@@ -13,12 +13,19 @@ from spl.token.instructions import (
     get_associated_token_address,
 )
 
-from coin_tools.db import get_token_metadata, upsert_token_metadata
+from coin_tools.db import (
+    get_token_account,
+    get_token_account_owners,
+    get_token_metadata,
+    insert_token_accounts,
+    upsert_token_metadata,
+)
 from coin_tools.solana.metaplex_parse import parse_metaplex
-from coin_tools.solana.utils import APPROX_RENT, fetch_sol_balance
+from coin_tools.solana.utils import APPROX_RENT, fetch_multiple_accounts, fetch_sol_balance
 
 TOKEN_METADATA_PROGRAM_ID = PublicKey.from_string("metaqbxxUerdq28cj1RbAWkYQm3ybzjb6a8bt518x1s")
 UNKNOWN_TOKEN = {"name": "Unknown", "symbol": "???", "uri": ""} 
+ATA_CREATE_COMPUTE_UNITS = 30_000
 
 known_tokens = get_token_metadata()
 
@@ -42,7 +49,7 @@ def fetch_token_metadata(client: Client, mint_pubkey: PublicKey) -> dict:
     resp = client.get_account_info(metadata_pubkey)
 
     account_info = resp.value
-    metadata = UNKNOWN_TOKEN
+    metadata = dict(UNKNOWN_TOKEN)
     if account_info and account_info.data:
         raw_data = bytes(account_info.data)
         metadata = parse_metaplex(raw_data)
@@ -50,6 +57,7 @@ def fetch_token_metadata(client: Client, mint_pubkey: PublicKey) -> dict:
     decimals = fetch_mint_decimals(client, mint_pubkey)
     metadata["decimals"] = decimals
     upsert_token_metadata(mint_str, metadata["name"], metadata["symbol"], metadata["uri"], decimals)
+    known_tokens[mint_str] = metadata
     return metadata
 
 
@@ -69,6 +77,13 @@ def fetch_token_accounts(client: Client, wallet_pubkey: PublicKey):
     """
     Fetches all token accounts for a given wallet pubkey from the blockchain.
     """
+    return fetch_token_accounts_at_slot(client, wallet_pubkey)[1]
+
+
+def fetch_token_accounts_at_slot(client: Client, wallet_pubkey: PublicKey) -> tuple[int, list[dict]]:
+    """
+    Like fetch_token_accounts, also returning the slot the token accounts were read at.
+    """
     token_opts = TokenAccountOpts(
         program_id=TOKEN_PROGRAM_ID,
         encoding="base64",
@@ -82,7 +97,7 @@ def fetch_token_accounts(client: Client, wallet_pubkey: PublicKey):
 
     token_accounts = resp.value
     if not token_accounts:
-        return results
+        return resp.context.slot, results
 
     for entry in token_accounts:
         # 1) Decode the token account data
@@ -102,6 +117,7 @@ def fetch_token_accounts(client: Client, wallet_pubkey: PublicKey):
 
         # 4) Append metadata
         results.append({
+            "token_account": entry.pubkey,
             "mint_pubkey": mint_pubkey,
             "amount": amount,
             "decimals": decimals,
@@ -110,15 +126,54 @@ def fetch_token_accounts(client: Client, wallet_pubkey: PublicKey):
             "token_ticker": token_ticker,
         })
 
-    return results
+    return resp.context.slot, results
+
+
+def fetch_token_account_amounts(client: Client, token_accounts: list[PublicKey]) -> list[int]:
+    """
+    Fetches the raw token amounts held by many token accounts in batched calls. Missing accounts have amount 0.
+    """
+    amounts = []
+    for account in fetch_multiple_accounts(client, token_accounts):
+        if account is None or not account.data:
+            amounts.append(0)
+        else:
+            amounts.append(ACCOUNT_LAYOUT.parse(account.data).amount)
+    return amounts
+
+
+def fetch_token_accounts_exist(client: Client, owners: list[PublicKey], mint_pubkey: PublicKey) -> list[bool]:
+    """
+    Checks which owners already have an associated token account for the mint.
+    Accounts recorded in the DB are not fetched, the rest are fetched in batches and recorded if they exist.
+    """
+    mint_str = str(mint_pubkey)
+    known_owners = get_token_account_owners(mint_str)
+    unknown = [owner for owner in owners if str(owner) not in known_owners]
+    unknown_atas = [get_associated_token_address(owner=owner, mint=mint_pubkey) for owner in unknown]
+
+    found = []
+    for owner, ata, account in zip(unknown, unknown_atas, fetch_multiple_accounts(client, unknown_atas)):
+        if account:
+            found.append((str(owner), mint_str, str(ata)))
+            known_owners.add(str(owner))
+    insert_token_accounts(found)
+
+    return [str(owner) in known_owners for owner in owners]
 
 
 def fetch_or_create_token_account(client: Client, payer_pubkey: PublicKey, owner_pubkey: PublicKey, mint_pubkey: PublicKey, signer_keypair: Keypair) -> PublicKey:
     """
     Fetches associated token account from the blockchain or creates it if it does not exist.
+    Accounts recorded in the DB (see `tokens prewarm-ata`) skip the existence check, but nothing notices when one is
+    closed outside the tool, so they still get an idempotent create instruction: a few thousand compute units per
+    transaction instead of an RPC round trip, and a closed account is recreated instead of failing every trade.
     """
     ata = get_associated_token_address(owner=owner_pubkey, mint=mint_pubkey)
 
+    if get_token_account(str(owner_pubkey), str(mint_pubkey)):
+        return ata, create_idempotent_associated_token_account(payer=payer_pubkey, owner=owner_pubkey, mint=mint_pubkey)
+
     response = client.get_account_info(ata)
 
     if not response.value:
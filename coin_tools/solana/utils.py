@@ -1,28 +1,64 @@
 
-import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 from dis import Instruction
 
 from solana.constants import LAMPORTS_PER_SOL
 from solana.rpc.api import Client
 from solana.rpc.types import TxOpts
+from solders.hash import Hash  #type: ignore
 from solders.keypair import Keypair  #type: ignore
-from solders.message import Message  #type: ignore
+from solders.address_lookup_table_account import AddressLookupTableAccount  #type: ignore
+from solders.message import Message, MessageV0, to_bytes_versioned  #type: ignore
+from solders.presigner import Presigner  #type: ignore
 from solders.pubkey import Pubkey as PublicKey  #type: ignore  #type: ignore
-from solders.transaction import Transaction  #type: ignore
+from solders.signature import Signature  #type: ignore
+from solders.system_program import AdvanceNonceAccountParams, advance_nonce_account  #type: ignore
+from solders.transaction import Transaction, VersionedTransaction  #type: ignore
 from spl.token.instructions import (
     get_associated_token_address,
 )
 
+from coin_tools.solana.broadcast import BLOCKHASH_VALID_BLOCKS, broadcast_transaction
+from coin_tools.solana.rpc import DEFAULT_MAX_CONCURRENCY, CoinToolsClient, get_rpc_provider, get_rpc_urls
+from coin_tools.tracing import span
+
 
 APPROX_RENT = 0.002
+PACKET_DATA_SIZE = 1232  # max size of a serialized transaction
+MAX_COMPUTE_UNITS = 1_400_000  # max compute unit limit of a transaction
+SIGNATURE_FEE_LAMPORTS = 5000  # base fee per transaction signature
+NONCE_ACCOUNT_SIZE = 80
+MAX_MULTIPLE_ACCOUNTS = 100  # max keys per getMultipleAccounts call
 
 def get_solana_client() -> Client:
-    """Returns a Solana RPC client."""
-    rpc_url = os.getenv("COINTOOLS_RPC_URL")
-    if not rpc_url:
-        raise EnvironmentError("COINTOOLS_RPC_URL environment variable is not set.")
-    return Client(rpc_url)
+    """Returns a Solana RPC client using the shared provider."""
+    return CoinToolsClient(get_rpc_provider())
+
+def get_broadcast_clients() -> list[Client]:
+    """Returns a client for every configured RPC endpoint, the primary endpoint first."""
+    return [Client(url) for url in get_rpc_urls()]
+
+def rebroadcast_transaction(client: Client, transaction, last_valid_block_height: int = None, should_confirm: bool = False):
+    """
+    Broadcasts a signed transaction to every configured endpoint until it lands, returns its signature.
+    Without last_valid_block_height (nonce transactions) it gives up after the usual blockhash lifetime.
+    """
+    if last_valid_block_height is None:
+        last_valid_block_height = client.get_block_height().value + BLOCKHASH_VALID_BLOCKS
+
+    with span("send", rebroadcast=True):
+        result = broadcast_transaction(get_broadcast_clients(), transaction, last_valid_block_height)
+    if not result.landed:
+        raise Exception(f"Transaction {result.signature} expired before landing.")
+    if result.error:
+        raise Exception(f"Transaction {result.signature} failed: {result.error}")
+
+    if should_confirm:
+        with span("confirm"):
+            client.confirm_transaction(transaction.signatures[0])
+    return transaction.signatures[0]
 
 def parse_private_key_bytes(secret_bytes:bytes) -> Keypair:
     """Handles parsing a private key from bytes."""
@@ -36,11 +72,41 @@ def parse_private_key_bytes(secret_bytes:bytes) -> Keypair:
     else:
         raise Exception(f"Private key must be 32 or 64 bytes, but got length {len(secret_bytes)}.")
 
+def priority_fee_lamports(unit_limit: int, unit_price: int) -> int:
+    """Returns the priority fee in lamports for a compute unit limit and a price in micro-lamports per unit."""
+    return -(-unit_limit * unit_price // 1_000_000)
+
+def fetch_rent_exempt_minimum(client: Client, size: int = 0) -> int:
+    """Fetches the minimum lamports for an account of the given data size to be rent exempt."""
+    return client.get_minimum_balance_for_rent_exemption(size).value
+
 def fetch_sol_balance(client: Client, pubkey: PublicKey) -> Decimal:
     resp = client.get_balance(pubkey)
     lamports = resp.value
     return Decimal(lamports) / Decimal(LAMPORTS_PER_SOL)
 
+def fetch_last_signature(client: Client, pubkey: PublicKey, until: Signature = None) -> tuple[str, int]:
+    """
+    Returns (signature, slot) of the newest transaction referencing the pubkey, or None if there is none.
+    With until, only transactions newer than that signature count, None means nothing changed since.
+    """
+    resp = client.get_signatures_for_address(pubkey, until=until, limit=1)
+    if not resp.value:
+        return None
+    return str(resp.value[0].signature), resp.value[0].slot
+
+def fetch_multiple_accounts(client: Client, pubkeys: list[PublicKey]) -> list:
+    """Fetches account infos for many pubkeys, batching getMultipleAccounts calls. Missing accounts are None."""
+    accounts = []
+    for i in range(0, len(pubkeys), MAX_MULTIPLE_ACCOUNTS):
+        resp = client.get_multiple_accounts(pubkeys[i:i + MAX_MULTIPLE_ACCOUNTS])
+        accounts.extend(resp.value)
+    return accounts
+
+def fetch_multiple_lamports(client: Client, pubkeys: list[PublicKey]) -> list[int]:
+    """Fetches the lamport balances for many pubkeys in batched calls."""
+    return [account.lamports if account else 0 for account in fetch_multiple_accounts(client, pubkeys)]
+
 def fetch_token_balance(client: Client, wallet_pubkey: PublicKey, mint_pubkey: PublicKey) -> Decimal:
     """Derives the token account and fetches the balance."""
     ata = get_associated_token_address(owner=wallet_pubkey, mint=mint_pubkey)
@@ -59,29 +125,162 @@ def fetch_token_balance(client: Client, wallet_pubkey: PublicKey, mint_pubkey: P
     token_balance = Decimal(raw_amount_str) / (Decimal(10) ** Decimal(decimals))
     return token_balance
 
-def send_transaction(client:Client, keypair: Keypair, instructions:list[Instruction], should_confirm:bool=False):
-    """Sends a transaction to the Solana network."""
+def compile_message(payer: PublicKey, instructions: list[Instruction], recent_blockhash: Hash, lookup_tables: list[AddressLookupTableAccount] = None):
+    """
+    Compiles a legacy message, or a v0 message when lookup tables are given.
+    Accounts found in the lookup tables are referenced by a 1 byte index instead of a 32 byte key.
+    """
+    if lookup_tables:
+        return MessageV0.try_compile(payer, instructions, lookup_tables, recent_blockhash)
+    return Message.new_with_blockhash(instructions, payer, recent_blockhash)
 
-    # Get recent blockhash
-    recent_blockhash = client.get_latest_blockhash().value.blockhash
+def transaction_size(payer: PublicKey, instructions: list[Instruction], lookup_tables: list[AddressLookupTableAccount] = None) -> int:
+    """Returns the serialized size in bytes of a signed transaction carrying these instructions."""
+    message = compile_message(payer, instructions, Hash.default(), lookup_tables)
+    num_signatures = message.header.num_required_signatures
+    message_bytes = to_bytes_versioned(message) if lookup_tables else bytes(message)
+    # compact-u16 signature count (1 byte below 128 signers) + signatures + message
+    return 1 + 64 * num_signatures + len(message_bytes)
+
+def pack_instruction_groups(payer: PublicKey, groups: list[list[Instruction]], prefix: list[Instruction] = None, lookup_tables: list[AddressLookupTableAccount] = None, max_groups: int = None) -> list[list[list[Instruction]]]:
+    """
+    Greedily packs groups of instructions into as few transactions as possible.
+    A group is never split across transactions; prefix instructions (e.g. compute budget) are counted in every transaction.
+    max_groups optionally caps the groups per transaction (e.g. to stay under MAX_COMPUTE_UNITS).
+    Returns a list of batches, each batch being the list of groups that fit into one transaction.
+    """
+    prefix = prefix or []
+    batches = []
+    current = []
+    for group in groups:
+        candidate = prefix + [ix for g in current for ix in g] + group
+        if current and (len(current) == max_groups or transaction_size(payer, candidate, lookup_tables) > PACKET_DATA_SIZE):
+            batches.append(current)
+            current = []
+        current.append(group)
+
+    if current:
+        batches.append(current)
+    return batches
+
+def presign(signers: list, message_bytes: bytes) -> list:
+    """
+    Keypairs sign locally. Any other signer with pubkey() and sign_message(), e.g. a key agent signer,
+    is asked for its signature of the message up front and signs through a Presigner.
+    """
+    return [s if isinstance(s, Keypair) else Presigner(s.pubkey(), s.sign_message(message_bytes)) for s in signers]
+
+def sign_transaction(keypair: Keypair, instructions:list[Instruction], recent_blockhash: Hash, signers:list[Keypair]=None, lookup_tables:list[AddressLookupTableAccount]=None):
+    """
+    Builds and signs a transaction offline. The keypair pays the fees, any additional signers co-sign the message.
+    Returns a legacy Transaction, or a VersionedTransaction when lookup tables are given.
+    """
+    if lookup_tables:
+        message = compile_message(keypair.pubkey(), instructions, recent_blockhash, lookup_tables)
+        return VersionedTransaction(message, presign([keypair] + (signers or []), to_bytes_versioned(message)))
 
-    # Create transaction message
     message = Message.new_with_blockhash(
         instructions=instructions,
         blockhash=recent_blockhash,
         payer=keypair.pubkey(),
     )
 
-    # Create and sign the transaction
     transaction = Transaction.new_unsigned(message)
-    transaction.sign([keypair], recent_blockhash=recent_blockhash)
+    transaction.sign(presign([keypair] + (signers or []), bytes(message)), recent_blockhash=recent_blockhash)
+    return transaction
+
+def parse_nonce(account) -> Hash:
+    """Parses the durable nonce value from a nonce account, None if the account is missing or not initialized."""
+    if account is None or len(account.data) < NONCE_ACCOUNT_SIZE:
+        return None
+    # u32 version, u32 state, 32 byte authority, 32 byte durable nonce, u64 lamports per signature
+    state = int.from_bytes(account.data[4:8], "little")
+    if state != 1:
+        return None
+    return Hash(bytes(account.data[40:72]))
+
+def fetch_nonces(client: Client, nonce_pubkeys: list[PublicKey]) -> list[Hash]:
+    """Fetches the current durable nonce values of many nonce accounts in batched calls."""
+    return [parse_nonce(account) for account in fetch_multiple_accounts(client, nonce_pubkeys)]
+
+def sign_nonce_transaction(keypair: Keypair, instructions:list[Instruction], nonce_pubkey: PublicKey, nonce: Hash, signers:list[Keypair]=None, lookup_tables:list[AddressLookupTableAccount]=None):
+    """
+    Builds and signs a transaction against a durable nonce instead of a recent blockhash, so it does not expire until the nonce is advanced.
+    The keypair must be the nonce authority.
+    """
+    advance_ix = advance_nonce_account(AdvanceNonceAccountParams(nonce_pubkey=nonce_pubkey, authorized_pubkey=keypair.pubkey()))
+    return sign_transaction(keypair, [advance_ix] + instructions, nonce, signers, lookup_tables)
+
+def send_signed_transactions(client: Client, transactions: list[bytes], rate: float = 0, workers: int = DEFAULT_MAX_CONCURRENCY, rebroadcast: bool = False, last_valid_block_height: int = None) -> list:
+    """
+    Sends already signed, serialized transactions without preflight or confirmation.
+    Sends are dispatched at `rate` transactions per second (0 for as fast as possible) from a thread pool,
+    the RPC limiter decides how many are in flight.
+    With rebroadcast each transaction is broadcast to every configured endpoint until it lands.
+    Returns a signature or the exception raised for each transaction, in order.
+    """
+    txn_opts = TxOpts(skip_confirmation=True, skip_preflight=True)
+
+    def send(raw_transaction: bytes):
+        if rebroadcast:
+            return rebroadcast_transaction(client, VersionedTransaction.from_bytes(raw_transaction), last_valid_block_height)
+        return client.send_raw_transaction(raw_transaction, opts=txn_opts).value
+
+    futures = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        start = time.monotonic()
+        for i, raw_transaction in enumerate(transactions):
+            if rate:
+                delay = start + i / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(executor.submit(send, raw_transaction))
+
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
+
+def send_transaction(client:Client, keypair: Keypair, instructions:list[Instruction], should_confirm:bool=False, signers:list[Keypair]=None, opts:TxOpts=None, lookup_tables:list[AddressLookupTableAccount]=None, rebroadcast:bool=False):
+    """
+    Sends a transaction to the Solana network. The keypair pays the fees, any additional signers co-sign the message.
+    With lookup tables the transaction is sent as a v0 transaction.
+    With rebroadcast it is sent to every configured endpoint until it lands, opts are ignored.
+    """
+
+    # Get recent blockhash
+    with span("blockhash"):
+        latest_blockhash = client.get_latest_blockhash().value
+
+    # Create and sign the transaction
+    with span("sign"):
+        transaction = sign_transaction(keypair, instructions, latest_blockhash.blockhash, signers, lookup_tables)
+
+    if rebroadcast:
+        return rebroadcast_transaction(client, transaction, latest_blockhash.last_valid_block_height, should_confirm)
+    return send_signed_transaction(client, transaction, should_confirm, opts)
+
+def send_signed_transaction(client:Client, transaction, should_confirm:bool=False, opts:TxOpts=None):
+    """Sends a signed transaction to the Solana network."""
 
     # Send the transaction
-    txn_opts = TxOpts(skip_confirmation=False) if should_confirm else TxOpts(skip_confirmation=True)
-    response = client.send_transaction(transaction, opts=txn_opts)
-    
-    # Check response
-    if response.value:
-        return response.value
+    if opts:
+        txn_opts = opts
     else:
+        txn_opts = TxOpts(skip_confirmation=False) if should_confirm else TxOpts(skip_confirmation=True)
+
+    # Sent without confirming so the send and the confirmation are traced as separate phases
+    with span("send"):
+        response = client.send_transaction(transaction, opts=txn_opts._replace(skip_confirmation=True))
+
+    # Check response
+    if not response.value:
         raise Exception(f"Failed to send transaction: {response}")
+
+    if not txn_opts.skip_confirmation:
+        with span("confirm"):
+            client.confirm_transaction(response.value, txn_opts.preflight_commitment, last_valid_block_height=txn_opts.last_valid_block_height)
+    return response.value
@@ -0,0 +1,145 @@
+"""
+Process wide registry of call statistics.
+
+RPC requests and DB calls are recorded per method: count, errors, response bytes and latency percentiles.
+Events such as hedges or cache hits are plain counters. main prints a summary with --stats and writes
+JSON or Prometheus text with --stats-file.
+"""
+import functools
+import json
+import random
+import threading
+import time
+
+MAX_SAMPLES = 2048  # latencies kept per method, reservoir sampled beyond this
+PERCENTILES = (50, 90, 99)
+
+
+class CallStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.total_seconds = 0.0
+        self.samples = []
+
+    def record(self, seconds: float, size: int, error: bool):
+        self.count += 1
+        self.bytes += size
+        self.total_seconds += seconds
+        if error:
+            self.errors += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(seconds)
+        else:
+            index = random.randrange(self.count)
+            if index < MAX_SAMPLES:
+                self.samples[index] = seconds
+
+    def percentile(self, p: int) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+calls = {}  # (kind, method) -> CallStats
+counters = {}  # event name -> count
+lock = threading.Lock()
+
+
+def record_call(kind: str, method: str, seconds: float, size: int = 0, error: bool = False):
+    with lock:
+        stats = calls.get((kind, method))
+        if stats is None:
+            stats = calls[(kind, method)] = CallStats()
+        stats.record(seconds, size, error)
+
+
+def increment(name: str, amount: int = 1):
+    with lock:
+        counters[name] = counters.get(name, 0) + amount
+
+
+def timed(kind: str):
+    """Decorator recording every call of the function under its name."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                record_call(kind, func.__name__, time.perf_counter() - start, error=True)
+                raise
+            record_call(kind, func.__name__, time.perf_counter() - start)
+            return result
+        return wrapper
+    return decorator
+
+
+def snapshot() -> dict:
+    """Returns all recorded stats as plain data, calls sorted by total time spent."""
+    with lock:
+        entries = []
+        for (kind, method), stats in calls.items():
+            entry = {
+                "kind": kind,
+                "method": method,
+                "count": stats.count,
+                "errors": stats.errors,
+                "bytes": stats.bytes,
+                "total_seconds": stats.total_seconds,
+            }
+            for p in PERCENTILES:
+                entry[f"p{p}_seconds"] = stats.percentile(p)
+            entries.append(entry)
+        return {
+            "calls": sorted(entries, key=lambda e: e["total_seconds"], reverse=True),
+            "counters": dict(sorted(counters.items())),
+        }
+
+
+def print_stats():
+    data = snapshot()
+    print("Call Stats:")
+    print(f"   {'Kind':<4} {'Method':<36} {'Count':>7} {'Errors':>6} {'Bytes':>12} {'Total s':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for e in data["calls"]:
+        print(f"   {e['kind']:<4} {e['method']:<36} {e['count']:>7} {e['errors']:>6} {e['bytes']:>12} {e['total_seconds']:>9.3f} "
+              f"{e['p50_seconds'] * 1000:>8.1f} {e['p90_seconds'] * 1000:>8.1f} {e['p99_seconds'] * 1000:>8.1f}")
+    if data["counters"]:
+        print("Counters:")
+        for name, value in data["counters"].items():
+            print(f"   {name}: {value}")
+
+
+def to_prometheus(data: dict) -> str:
+    """Renders the stats in the Prometheus text exposition format, one metric family at a time."""
+    def labels(e):
+        return f'kind="{e["kind"]}",method="{e["method"]}"'
+
+    lines = ["# TYPE coin_tools_calls_total counter"]
+    lines += [f"coin_tools_calls_total{{{labels(e)}}} {e['count']}" for e in data["calls"]]
+    lines.append("# TYPE coin_tools_call_errors_total counter")
+    lines += [f"coin_tools_call_errors_total{{{labels(e)}}} {e['errors']}" for e in data["calls"]]
+    lines.append("# TYPE coin_tools_response_bytes_total counter")
+    lines += [f"coin_tools_response_bytes_total{{{labels(e)}}} {e['bytes']}" for e in data["calls"]]
+    lines.append("# TYPE coin_tools_call_seconds summary")
+    for e in data["calls"]:
+        for p in PERCENTILES:
+            lines.append(f'coin_tools_call_seconds{{{labels(e)},quantile="{p / 100}"}} {e[f"p{p}_seconds"]}')
+        lines.append(f"coin_tools_call_seconds_sum{{{labels(e)}}} {e['total_seconds']}")
+        lines.append(f"coin_tools_call_seconds_count{{{labels(e)}}} {e['count']}")
+    lines.append("# TYPE coin_tools_events_total counter")
+    lines += [f'coin_tools_events_total{{event="{name}"}} {value}' for name, value in data["counters"].items()]
+    return "\n".join(lines) + "\n"
+
+
+def write_stats(path: str):
+    """Writes the stats as Prometheus text when the path ends in .prom, JSON otherwise."""
+    data = snapshot()
+    with open(path, "w") as f:
+        if path.endswith(".prom"):
+            f.write(to_prometheus(data))
+        else:
+            json.dump(data, f, indent=2)
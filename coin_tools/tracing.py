@@ -0,0 +1,85 @@
+"""
+Lightweight phase tracing.
+
+span() times one phase of a command (DB lookup, decrypt, key parse, quote, build, sign, send, confirm).
+Every span is recorded in the stats registry under kind "span", and when --trace is given it is also
+written as one JSON line to the trace file. --profile runs the command under cProfile and tracemalloc.
+"""
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from coin_tools import stats
+
+PROFILE_ROWS = 60  # functions listed in the profile report
+ALLOCATION_ROWS = 25  # allocation sites listed in the profile report
+
+trace_file = None
+trace_lock = threading.Lock()
+
+
+def start_trace(path: str):
+    global trace_file
+    trace_file = open(path, "w")
+
+
+def stop_trace():
+    global trace_file
+    if trace_file:
+        trace_file.close()
+        trace_file = None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Times the enclosed block as a phase, attributes (e.g. wallet_id) are written with it to the trace."""
+    start = time.time()
+    perf_start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        seconds = time.perf_counter() - perf_start
+        stats.record_call("span", name, seconds, error=error is not None)
+        if trace_file:
+            record = {"span": name, "start": start, "seconds": seconds, "thread": threading.current_thread().name, **attributes}
+            if error:
+                record["error"] = error
+            line = json.dumps(record, default=str)
+            with trace_lock:
+                trace_file.write(line + "\n")
+
+
+def run_profiled(func, path: str):
+    """
+    Runs func under cProfile and tracemalloc, then writes the functions sorted by cumulative time
+    and the top allocation sites to path.
+    """
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        return func()
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(PROFILE_ROWS)
+        report.write(f"\nTraced Memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n")
+        report.write(f"Top {ALLOCATION_ROWS} allocation sites:\n")
+        for stat in snapshot.statistics("lineno")[:ALLOCATION_ROWS]:
+            report.write(f"   {stat}\n")
+        with open(path, "w") as f:
+            f.write(report.getvalue())
+        print(f"Profile written to {path}")
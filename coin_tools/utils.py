@@ -1,3 +1,4 @@
+import argparse
 import random
 import time
 
@@ -49,4 +50,28 @@ def parse_ranges(input_string):
             ids.extend(range(start, end + 1))
         else:
             ids.append(int(part))
-    return ids
\ No newline at end of file
+    return ids
+
+
+def parse_unit_price(value):
+    """
+    Argparse type for --unit-price, either an integer number of micro-lamports or 'auto'.
+    """
+    if value == "auto":
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid unit price '{value}', expected an integer or 'auto'")
+
+
+def parse_unit_limit(value):
+    """
+    Argparse type for --unit-limit, either an integer number of compute units or 'auto'.
+    """
+    if value == "auto":
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid unit limit '{value}', expected an integer or 'auto'")
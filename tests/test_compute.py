@@ -0,0 +1,81 @@
+"""
+Compute unit limits: transactions that run the same instructions share one simulated estimate.
+"""
+import pytest
+from cryptography.fernet import Fernet
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price  #type: ignore
+from solders.keypair import Keypair  #type: ignore
+from solders.system_program import TransferParams, transfer  #type: ignore
+
+from coin_tools.db import get_compute_unit_estimate, init_db
+from coin_tools.solana import compute
+from coin_tools.solana.compute import COMPUTE_UNIT_MARGIN, MIN_COMPUTE_UNIT_MARGIN, instruction_shape, resolve_unit_limit
+from coin_tools.solana.utils import MAX_COMPUTE_UNITS
+
+PAYER = Keypair().pubkey()
+
+
+@pytest.fixture(autouse=True)
+def database(tmp_path, monkeypatch):
+    monkeypatch.setenv("COINTOOLS_DB_PATH", str(tmp_path / "coin_tools.db"))
+    monkeypatch.setenv("COINTOOLS_ENC_KEY", Fernet.generate_key().decode())
+    monkeypatch.setattr(compute, "compute_unit_cache", {})
+    init_db()
+
+
+class Simulations:
+    """Stands in for simulate_compute_units, returns a fixed unit count and records every simulated transaction."""
+
+    def __init__(self, units: int):
+        self.units = units
+        self.calls = []
+
+    def __call__(self, client, payer, instructions, lookup_tables=None):
+        self.calls.append(instructions)
+        return self.units
+
+
+@pytest.fixture
+def simulations(monkeypatch):
+    simulations = Simulations(10_000)
+    monkeypatch.setattr(compute, "simulate_compute_units", simulations)
+    return simulations
+
+
+def transfers(count: int, lamports: int = 1_000) -> list:
+    return [transfer(TransferParams(from_pubkey=PAYER, to_pubkey=Keypair().pubkey(), lamports=lamports)) for _ in range(count)]
+
+
+def test_shape_ignores_accounts_amounts_and_compute_budget():
+    one = instruction_shape(transfers(3, lamports=1))
+    other = instruction_shape([set_compute_unit_limit(1), set_compute_unit_price(2)] + transfers(3, lamports=999))
+    assert one == other
+    assert one.endswith("*3")
+    assert instruction_shape(transfers(1)) != instruction_shape(transfers(2))
+
+
+def test_explicit_unit_limit_is_used_as_is(simulations):
+    assert resolve_unit_limit(None, "250000", PAYER, transfers(1)) == 250_000
+    assert resolve_unit_limit(None, 300_000, PAYER, transfers(1)) == 300_000
+    assert not simulations.calls
+
+
+def test_auto_simulates_each_shape_once(simulations):
+    expected = simulations.units + max(int(simulations.units * COMPUTE_UNIT_MARGIN), MIN_COMPUTE_UNIT_MARGIN)
+    assert resolve_unit_limit(None, "auto", PAYER, transfers(2)) == expected
+    assert resolve_unit_limit(None, "auto", PAYER, transfers(2, lamports=5)) == expected
+    assert len(simulations.calls) == 1
+
+    # A new process reads the estimate back from the DB instead of simulating
+    compute.compute_unit_cache.clear()
+    assert resolve_unit_limit(None, "auto", PAYER, transfers(2)) == expected
+    assert get_compute_unit_estimate(instruction_shape(transfers(2))) == expected
+    assert len(simulations.calls) == 1
+
+    resolve_unit_limit(None, "auto", PAYER, transfers(3))
+    assert len(simulations.calls) == 2
+
+
+def test_auto_limit_is_capped(simulations):
+    simulations.units = MAX_COMPUTE_UNITS - 10
+    assert resolve_unit_limit(None, "auto", PAYER, transfers(1)) == MAX_COMPUTE_UNITS
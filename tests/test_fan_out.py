@@ -0,0 +1,55 @@
+"""
+Fan-out funding tree amounts: every destination must end with exactly its target, the source pays the targets plus
+one fee per funding transaction.
+"""
+import random
+
+import pytest
+from cryptography.fernet import Fernet
+
+from coin_tools.db import init_db
+
+FEE = 5_000 + 1_234
+
+
+@pytest.fixture(autouse=True)
+def database(tmp_path, monkeypatch):
+    # transfers reads token metadata when it is imported
+    monkeypatch.setenv("COINTOOLS_DB_PATH", str(tmp_path / "coin_tools.db"))
+    monkeypatch.setenv("COINTOOLS_ENC_KEY", Fernet.generate_key().decode())
+    init_db()
+
+
+@pytest.fixture
+def transfers():
+    from coin_tools.commands import transfers
+    return transfers
+
+
+@pytest.mark.parametrize("count, fanout", [(1, 2), (2, 2), (7, 2), (10, 3), (100, 4), (250, 16)])
+def test_fan_out_amounts_sum_to_targets_plus_fees(transfers, count, fanout):
+    targets = [random.randint(1_000_000, 10_000_000) for _ in range(count)]
+    receive = transfers._fan_out_amounts(targets, fanout, FEE)
+
+    # Every wallet is funded by exactly one parent
+    children = {index: transfers._fan_out_children(index, count, fanout) for index in range(-1, count)}
+    funded = sorted(child for kids in children.values() for child in kids)
+    assert funded == list(range(count))
+
+    # What a wallet receives, less what it forwards and its fee, is its target
+    for index in range(count):
+        sent = sum(receive[c] for c in children[index]) + (FEE if children[index] else 0)
+        assert receive[index] - sent == targets[index]
+
+    # The source pays every target plus one fee per funding transaction
+    senders = [index for index, kids in children.items() if kids]
+    total = sum(receive[c] for c in children[-1]) + FEE
+    assert total == sum(targets) + FEE * len(senders)
+
+
+def test_fan_out_leaves_pay_no_fee(transfers):
+    targets = [1_000_000] * 6
+    receive = transfers._fan_out_amounts(targets, 2, FEE)
+    # Wallets 0 and 1 fund 2..5, which fund nobody
+    assert receive[2:] == targets[2:]
+    assert receive[0] == targets[0] + receive[2] + receive[3] + FEE
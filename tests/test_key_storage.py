@@ -0,0 +1,222 @@
+"""
+Private key storage: every wallet must still decrypt to its public key after each `wallets encryption` operation.
+Each test runs against a fresh database in a temporary COINTOOLS_DB_PATH.
+"""
+import argparse
+
+import pytest
+from cryptography.fernet import Fernet
+from solders.keypair import Keypair  #type: ignore
+
+from coin_tools import encryption
+from coin_tools.commands import wallets
+from coin_tools.db import (
+    get_all_wallets,
+    get_hd_seeds,
+    get_key_version_counts,
+    init_db,
+    insert_key_rotation,
+    insert_wallet,
+    update_private_keys,
+    update_wallet_status,
+)
+from coin_tools.encryption import (
+    DERIVED_KEY_VERSION,
+    ENVELOPE_PREFIX,
+    create_data_key,
+    decrypt_data,
+    encrypt_data,
+    get_encryption_key,
+    get_hd_seed_bytes,
+    key_version,
+    reencrypt_batch,
+)
+from coin_tools.hd import derivation_path, derive_private_key, format_path, is_hd_reference, parse_hd_reference
+from coin_tools.keyring import Keyring
+
+
+@pytest.fixture(autouse=True)
+def database(tmp_path, monkeypatch):
+    monkeypatch.setenv("COINTOOLS_DB_PATH", str(tmp_path / "coin_tools.db"))
+    monkeypatch.setenv("COINTOOLS_ENC_KEY", Fernet.generate_key().decode())
+    monkeypatch.delenv("COINTOOLS_AGENT_SOCK", raising=False)
+    init_db()
+
+
+def run(*argv: str):
+    """Runs a `wallets` sub-command as the CLI would."""
+    parser = argparse.ArgumentParser()
+    wallets.register(parser.add_subparsers(dest="command"))
+    args = parser.parse_args(["wallets", *argv])
+    args.func(args)
+
+
+def create_legacy_wallets(count: int) -> list[int]:
+    """Wallets in the original format, encrypted directly with the master key."""
+    f = Fernet(get_encryption_key())
+    ids = []
+    for i in range(count):
+        keypair = Keypair()
+        ids.append(insert_wallet(f"legacy{i}", str(keypair.pubkey()), f.encrypt(keypair.secret())))
+    return ids
+
+
+def assert_wallets_decrypt():
+    # Like a new process, so HD seeds and data keys are read back from the DB
+    for cache in (encryption.data_keys, encryption.active_key_ids, encryption.hd_seeds):
+        cache.clear()
+    all_wallets = get_all_wallets()
+    assert all_wallets
+    with Keyring(use_agent=False) as keyring:
+        for wallet in all_wallets:
+            assert str(keyring.keypair(wallet["id"]).pubkey()) == wallet["public_key"]
+
+
+def test_legacy_blob_round_trip():
+    secret = Keypair().secret()
+    blob = Fernet(get_encryption_key()).encrypt(secret)
+    assert key_version(blob) == 0
+    assert decrypt_data(blob) == secret
+
+
+def test_envelope_blob_round_trip():
+    secret = Keypair().secret()
+    blob = encrypt_data(secret)
+    assert blob.startswith(ENVELOPE_PREFIX)
+    assert key_version(blob) > 0
+    assert decrypt_data(blob) == secret
+
+
+def test_rotate_key_rewraps_data_keys(monkeypatch):
+    run("create", "--name", "w0")
+    run("bulk-create", "--count", "3", "--prefix", "w")
+    blobs = {w["id"]: w["private_key_encrypted"] for w in get_all_wallets()}
+
+    new_key = Fernet.generate_key().decode()
+    monkeypatch.setattr("builtins.input", lambda prompt: new_key)
+    run("encryption", "--rotate-key")
+    monkeypatch.setenv("COINTOOLS_ENC_KEY", new_key)
+
+    # Only the data keys are re-wrapped, the wallet rows are untouched
+    assert {w["id"]: w["private_key_encrypted"] for w in get_all_wallets()} == blobs
+    assert_wallets_decrypt()
+
+
+def test_rotate_key_refuses_legacy_wallets(monkeypatch, capsys):
+    create_legacy_wallets(2)
+    monkeypatch.setattr("builtins.input", lambda prompt: pytest.fail("prompted for a new key"))
+    run("encryption", "--rotate-key")
+    assert "--migrate" in capsys.readouterr().out
+    assert_wallets_decrypt()
+
+
+def test_keyring_loads_deleted_wallets_by_id():
+    run("bulk-create", "--count", "3", "--prefix", "w")
+    update_wallet_status(2, "deleted")
+    with Keyring(use_agent=False) as keyring:
+        # Ranges skip deleted wallets, an ID named explicitly can still be drained
+        assert [w["id"] for w in keyring.load([1, 2, 3])] == [1, 3]
+        assert [w["id"] for w in keyring.load([1, 2], include_deleted=True)] == [1, 2]
+        assert keyring.wallet(2)["status"] == "deleted"
+        assert str(keyring.keypair(2).pubkey()) == keyring.wallet(2)["public_key"]
+
+
+def test_migrate_converts_legacy_wallets():
+    create_legacy_wallets(5)
+    run("create", "--name", "envelope")
+    run("encryption", "--migrate", "--batch-size", "2", "--workers", "2")
+
+    counts = get_key_version_counts()
+    assert 0 not in counts
+    assert sum(counts.values()) == 6
+    assert all(w["private_key_encrypted"].startswith(ENVELOPE_PREFIX) for w in get_all_wallets())
+    assert_wallets_decrypt()
+
+
+def test_rotate_data_key_reencrypts_every_wallet():
+    run("bulk-create", "--count", "5", "--prefix", "w")
+    old_version = next(iter(get_key_version_counts()))
+    run("encryption", "--rotate-data-key", "--batch-size", "2", "--workers", "2")
+
+    counts = get_key_version_counts()
+    assert len(counts) == 1 and old_version not in counts
+    assert_wallets_decrypt()
+
+
+def test_resume_finishes_interrupted_reencryption(capsys):
+    create_legacy_wallets(3)
+    run("bulk-create", "--count", "2", "--prefix", "w")
+    # A --rotate-data-key that stopped after its first batch
+    target = create_data_key(get_encryption_key())
+    insert_key_rotation(target)
+    first = get_all_wallets()[0]
+    update_private_keys([(first["id"], reencrypt_batch([first["private_key_encrypted"]], target)[0])])
+    assert len(get_key_version_counts()) == 3
+    assert_wallets_decrypt()
+
+    run("encryption", "--migrate")
+    assert "--resume" in capsys.readouterr().out
+
+    run("encryption", "--resume", "--workers", "2")
+    assert list(get_key_version_counts()) == [target]
+    assert_wallets_decrypt()
+
+
+# SLIP-0010 test vector 1 for ed25519: path, private key, public key
+SLIP10_SEED = "000102030405060708090a0b0c0d0e0f"
+SLIP10_VECTORS = [
+    ([], "2b4be7f19ee27bbf30c667b642d5f4aa69fd169872f8fc3059c08ebae2eb19e7",
+     "a4b2856bfec510abab89753fac1ac0e1112364e7d250545963f135f2a33188ed"),
+    ([0], "68e0fe46dfb67e368c75379acec591dad19df3cde26e63b93a8e704f1dade7a3",
+     "8c8a13df77a28f3445213a0f432fde644acaa215fc72dcdf300d5efaa85d350c"),
+    ([0, 1], "b1d0bad404bf35da785a64ca1ac54b2617211d2777696fbffaf208f746ae84f2",
+     "1932a5270f335bed617d5b935c80aedb1a35bd9fc1e31acafd5372c30f5c1187"),
+    ([0, 1, 2], "92a5b23c0b8a99e37d07df3fb9966917f5d06e02ddbd909c7e184371463e9fc9",
+     "ae98736566d30ed0e9d2f4486a64bc95740d89c7db33f52121f8ea8f76ff0fc1"),
+    ([0, 1, 2, 2], "30d1dc7e5fc04c31219ab25a27ae00b50f6fd66622f6e9c913253d6511d1e662",
+     "8abae2d66361c879b900d204ad2cc4984fa2aa344dd7ddc46007329ac76c429c"),
+    ([0, 1, 2, 2, 1000000000], "8f94d394a8e8fd6b1bc2f3f49f5c47e385281d5c17e65324b0f62483e37e8793",
+     "3c24da049451555d51a7014a37337aa4e12d41e485abccfa46b47dfb2af54b7a"),
+]
+
+
+@pytest.mark.parametrize("path, private_key, public_key", SLIP10_VECTORS, ids=[format_path(v[0]) for v in SLIP10_VECTORS])
+def test_slip10_ed25519_vectors(path, private_key, public_key):
+    key = derive_private_key(bytes.fromhex(SLIP10_SEED), path)
+    assert key.hex() == private_key
+    assert bytes(Keypair.from_seed(key).pubkey()).hex() == public_key
+
+
+def test_hd_reference_round_trip():
+    run("bulk-create", "--count", "3", "--prefix", "hd", "--hd")
+    for wallet in get_all_wallets():
+        blob = wallet["private_key_encrypted"]
+        assert is_hd_reference(blob)
+        assert key_version(blob) == DERIVED_KEY_VERSION
+        seed_id, index = parse_hd_reference(blob)
+        key = decrypt_data(blob)
+        assert key == derive_private_key(get_hd_seed_bytes(seed_id, get_encryption_key()), derivation_path(index))
+        assert str(Keypair.from_seed(key).pubkey()) == wallet["public_key"]
+
+
+def test_hd_wallets_survive_every_rotation(monkeypatch):
+    create_legacy_wallets(2)
+    run("bulk-create", "--count", "3", "--prefix", "hd", "--hd")
+    run("bulk-create", "--count", "2", "--prefix", "hd", "--hd", "--seed-id", "1")
+    assert_wallets_decrypt()
+
+    run("encryption", "--migrate", "--workers", "2")
+    assert_wallets_decrypt()
+
+    new_key = Fernet.generate_key().decode()
+    monkeypatch.setattr("builtins.input", lambda prompt: new_key)
+    run("encryption", "--rotate-key")
+    monkeypatch.setenv("COINTOOLS_ENC_KEY", new_key)
+    assert_wallets_decrypt()
+
+    run("encryption", "--rotate-data-key", "--workers", "2")
+    target = max(get_key_version_counts())
+    # The seed moves to the new data key, the wallets keep their derivation references
+    assert [key_version(seed["seed_encrypted"]) for seed in get_hd_seeds()] == [target]
+    assert get_key_version_counts() == {DERIVED_KEY_VERSION: 5, target: 2}
+    assert_wallets_decrypt()
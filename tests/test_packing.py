@@ -0,0 +1,85 @@
+"""
+Packing instruction groups into transactions: every packed transaction must fit in a packet once signed.
+"""
+from solders.address_lookup_table_account import AddressLookupTableAccount  #type: ignore
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price  #type: ignore
+from solders.hash import Hash  #type: ignore
+from solders.keypair import Keypair  #type: ignore
+from solders.pubkey import Pubkey as PublicKey  #type: ignore
+from solders.system_program import TransferParams, transfer  #type: ignore
+
+from coin_tools.solana.utils import PACKET_DATA_SIZE, pack_instruction_groups, sign_transaction, transaction_size
+
+PAYER = Keypair()
+PREFIX = [set_compute_unit_limit(200_000), set_compute_unit_price(1_000)]
+
+
+def transfer_groups(count: int, size: int = 1) -> list:
+    """count groups of `size` transfers from the payer, each to a new recipient."""
+    return [
+        [transfer(TransferParams(from_pubkey=PAYER.pubkey(), to_pubkey=Keypair().pubkey(), lamports=1_000 + i)) for _ in range(size)]
+        for i in range(count)
+    ]
+
+
+def signed_sizes(batches: list, lookup_tables: list = None) -> list[int]:
+    sizes = []
+    for batch in batches:
+        instructions = PREFIX + [ix for group in batch for ix in group]
+        transaction = sign_transaction(PAYER, instructions, Hash.new_unique(), lookup_tables=lookup_tables)
+        sizes.append(len(bytes(transaction)))
+    return sizes
+
+
+def assert_packed(batches: list, groups: list):
+    # Every group lands in exactly one batch, in order and never split
+    assert [group for batch in batches for group in batch] == groups
+
+
+def test_transaction_size_matches_signed_transaction():
+    for groups in (transfer_groups(1), transfer_groups(5), transfer_groups(3, size=2)):
+        instructions = PREFIX + [ix for group in groups for ix in group]
+        signed = sign_transaction(PAYER, instructions, Hash.new_unique())
+        assert transaction_size(PAYER.pubkey(), instructions) == len(bytes(signed))
+
+
+def test_packed_transactions_fit_in_a_packet():
+    groups = transfer_groups(60, size=2)
+    batches = pack_instruction_groups(PAYER.pubkey(), groups, prefix=PREFIX)
+    assert_packed(batches, groups)
+    assert len(batches) > 1
+
+    sizes = signed_sizes(batches)
+    assert max(sizes) <= PACKET_DATA_SIZE
+    # Greedy: the next group would not have fit in any batch but the last
+    for batch, following in zip(batches, batches[1:]):
+        instructions = PREFIX + [ix for group in batch + following[:1] for ix in group]
+        assert transaction_size(PAYER.pubkey(), instructions) > PACKET_DATA_SIZE
+
+
+def test_max_groups_caps_each_batch():
+    groups = transfer_groups(10)
+    batches = pack_instruction_groups(PAYER.pubkey(), groups, prefix=PREFIX, max_groups=3)
+    assert_packed(batches, groups)
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+    assert max(signed_sizes(batches)) <= PACKET_DATA_SIZE
+
+
+def test_size_limit_applies_before_max_groups():
+    groups = transfer_groups(60)
+    batches = pack_instruction_groups(PAYER.pubkey(), groups, prefix=PREFIX, max_groups=50)
+    assert_packed(batches, groups)
+    assert max(len(batch) for batch in batches) < 50
+    assert max(signed_sizes(batches)) <= PACKET_DATA_SIZE
+
+
+def test_lookup_tables_pack_more_groups():
+    groups = transfer_groups(60)
+    recipients = [group[0].accounts[1].pubkey for group in groups]
+    lookup_tables = [AddressLookupTableAccount(PublicKey.new_unique(), recipients)]
+
+    legacy = pack_instruction_groups(PAYER.pubkey(), groups, prefix=PREFIX)
+    versioned = pack_instruction_groups(PAYER.pubkey(), groups, prefix=PREFIX, lookup_tables=lookup_tables)
+    assert_packed(versioned, groups)
+    assert len(versioned) < len(legacy)
+    assert max(signed_sizes(versioned, lookup_tables)) <= PACKET_DATA_SIZE
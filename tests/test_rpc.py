@@ -0,0 +1,123 @@
+"""
+RPC concurrency limits and the response cache, against a fake clock.
+"""
+import pytest
+
+from coin_tools.solana.rpc import DECREASE_FACTOR, DECREASE_WINDOW, HEALTHY_LATENCY, PERSIST_MIN_TTL, AdaptiveLimiter, ResponseCache
+
+
+class Clock:
+    def __init__(self, now: float = 1_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("time.monotonic", clock)
+    monkeypatch.setattr("time.time", clock)
+    return clock
+
+
+def respond(limiter: AdaptiveLimiter, count: int = 1, **kwargs):
+    for _ in range(count):
+        limiter.acquire()
+        limiter.release(**kwargs)
+
+
+def test_limiter_halves_at_most_once_per_window(clock):
+    limiter = AdaptiveLimiter("test", initial=32, maximum=64)
+    # A burst of throttles from one overload
+    respond(limiter, 10, throttled=True)
+    assert limiter.limit == 32 * DECREASE_FACTOR
+    assert limiter.throttle_events == 10
+
+    clock.advance(DECREASE_WINDOW / 2)
+    respond(limiter, throttled=True)
+    assert limiter.limit == 32 * DECREASE_FACTOR
+
+    clock.advance(DECREASE_WINDOW)
+    respond(limiter, 5, throttled=True)
+    assert limiter.limit == 32 * DECREASE_FACTOR ** 2
+
+
+def test_limiter_stays_within_bounds(clock):
+    limiter = AdaptiveLimiter("test", initial=4, minimum=2, maximum=6)
+    for _ in range(5):
+        clock.advance(DECREASE_WINDOW * 2)
+        respond(limiter, throttled=True)
+    assert limiter.limit == 2
+
+    respond(limiter, 1_000, latency=HEALTHY_LATENCY / 10)
+    assert limiter.limit == 6
+    assert limiter.peak_limit == 6
+
+
+def test_limiter_grows_about_one_per_round(clock):
+    limiter = AdaptiveLimiter("test", initial=8, maximum=64)
+    respond(limiter, 8, latency=HEALTHY_LATENCY / 10)
+    assert 8.9 < limiter.limit < 9
+    # Slow successes and responses without a latency leave the limit alone
+    respond(limiter, 8, latency=HEALTHY_LATENCY * 2)
+    respond(limiter, 8)
+    assert 8.9 < limiter.limit < 9
+    assert limiter.in_flight == 0
+
+
+def test_cache_entries_expire(clock):
+    cache = ResponseCache()
+    cache.put("slot", "1", ttl=0.4)
+    cache.put("account", "2", ttl=30)
+    assert cache.get("slot") == "1"
+
+    clock.advance(1)
+    assert cache.get("slot") is None
+    assert cache.get("account") == "2"
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    # A new response replaces the expired one
+    cache.put("slot", "3", ttl=0.4)
+    assert cache.get("slot") == "3"
+
+
+def test_cache_evicts_least_recently_used(clock):
+    cache = ResponseCache(max_size=3)
+    for key in "abc":
+        cache.put(key, key, ttl=60)
+    assert cache.get("a") == "a"
+
+    cache.put("d", "d", ttl=60)
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["a", "c", "d"]
+
+    # Overwriting an entry refreshes it too
+    cache.put("a", "a2", ttl=60)
+    cache.put("e", "e", ttl=60)
+    assert len(cache.entries) == 3
+    assert cache.get("c") is None
+    assert cache.get("a") == "a2"
+
+
+def test_cache_persists_only_long_lived_entries(clock, tmp_path):
+    path = str(tmp_path / "rpc_cache.json")
+    cache = ResponseCache()
+    cache.put("short", "1", ttl=PERSIST_MIN_TTL / 2)
+    cache.put("long", "2", ttl=PERSIST_MIN_TTL * 10)
+    cache.save(path)
+
+    loaded = ResponseCache()
+    loaded.load(path)
+    assert loaded.get("short") is None
+    assert loaded.get("long") == "2"
+
+    clock.advance(PERSIST_MIN_TTL * 20)
+    expired = ResponseCache()
+    expired.load(path)
+    assert not expired.entries